@@ -10,7 +10,6 @@ from .exceptions import (
 from .router import api_router
 from ..volumes.events import _insert_world_volume
 
-
 __all__ = [
     "get_settings",
     "engine",
@@ -10,6 +10,16 @@ class Settings(BaseSettings):
     DESCRIPTION: str
     VERSION: str
     SQLALCHEMY_DATABASE_URI: str
+    MAX_CONCURRENT_JOBS: int = 2
+    CACHE_DIR: str = "./cache"
+    RECON_CACHE_MAX_BYTES: int = 4 * 1024**3
+    ARCHIVE_CACHE_SIZE: int = 16
+    RECON_MEMORY_BUDGET_MB: int = 2048
+    PREVIEW_CACHE_MAX_BYTES: int = 256 * 1024**2
+    PREPROCESS_CACHE_MAX_BYTES: int = 4 * 1024**3
+    VOXEL_CACHE_MAX_BYTES: int = 4 * 1024**3
+    SWEEP_WORKERS: int = 2
+    SERVER_TIMING: bool = False
 
 
 @lru_cache
@@ -7,7 +7,9 @@ from .config import get_settings
 settings = get_settings()
 
 engine = create_async_engine(
-    settings.SQLALCHEMY_DATABASE_URI, echo=False, poolclass=AsyncAdaptedQueuePool
+    settings.SQLALCHEMY_DATABASE_URI,
+    echo=False,
+    poolclass=AsyncAdaptedQueuePool,
 )
 
 AsyncSessionLocal = async_sessionmaker(
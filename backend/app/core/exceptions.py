@@ -14,7 +14,9 @@ async def handle_http_exception(
     )
 
 
-async def handle_integrity_error(_: Request, exc: IntegrityError) -> JSONResponse:
+async def handle_integrity_error(
+    _: Request, exc: IntegrityError
+) -> JSONResponse:
     msg = str(exc.orig or exc)
     return JSONResponse(
         status_code=status.HTTP_409_CONFLICT,
@@ -0,0 +1,6 @@
+from typing import Annotated
+from fastapi import Depends
+
+from app.jobs.manager import JobManager, get_job_manager
+
+JobManagerDep = Annotated[JobManager, Depends(get_job_manager)]
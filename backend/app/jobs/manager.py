@@ -0,0 +1,270 @@
+import asyncio
+import multiprocessing
+import uuid
+from datetime import datetime, timezone
+from functools import lru_cache
+from typing import (
+    Any,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Dict,
+    List,
+    Optional,
+    Set,
+)
+
+from fastapi import HTTPException, status
+
+from app.core.config import get_settings
+from app.jobs.schema import JobRead, JobStatus
+from app.shared import metrics
+
+# Geant4 cannot be re-initialised in the same process, so every run gets a
+# freshly spawned interpreter (never a fork of the event-loop process).
+_MP_CONTEXT = multiprocessing.get_context("spawn")
+
+FINAL_STATUSES = {JobStatus.SUCCEEDED, JobStatus.FAILED, JobStatus.CANCELLED}
+EVENT_KEEPALIVE_SECONDS = 15.0
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+class Job:
+    """In-memory state of a single background job."""
+
+    def __init__(
+        self, simulation_id: int, kind: str, job_id: Optional[str] = None
+    ):
+        self.id = job_id or uuid.uuid4().hex
+        self.simulation_id = simulation_id
+        self.kind = kind
+        self.status = JobStatus.QUEUED
+        self.stage = "queued"
+        self.progress = 0.0
+        self.message = f"Job '{kind}' queued"
+        self.result: Optional[Dict[str, Any]] = None
+        self.error: Optional[str] = None
+        self.created_at = _now()
+        self.started_at: Optional[datetime] = None
+        self.finished_at: Optional[datetime] = None
+        self.details: Dict[str, Any] = {}
+        self.task: Optional[asyncio.Task] = None
+        self._subscribers: Set[asyncio.Queue] = set()
+
+    @property
+    def done(self) -> bool:
+        return self.status in FINAL_STATUSES
+
+    @property
+    def elapsed_seconds(self) -> Optional[float]:
+        if self.started_at is None:
+            return None
+        end = self.finished_at or _now()
+        return (end - self.started_at).total_seconds()
+
+    @property
+    def eta_seconds(self) -> Optional[float]:
+        if self.done:
+            return 0.0
+        if not self.elapsed_seconds or self.progress <= 0.0:
+            return None
+        return self.elapsed_seconds * (1.0 - self.progress) / self.progress
+
+    def update(
+        self,
+        stage: Optional[str] = None,
+        progress: Optional[float] = None,
+        **details: Any,
+    ) -> None:
+        """Record progress and publish a snapshot to every subscriber."""
+        if stage is not None:
+            self.stage = stage
+        if progress is not None:
+            self.progress = min(max(progress, 0.0), 1.0)
+        self.details.update(details)
+
+        snapshot = self.read()
+        for queue in self._subscribers:
+            queue.put_nowait(snapshot)
+
+    def subscribe(self) -> asyncio.Queue:
+        queue: asyncio.Queue = asyncio.Queue()
+        self._subscribers.add(queue)
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue) -> None:
+        self._subscribers.discard(queue)
+
+    def read(self) -> JobRead:
+        return JobRead.model_validate(self)
+
+
+JobFunc = Callable[[Job], Awaitable[Optional[Dict[str, Any]]]]
+FinishFunc = Callable[[Job], Awaitable[None]]
+
+
+class JobManager:
+    """
+    Bounded pool of asyncio tasks executing long running work.
+
+    At most ``max_workers`` jobs run at once, the rest wait in FIFO order.
+    Finished jobs are kept for status polling until ``max_finished`` newer
+    ones have completed.
+    """
+
+    def __init__(self, max_workers: int, max_finished: int = 100):
+        self._slots = asyncio.Semaphore(max_workers)
+        self._max_finished = max_finished
+        self._jobs: Dict[str, Job] = {}
+        self._hooks: Set[asyncio.Task] = set()
+
+    def submit(
+        self,
+        simulation_id: int,
+        kind: str,
+        func: JobFunc,
+        job_id: Optional[str] = None,
+        on_finish: Optional[FinishFunc] = None,
+    ) -> Job:
+        """
+        Queue ``func`` as a new job. ``job_id`` is for callers that have to
+        record the id before the job can start changing what they recorded.
+        ``on_finish`` is awaited with the job once it reached its final
+        status, however it got there.
+        """
+        job = Job(simulation_id, kind, job_id)
+        self._jobs[job.id] = job
+        job.task = asyncio.create_task(self._execute(job, func))
+        job.task.add_done_callback(lambda _: self._settle(job, on_finish))
+        self._prune()
+        return job
+
+    def get(self, job_id: str) -> Job:
+        job = self._jobs.get(job_id)
+        if not job:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Job with id {job_id} not found",
+            )
+        return job
+
+    def list(self, simulation_id: Optional[int] = None) -> List[Job]:
+        return [
+            job
+            for job in self._jobs.values()
+            if simulation_id is None or job.simulation_id == simulation_id
+        ]
+
+    def cancel(self, job_id: str) -> Job:
+        job = self.get(job_id)
+        if job.done:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail=f"Job {job_id} already {job.status.value}",
+            )
+        job.task.cancel()
+        job.message = f"Job '{job.kind}' cancellation requested"
+        return job
+
+    async def shutdown(self) -> None:
+        tasks = [job.task for job in self._jobs.values() if not job.done]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        await asyncio.gather(*self._hooks, return_exceptions=True)
+
+    async def events(self, job: Job) -> AsyncIterator[str]:
+        """Server-Sent Events stream of job snapshots until it finishes."""
+        queue = job.subscribe()
+        try:
+            snapshot = job.read()
+            while True:
+                data = snapshot.model_dump_json()
+                yield f"event: progress\ndata: {data}\n\n"
+                if snapshot.status in FINAL_STATUSES:
+                    return
+                try:
+                    snapshot = await asyncio.wait_for(
+                        queue.get(), EVENT_KEEPALIVE_SECONDS
+                    )
+                except asyncio.TimeoutError:
+                    # comment line, keeps proxies from closing the stream
+                    yield ": keepalive\n\n"
+                    snapshot = job.read()
+        finally:
+            job.unsubscribe(queue)
+
+    async def _execute(self, job: Job, func: JobFunc) -> None:
+        # the task inherited the submitting request's context
+        metrics.detach()
+        try:
+            async with self._slots:
+                job.status = JobStatus.RUNNING
+                job.started_at = _now()
+                job.message = f"Job '{job.kind}' running"
+                job.update(stage="running")
+                job.result = await func(job)
+            self._finish(job, JobStatus.SUCCEEDED, "finished", progress=1.0)
+        except asyncio.CancelledError:
+            self._finish(job, JobStatus.CANCELLED, "cancelled")
+        except Exception as e:
+            job.error = str(e) or type(e).__name__
+            self._finish(job, JobStatus.FAILED, "failed")
+
+    def _settle(self, job: Job, on_finish: Optional[FinishFunc]) -> None:
+        if not job.done:
+            # cancelled before its task ran, _execute never started
+            self._finish(job, JobStatus.CANCELLED, "cancelled")
+        if on_finish is not None:
+            hook = asyncio.create_task(on_finish(job))
+            self._hooks.add(hook)
+            hook.add_done_callback(self._hooks.discard)
+
+    @staticmethod
+    def _finish(
+        job: Job,
+        final: JobStatus,
+        stage: str,
+        progress: Optional[float] = None,
+    ) -> None:
+        job.status = final
+        job.finished_at = _now()
+        job.message = f"Job '{job.kind}' {stage}"
+        job.update(stage=stage, progress=progress)
+
+    def _prune(self) -> None:
+        finished = sorted(
+            (job for job in self._jobs.values() if job.done),
+            key=lambda job: job.finished_at,
+        )
+        for job in finished[: max(len(finished) - self._max_finished, 0)]:
+            del self._jobs[job.id]
+
+    @staticmethod
+    async def run_in_process(target: Callable[..., None], *args) -> None:
+        """
+        Run ``target(*args)`` in a spawned process.
+
+        Cancelling the awaiting task terminates the process, which is what
+        makes running jobs cancellable.
+        """
+        proc = _MP_CONTEXT.Process(target=target, args=args, daemon=True)
+        proc.start()
+        try:
+            await asyncio.to_thread(proc.join)
+        except asyncio.CancelledError:
+            proc.terminate()
+            await asyncio.to_thread(proc.join)
+            raise
+        if proc.exitcode != 0:
+            raise RuntimeError(
+                f"Worker process exited with code {proc.exitcode}"
+            )
+
+
+@lru_cache
+def get_job_manager() -> JobManager:
+    return JobManager(get_settings().MAX_CONCURRENT_JOBS)
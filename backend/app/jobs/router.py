@@ -0,0 +1,51 @@
+from typing import List, Optional
+
+from fastapi import APIRouter
+from fastapi.responses import StreamingResponse
+
+from app.jobs.dependencies import JobManagerDep
+from app.jobs.schema import JobRead
+from app.shared.message import MessageResponse
+
+router = APIRouter(tags=["Jobs"], prefix="/jobs")
+
+
+@router.get("/", response_model=List[JobRead])
+async def read_jobs(jobs: JobManagerDep, simulation_id: Optional[int] = None):
+    return [job.read() for job in jobs.list(simulation_id)]
+
+
+@router.get(
+    "/{job_id}",
+    response_model=JobRead,
+    responses={404: {"model": MessageResponse}},
+)
+async def read_job(jobs: JobManagerDep, job_id: str):
+    return jobs.get(job_id).read()
+
+
+@router.get(
+    "/{job_id}/events",
+    response_class=StreamingResponse,
+    responses={404: {"model": MessageResponse}},
+)
+async def stream_job(jobs: JobManagerDep, job_id: str):
+    """Stream job progress as Server-Sent Events until it finishes."""
+    job = jobs.get(job_id)
+    return StreamingResponse(
+        jobs.events(job),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache"},
+    )
+
+
+@router.post(
+    "/{job_id}/cancel",
+    response_model=JobRead,
+    responses={
+        404: {"model": MessageResponse},
+        409: {"model": MessageResponse},
+    },
+)
+async def cancel_job(jobs: JobManagerDep, job_id: str):
+    return jobs.cancel(job_id).read()
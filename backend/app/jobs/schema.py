@@ -0,0 +1,52 @@
+from datetime import datetime
+from enum import Enum
+from typing import Any, Dict, Optional
+
+from pydantic import BaseModel, ConfigDict, Field
+
+
+class JobStatus(str, Enum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
+
+
+class JobRead(BaseModel):
+    """Model for reading the state of a background job."""
+
+    model_config = ConfigDict(from_attributes=True)
+
+    id: str = Field(description="Unique ID of the job")
+    simulation_id: int = Field(description="Simulation the job belongs to")
+    kind: str = Field(description="Type of work performed by the job")
+    status: JobStatus = Field(description="Current lifecycle state")
+    stage: str = Field(description="Human readable step being executed")
+    progress: float = Field(
+        0.0, ge=0.0, le=1.0, description="Completed fraction of the job"
+    )
+    message: str = Field(description="Summary of the current state")
+    details: Dict[str, Any] = Field(
+        default_factory=dict,
+        description="Job specific progress, e.g. runs completed",
+    )
+    result: Optional[Dict[str, Any]] = Field(
+        None, description="Output produced by a successful job"
+    )
+    error: Optional[str] = Field(
+        None, description="Error description of a failed job"
+    )
+    created_at: datetime = Field(description="Submission timestamp")
+    started_at: Optional[datetime] = Field(
+        None, description="Timestamp when a worker picked up the job"
+    )
+    finished_at: Optional[datetime] = Field(
+        None, description="Timestamp when the job reached a final state"
+    )
+    elapsed_seconds: Optional[float] = Field(
+        None, description="Time spent running so far"
+    )
+    eta_seconds: Optional[float] = Field(
+        None, description="Estimated remaining time, from the progress rate"
+    )
@@ -0,0 +1,12 @@
+"""
+Entry points executed inside worker processes.
+
+Kept free of database and FastAPI imports so spawned workers start fast.
+"""
+
+import opengate as gate
+
+
+def run_gate_simulation(gate_sim: gate.Simulation) -> None:
+    # the worker already is a fresh process, Geant4 can run in-place
+    gate_sim.run(start_new_process=False)
@@ -1,7 +1,8 @@
+import time
 from pathlib import Path
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi import FastAPI, Request, HTTPException
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, PlainTextResponse
 from contextlib import asynccontextmanager
 
 from app.core import (
@@ -14,6 +15,10 @@ from app.core import (
     handle_integrity_error,
     handle_validation_error,
 )
+from app.core.database import AsyncSessionLocal
+from app.jobs.manager import get_job_manager
+from app.shared import metrics
+from app.sweeps.repository import SweepRepository
 from fastapi.exceptions import RequestValidationError
 from sqlalchemy.exc import IntegrityError
 
@@ -24,7 +29,11 @@ settings = get_settings()
 async def lifespan(app: FastAPI):
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
+    # jobs only live in memory, sweeps of a previous process never finish
+    async with AsyncSessionLocal() as session:
+        await SweepRepository(session).fail_unfinished()
     yield
+    await get_job_manager().shutdown()
     await engine.dispose()
 
 
@@ -43,8 +52,36 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+
+@app.middleware("http")
+async def record_latency(request: Request, call_next):
+    timings = metrics.start_request()
+    start = time.perf_counter()
+    response = await call_next(request)
+    total = time.perf_counter() - start
+
+    # label by route template so ids do not explode the series count
+    route = getattr(request.scope.get("route"), "path", "unmatched")
+    metrics.REQUEST_DURATION.observe(
+        total, request.method, route, str(response.status_code)
+    )
+    if settings.SERVER_TIMING:
+        response.headers["Server-Timing"] = metrics.server_timing(
+            timings, total
+        )
+    return response
+
+
 app.include_router(api_router)
 
+
+@app.get("/metrics", include_in_schema=False)
+async def read_metrics():
+    return PlainTextResponse(
+        metrics.render(), media_type="text/plain; version=0.0.4"
+    )
+
+
 BACKEND_DIR = Path(__file__).resolve().parent.parent
 FRONTEND_DIST = BACKEND_DIR.parent / "frontend/dist/frontend/browser"
 
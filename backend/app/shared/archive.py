@@ -0,0 +1,65 @@
+import os
+from collections import OrderedDict
+from functools import lru_cache
+from pathlib import Path
+from typing import Tuple
+
+import opengate as gate
+
+from app.shared import metrics
+
+
+class GateArchiveCache:
+    """
+    Parsed GATE simulations kept in memory between requests.
+
+    Entries are handed out exclusively: ``checkout`` removes the object from
+    the cache and only ``save`` (after the archive was written) puts it back.
+    A half-applied edit can therefore never leak into the next request, and
+    an archive changed on disk is detected through its stat stamp.
+    """
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._entries: OrderedDict[str, Tuple[tuple, gate.Simulation]] = (
+            OrderedDict()
+        )
+
+    @staticmethod
+    def _stamp(path: str) -> tuple:
+        st = os.stat(path)
+        return st.st_ino, st.st_size, st.st_mtime_ns
+
+    def checkout(self, path: str | Path) -> gate.Simulation:
+        path = os.path.abspath(path)
+        entry = self._entries.pop(path, None)
+        if entry and entry[0] == self._stamp(path):
+            return entry[1]
+
+        with metrics.timed("archive_parse"):
+            gate_sim = gate.Simulation()
+            gate_sim.from_json_file(path)
+        return gate_sim
+
+    def save(self, gate_sim: gate.Simulation) -> None:
+        with metrics.timed("archive_write"):
+            gate_sim.to_json_file()
+        path = os.path.abspath(
+            Path(gate_sim.output_dir) / gate_sim.json_archive_filename
+        )
+        self._entries[path] = (self._stamp(path), gate_sim)
+        self._entries.move_to_end(path)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, path: str | Path) -> None:
+        self._entries.pop(os.path.abspath(path), None)
+
+
+@lru_cache
+def get_archive_cache() -> GateArchiveCache:
+    # app.core imports the routers and through them this module, reading
+    # the settings only when needed keeps it importable on its own
+    from app.core.config import get_settings
+
+    return GateArchiveCache(get_settings().ARCHIVE_CACHE_SIZE)
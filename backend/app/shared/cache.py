@@ -0,0 +1,133 @@
+"""
+Content-addressed on-disk cache with size based LRU eviction.
+
+Every entry is a directory named after its key. Reading an entry bumps the
+directory's modification time, which is what eviction orders by.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import threading
+import uuid
+from functools import lru_cache
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Optional
+
+
+class DiskCache:
+    def __init__(self, root: str | Path, max_bytes: int):
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(*parts) -> str:
+        blob = json.dumps(parts, sort_keys=True, default=str)
+        return hashlib.sha256(blob.encode()).hexdigest()
+
+    def lookup(self, key: str) -> Optional[Path]:
+        entry = self.root / key
+        if not entry.is_dir():
+            return None
+        try:
+            os.utime(entry)
+        except FileNotFoundError:  # evicted concurrently
+            return None
+        return entry
+
+    def restore(self, key: str, dest_dir: str | Path) -> bool:
+        """Hard-link (or copy) the files of an entry into ``dest_dir``."""
+        entry = self.lookup(key)
+        if entry is None:
+            return False
+        os.makedirs(dest_dir, exist_ok=True)
+        try:
+            for src in entry.iterdir():
+                dst = Path(dest_dir) / src.name
+                dst.unlink(missing_ok=True)
+                try:
+                    os.link(src, dst)
+                except OSError:
+                    shutil.copy2(src, dst)
+        except FileNotFoundError:
+            return False
+        return True
+
+    def store(self, key: str, files: Iterable[str | Path]) -> Path:
+        """Copy ``files`` into a new entry, then evict down to the budget."""
+
+        def fill(tmp: Path) -> None:
+            for src in files:
+                shutil.copy2(src, tmp / Path(src).name)
+
+        return self._commit(key, fill)
+
+    def store_bytes(self, key: str, blobs: Dict[str, bytes]) -> Path:
+        """Write ``{filename: content}`` into a new entry."""
+
+        def fill(tmp: Path) -> None:
+            for name, content in blobs.items():
+                (tmp / name).write_bytes(content)
+
+        return self._commit(key, fill)
+
+    def _commit(self, key: str, fill: Callable[[Path], None]) -> Path:
+        entry = self.root / key
+        tmp = self.root / f".tmp-{uuid.uuid4().hex}"
+        tmp.mkdir(parents=True)
+        try:
+            fill(tmp)
+            os.rename(tmp, entry)
+        except OSError:
+            # another request stored the same key first
+            if not entry.is_dir():
+                raise
+        finally:
+            shutil.rmtree(tmp, ignore_errors=True)
+        self.evict()
+        return entry
+
+    def evict(self) -> None:
+        with self._lock:
+            entries = []
+            for entry in self.root.iterdir():
+                if entry.name.startswith(".tmp-") or not entry.is_dir():
+                    continue
+                size = sum(f.stat().st_size for f in entry.iterdir())
+                entries.append((entry.stat().st_mtime, size, entry))
+
+            total = sum(size for _, size, _ in entries)
+            for _, size, entry in sorted(entries, key=lambda e: e[0]):
+                if total <= self.max_bytes:
+                    break
+                shutil.rmtree(entry, ignore_errors=True)
+                total -= size
+
+
+def file_stamp(*paths: str | Path) -> tuple:
+    """
+    ``(path, size, mtime)`` of each of ``paths``, a key for outputs that is
+    cheap to compute but does not follow a file's content across copies.
+    """
+    stats = []
+    for path in paths:
+        st = os.stat(path)
+        stats.append((os.path.abspath(path), st.st_size, st.st_mtime_ns))
+    return tuple(stats)
+
+
+def file_digest(*paths: str | Path) -> str:
+    """SHA-256 over the contents of ``paths``, memoized on size and mtime."""
+    return _digest(file_stamp(*paths))
+
+
+@lru_cache(maxsize=256)
+def _digest(stats: tuple) -> str:
+    h = hashlib.sha256()
+    for path, _, _ in stats:
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                h.update(chunk)
+    return h.hexdigest()
@@ -0,0 +1,177 @@
+"""
+Columnar statistics of the hits trees GATE writes to ``hits.root``, and
+merging of the per-thread files of multi-threaded runs.
+
+Files are streamed in chunks with uproot, so memory stays bounded by the
+chunk size and the histograms, however many hits a run produced. Values
+are in Geant4 units: MeV, mm and ns.
+"""
+
+import glob
+import os
+import re
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import uproot
+
+TREE = "Hits"
+ENERGY = "TotalEnergyDeposit"
+TIME = "GlobalTime"
+POSITION = {
+    "x": "PostPosition_X",
+    "y": "PostPosition_Y",
+    "z": "PostPosition_Z",
+}
+STEP_SIZE = "64 MB"
+
+
+def chunks(
+    paths: Sequence[str],
+    branches: Optional[List[str]] = None,
+    tree: str = TREE,
+):
+    yield from uproot.iterate(
+        {path: tree for path in paths},
+        filter_name=branches or (lambda name: True),
+        step_size=STEP_SIZE,
+        library="np",
+        allow_missing=True,
+    )
+
+
+def thread_files(path: str) -> List[str]:
+    """
+    The ``<stem>_t<N>.root`` files Geant4 leaves per worker thread next to
+    ``path`` when it does not merge them itself, in thread order.
+    """
+    stem, suffix = os.path.splitext(path)
+    pattern = re.compile(re.escape(stem) + r"_t(\d+)" + re.escape(suffix))
+    return sorted(
+        (
+            p
+            for p in glob.glob(f"{glob.escape(stem)}_t*{suffix}")
+            if pattern.fullmatch(p)
+        ),
+        key=lambda p: int(pattern.fullmatch(p).group(1)),
+    )
+
+
+def output_files(path: str) -> List[str]:
+    """The file at ``path``, if GATE wrote it, and its per-thread files."""
+    return ([path] if os.path.exists(path) else []) + thread_files(path)
+
+
+def _check_numeric(chunk: Dict[str, np.ndarray], tree: str) -> None:
+    # uproot cannot write string (object or unicode) columns back
+    names = sorted(n for n, a in chunk.items() if a.dtype.kind not in "biuf")
+    if names:
+        raise ValueError(
+            f"Cannot merge the non-numeric branches {names} of '{tree}', "
+            "read the per-thread files instead"
+        )
+
+
+def merge_files(sources: Sequence[str], path: str, tree: str = TREE) -> str:
+    """
+    Write the ``tree`` of all ``sources``, in order, into the single file at
+    ``path``, which may be one of them. Only trees of numeric branches can
+    be merged, others raise a ValueError and leave ``path`` as it was.
+    """
+    tmp = f"{path}.merging"
+    try:
+        with uproot.recreate(tmp) as out:
+            for chunk in chunks(sources, tree=tree):
+                _check_numeric(chunk, tree)
+                if tree in out:
+                    out[tree].extend(chunk)
+                else:
+                    out[tree] = chunk
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+    os.replace(tmp, path)
+    return path
+
+
+def merge_thread_files(path: str, tree: str = TREE) -> str:
+    """Merge the per-thread files of ``path`` into the file at ``path``."""
+    parts = thread_files(path)
+    if not parts:
+        return path
+
+    merge_files(output_files(path), path, tree)
+    for part in parts:
+        os.remove(part)
+    return path
+
+
+def _ranges(
+    paths: Sequence[str], branches: List[str]
+) -> Tuple[int, Dict[str, Tuple[float, float]]]:
+    """Number of hits and the (min, max) of every branch."""
+    count = 0
+    lo = {b: np.inf for b in branches}
+    hi = {b: -np.inf for b in branches}
+    for chunk in chunks(paths, branches):
+        n = len(chunk[branches[0]])
+        if not n:
+            continue
+        count += n
+        for b in branches:
+            lo[b] = min(lo[b], float(chunk[b].min()))
+            hi[b] = max(hi[b], float(chunk[b].max()))
+    # an empty file still gets well-defined bins
+    return count, {
+        b: (lo[b], hi[b]) if count else (0.0, 1.0) for b in branches
+    }
+
+
+def statistics(
+    paths: Sequence[str],
+    run_edges: np.ndarray,
+    energy_bins: int,
+    heatmap_bins: int,
+    plane: str,
+) -> dict:
+    """
+    Energy deposit histogram, hits per run and a heatmap of the positions
+    projected onto ``plane`` ("xy", "xz" or "yz") over all ``paths``.
+
+    The first pass over the files finds the histogram ranges, the second
+    fills them. ``run_edges`` are the ``num_runs + 1`` run boundaries in ns.
+    """
+    u, v = (POSITION[axis] for axis in plane)
+    branches = [ENERGY, TIME, u, v]
+    count, ranges = _ranges(paths, branches)
+
+    energy = np.zeros(energy_bins, dtype=np.int64)
+    runs = np.zeros(len(run_edges) - 1, dtype=np.int64)
+    heatmap = np.zeros((heatmap_bins, heatmap_bins), dtype=np.int64)
+    total_energy = 0.0
+    energy_edges = np.linspace(*ranges[ENERGY], energy_bins + 1)
+    u_edges = np.linspace(*ranges[u], heatmap_bins + 1)
+    v_edges = np.linspace(*ranges[v], heatmap_bins + 1)
+    if count:
+        for chunk in chunks(paths, branches):
+            total_energy += float(chunk[ENERGY].sum())
+            energy += np.histogram(chunk[ENERGY], energy_edges)[0]
+            runs += np.histogram(chunk[TIME], run_edges)[0]
+            counts, _, _ = np.histogram2d(
+                chunk[u], chunk[v], (u_edges, v_edges)
+            )
+            heatmap += counts.astype(np.int64)
+
+    return {
+        "num_hits": count,
+        "total_energy": total_energy,
+        "energy": {"edges": energy_edges.tolist(), "counts": energy.tolist()},
+        "runs": runs.tolist(),
+        "heatmap": {
+            "plane": plane,
+            "u_edges": u_edges.tolist(),
+            "v_edges": v_edges.tolist(),
+            "counts": heatmap.tolist(),
+        },
+    }
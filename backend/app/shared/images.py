@@ -0,0 +1,339 @@
+"""
+Label map images of voxelized phantoms.
+
+Uploads are streamed to disk while they are hashed and stored once per
+digest. Every format ends up described by a ``<digest>.mhd`` MetaImage
+header: uploaded MetaImages carry their data inline, for ``.npy`` and
+``.nrrd`` files the header points past theirs, so the pixel data is never
+copied and is always read through a memory map.
+
+GATE gets a compact copy in which every label is replaced by the index of
+its material, 0 being the volume's own material. That copy only depends on
+the image and the label table, so it is built once and shared through the
+voxel cache.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import uuid
+from pathlib import Path
+from typing import AsyncIterable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from fastapi import HTTPException, status
+from fastapi.concurrency import run_in_threadpool
+
+from app.shared import metaimage
+from app.shared.cache import DiskCache
+
+FORMATS = {".mhd": "MetaImage", ".mha": "MetaImage"}
+FORMATS.update({".nrrd": "NRRD", ".npy": "NumPy"})
+# uploads are written in blocks of this size
+WRITE_SIZE = 8 * 1024**2
+# bytes of an image processed at once
+CHUNK_BYTES = 64 * 1024**2
+# images with more distinct values than this are not label maps
+MAX_LABELS = 4096
+# map file inside a voxel cache entry
+LABELS_FILE = "labels.mhd"
+
+_NRRD_TYPES = {
+    np.int8: ("signed char", "int8", "int8_t"),
+    np.uint8: ("uchar", "unsigned char", "uint8", "uint8_t"),
+    np.int16: ("short", "short int", "signed short", "signed short int")
+    + ("int16", "int16_t"),
+    np.uint16: ("ushort", "unsigned short", "unsigned short int")
+    + ("uint16", "uint16_t"),
+    np.int32: ("int", "signed int", "int32", "int32_t"),
+    np.uint32: ("uint", "unsigned int", "uint32", "uint32_t"),
+    np.int64: ("longlong", "long long", "long long int", "signed long long")
+    + ("signed long long int", "int64", "int64_t"),
+    np.uint64: ("ulonglong", "unsigned long long", "unsigned long long int")
+    + ("uint64", "uint64_t"),
+}
+NRRD_TYPES = {
+    name: np.dtype(t) for t, names in _NRRD_TYPES.items() for name in names
+}
+
+
+def _invalid(detail: str) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=detail
+    )
+
+
+def suffix(filename: str) -> str:
+    """Format suffix of an upload, 422 for unsupported ones."""
+    ext = Path(filename).suffix.lower()
+    if ext not in FORMATS:
+        raise _invalid(
+            f"Unsupported image '{filename}', upload one of "
+            f"{sorted(FORMATS)}"
+        )
+    return ext
+
+
+def _npy_header(path: Path) -> Tuple[Tuple[int, ...], np.dtype, int]:
+    with open(path, "rb") as f:
+        try:
+            version = np.lib.format.read_magic(f)
+            if version == (1, 0):
+                header = np.lib.format.read_array_header_1_0(f)
+            else:
+                # 3.0 only allows utf8 field names, read like 2.0
+                header = np.lib.format.read_array_header_2_0(f)
+            shape, fortran, dtype = header
+        except ValueError as e:
+            raise _invalid(f"Not a NumPy array file: {e}")
+        if fortran and len(shape) > 1:
+            raise _invalid("Save the array in C order, not Fortran order")
+        return shape, dtype, f.tell()
+
+
+def _nrrd_header(path: Path) -> Tuple[Dict[str, str], int]:
+    """Fields of an NRRD header and the offset of its attached data."""
+    fields: Dict[str, str] = {}
+    with open(path, "rb") as f:
+        if not f.readline().startswith(b"NRRD000"):
+            raise _invalid("Not an NRRD file")
+        for raw_line in f:
+            line = raw_line.decode("latin-1").rstrip("\r\n")
+            if not line:
+                return fields, f.tell()
+            if line.startswith("#") or ":=" in line:
+                continue
+            key, _, value = line.partition(":")
+            fields[key.strip().lower()] = value.strip()
+    raise _invalid("NRRD files need their data attached to the header")
+
+
+def _nrrd_spacing(fields: Dict[str, str], ndims: int) -> List[float]:
+    if "spacings" in fields:
+        return [float(s) for s in fields["spacings"].split()]
+    if "space directions" in fields:
+        vectors = fields["space directions"].replace("(", " ").split(")")
+        return [
+            float(np.linalg.norm([float(c) for c in v.split(",")]))
+            for v in vectors
+            if v.strip() and v.strip() != "none"
+        ]
+    return [1.0] * ndims
+
+
+def _describe(path: Path, ext: str, header: Path) -> None:
+    """Write the MetaImage ``header`` of the uploaded data at ``path``."""
+    if ext in (".mhd", ".mha"):
+        info = metaimage.read_info(path)
+        if info.data_file != path:
+            raise _invalid(
+                "MetaImage uploads need their data inline "
+                "(ElementDataFile = LOCAL), upload a .mha file"
+            )
+        os.replace(path, header)
+        return
+
+    if ext == ".npy":
+        shape, dtype, offset = _npy_header(path)
+        # NumPy files have no spacing, it is 1 mm unless the volume sets it
+        spacing = [1.0] * len(shape)
+    else:
+        fields, offset = _nrrd_header(path)
+        if fields.get("encoding", "raw") != "raw":
+            raise _invalid("Only raw NRRD encoding can be memory-mapped")
+        if "data file" in fields or "datafile" in fields:
+            raise _invalid("NRRD files need their data attached")
+        if fields.get("type") not in NRRD_TYPES:
+            raise _invalid(f"Unsupported NRRD type '{fields.get('type')}'")
+        dtype = NRRD_TYPES[fields["type"]]
+        if dtype.itemsize > 1:
+            big = fields.get("endian", "little") == "big"
+            dtype = dtype.newbyteorder(">" if big else "<")
+        # sizes are fastest axis first like DimSize, shapes are (z, y, x)
+        shape = tuple(int(s) for s in fields["sizes"].split())[::-1]
+        spacing = _nrrd_spacing(fields, len(shape))
+    if len(shape) != 3:
+        raise _invalid(f"Label maps must be 3D, not of shape {shape}")
+    metaimage.write_header(header, path, shape, spacing, dtype, offset)
+
+
+def _z_chunks(image: np.ndarray):
+    slice_bytes = image[0].nbytes or 1
+    step = max(1, CHUNK_BYTES // slice_bytes)
+    for z in range(0, len(image), step):
+        end = z + step
+        yield z, np.asarray(image[z:end])
+
+
+def _labels(image: np.ndarray) -> Optional[List[int]]:
+    """Distinct values of ``image``, None past ``MAX_LABELS`` of them."""
+    labels = np.empty(0, dtype=image.dtype)
+    for _, chunk in _z_chunks(image):
+        labels = np.union1d(labels, np.unique(chunk))
+        if len(labels) > MAX_LABELS:
+            return None
+    return labels.tolist()
+
+
+def _analyze(header: Path) -> dict:
+    info = metaimage.read_info(header)
+    if len(info.dims) != 3 or info.channels != 1:
+        raise _invalid("Label maps must be single channel 3D images")
+    if info.dtype.kind not in "iu":
+        raise _invalid(f"Label maps need integer pixels, not {info.dtype}")
+    if info.data_file.stat().st_size < info.data_offset + info.nbytes:
+        raise _invalid("The image holds fewer pixels than its header says")
+    return {
+        "dims": list(info.dims),
+        "spacing": list(info.spacing),
+        "dtype": info.dtype.name,
+        "labels": _labels(metaimage.open_memmap(header)),
+    }
+
+
+def _info(root: Path, digest: str) -> Path:
+    return root / f"{digest}.json"
+
+
+def read(root: str | Path, digest: str) -> dict:
+    """What ``store`` recorded about the image ``digest``, 404 if absent."""
+    path = _info(Path(root), digest)
+    if not path.is_file():
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Image '{digest}' not found",
+        )
+    return json.loads(path.read_text())
+
+
+def header_path(root: str | Path, digest: str) -> Path:
+    return Path(root) / f"{digest}.mhd"
+
+
+def _finish(root: Path, tmp: Path, ext: str, digest: str) -> dict:
+    """Move the uploaded ``tmp`` into place and describe it."""
+    if _info(root, digest).is_file():
+        # the same image was uploaded before
+        tmp.unlink()
+        return read(root, digest)
+
+    data = root / f"{digest}{ext}"
+    os.replace(tmp, data)
+    try:
+        header = header_path(root, digest)
+        _describe(data, ext, header)
+        info = {"digest": digest, "format": FORMATS[ext]}
+        info.update(_analyze(header))
+    except (HTTPException, ValueError, KeyError) as e:
+        for path in (data, header_path(root, digest)):
+            path.unlink(missing_ok=True)
+        if isinstance(e, HTTPException):
+            raise
+        raise _invalid(f"Cannot read the image: {e!r}")
+    _info(root, digest).write_text(json.dumps(info))
+    return info
+
+
+async def store(
+    root: str | Path, filename: str, stream: AsyncIterable[bytes]
+) -> dict:
+    """
+    Write the upload ``stream`` of ``filename`` below ``root``, keyed by its
+    SHA-256, and return its description.
+    """
+    ext = suffix(filename)
+    root = Path(root)
+    os.makedirs(root, exist_ok=True)
+    tmp = root / f".upload-{uuid.uuid4().hex}{ext}"
+    sha = hashlib.sha256()
+    buffer = bytearray()
+
+    def flush(f, block: bytes) -> None:
+        sha.update(block)
+        f.write(block)
+
+    try:
+        with open(tmp, "wb") as f:
+            async for part in stream:
+                buffer += part
+                if len(buffer) >= WRITE_SIZE:
+                    await run_in_threadpool(flush, f, bytes(buffer))
+                    buffer.clear()
+            await run_in_threadpool(flush, f, bytes(buffer))
+        return await run_in_threadpool(
+            _finish, root, tmp, ext, sha.hexdigest()
+        )
+    finally:
+        tmp.unlink(missing_ok=True)
+
+
+def material_table(
+    table: Dict[int, str], default: str
+) -> Tuple[List[str], Dict[int, int]]:
+    """
+    Materials of a label map, ``default`` first, and the index of each
+    label's material.
+    """
+    materials = [default] + sorted(set(table.values()) - {default})
+    index = {m: i for i, m in enumerate(materials)}
+    return materials, {label: index[m] for label, m in table.items()}
+
+
+def _write_labels(
+    header: Path,
+    out: Path,
+    codes: Dict[int, int],
+    num_materials: int,
+    spacing: Sequence[float],
+) -> None:
+    image = metaimage.open_memmap(header)
+    keys = np.array(sorted(codes), dtype=np.int64)
+    values = np.array([codes[k] for k in keys])
+    dtype = np.uint8 if num_materials <= 256 else np.uint16
+    labels = metaimage.create_memmap(out, image.shape, spacing, dtype=dtype)
+    for z, chunk in _z_chunks(image):
+        chunk = chunk.astype(np.int64)
+        where = np.minimum(np.searchsorted(keys, chunk), len(keys) - 1)
+        known = keys[where] == chunk
+        end = z + len(chunk)
+        labels[z:end] = np.where(known, values[where], 0)
+    labels.flush()
+
+
+def voxelize(
+    cache: DiskCache,
+    root: str | Path,
+    digest: str,
+    table: Dict[int, str],
+    default: str,
+    spacing: Sequence[float],
+) -> Tuple[Path, List[str]]:
+    """
+    Material map of the image ``digest`` with voxels of ``spacing`` mm, in
+    ``(x, y, z)`` order, restored below ``root`` from the voxel cache or
+    built into it. Returns the map and its materials.
+    """
+    read(root, digest)
+    materials, codes = material_table(table, default)
+    key = cache.key(
+        "voxels",
+        digest,
+        sorted(codes.items()),
+        materials,
+        [float(s) for s in spacing],
+    )
+    dest = Path(root) / key
+    if not cache.restore(key, dest):
+        # stale files may be hard links into the cache, never write to them
+        shutil.rmtree(dest, ignore_errors=True)
+        os.makedirs(dest)
+        _write_labels(
+            header_path(root, digest),
+            dest / LABELS_FILE,
+            codes,
+            len(materials),
+            spacing,
+        )
+        cache.store(key, metaimage.data_files(dest / LABELS_FILE))
+    return dest / LABELS_FILE, materials
@@ -0,0 +1,236 @@
+"""
+Minimal MetaImage (.mhd) reader and writer.
+
+GATE writes its image outputs as a text header plus a separate raw data file,
+these helpers map that data straight into numpy without reading or copying
+it upfront.
+"""
+
+from dataclasses import dataclass, replace
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+ELEMENT_TYPES = {
+    "MET_CHAR": np.int8,
+    "MET_UCHAR": np.uint8,
+    "MET_SHORT": np.int16,
+    "MET_USHORT": np.uint16,
+    "MET_INT": np.int32,
+    "MET_UINT": np.uint32,
+    "MET_LONG": np.int32,
+    "MET_ULONG": np.uint32,
+    "MET_LONG_LONG": np.int64,
+    "MET_ULONG_LONG": np.uint64,
+    "MET_FLOAT": np.float32,
+    "MET_DOUBLE": np.float64,
+}
+
+
+@dataclass(frozen=True)
+class MetaImageInfo:
+    """Header of a MetaImage, sizes are in (x, y, z) order as on disk."""
+
+    dims: Tuple[int, ...]
+    spacing: Tuple[float, ...]
+    origin: Tuple[float, ...]
+    channels: int
+    dtype: np.dtype
+    data_file: Path
+    data_offset: int
+
+    @property
+    def shape(self) -> Tuple[int, ...]:
+        """Numpy shape of the pixel data, i.e. (z, y, x[, channels])."""
+        shape = self.dims[::-1]
+        return shape + (self.channels,) if self.channels > 1 else shape
+
+    @property
+    def nbytes(self) -> int:
+        return int(np.prod(self.shape)) * self.dtype.itemsize
+
+
+def _parse(path: Path) -> Tuple[Dict[str, str], int]:
+    """Return the header fields and the byte offset right after them."""
+    header: Dict[str, str] = {}
+    with open(path, "rb") as f:
+        for raw_line in f:
+            line = raw_line.decode("latin-1")
+            if "=" not in line:
+                continue
+            key, value = line.split("=", 1)
+            header[key.strip()] = value.strip()
+            # ElementDataFile always is the last field of the header
+            if key.strip() == "ElementDataFile":
+                return header, f.tell()
+        return header, f.tell()
+
+
+def read_header(path: str | Path) -> Dict[str, str]:
+    return _parse(Path(path))[0]
+
+
+def read_info(path: str | Path) -> MetaImageInfo:
+    path = Path(path)
+    header, end = _parse(path)
+
+    if header.get("CompressedData", "False") == "True":
+        raise ValueError(f"{path}: compressed data cannot be memory-mapped")
+
+    dims = tuple(int(d) for d in header["DimSize"].split())
+    ndims = len(dims)
+    spacing = tuple(
+        float(s)
+        for s in header.get(
+            "ElementSpacing", header.get("ElementSize", "1 " * ndims)
+        ).split()
+    )
+    origin = tuple(
+        float(o)
+        for o in header.get(
+            "Offset",
+            header.get("Origin", header.get("Position", "0 " * ndims)),
+        ).split()
+    )
+
+    dtype = np.dtype(ELEMENT_TYPES[header["ElementType"]])
+    msb = header.get(
+        "BinaryDataByteOrderMSB", header.get("ElementByteOrderMSB", "False")
+    )
+    dtype = dtype.newbyteorder(">" if msb == "True" else "<")
+
+    data_file = header.get("ElementDataFile", "LOCAL")
+    if data_file == "LOCAL":
+        data_file, data_offset = path, end
+    else:
+        data_file, data_offset = path.parent / data_file, 0
+
+    info = MetaImageInfo(
+        dims=dims,
+        spacing=spacing,
+        origin=origin,
+        channels=int(header.get("ElementNumberOfChannels", 1)),
+        dtype=dtype,
+        data_file=data_file,
+        data_offset=data_offset,
+    )
+
+    header_size = int(header.get("HeaderSize", 0))
+    if header_size == -1:
+        # data is stored at the end of the file, whatever precedes it
+        header_size = data_file.stat().st_size - info.nbytes
+    if header_size:
+        info = replace(info, data_offset=data_offset + header_size)
+    return info
+
+
+def data_files(path: str | Path) -> List[Path]:
+    """Return the header followed by every raw file it references."""
+    path = Path(path)
+    data_file = read_header(path).get("ElementDataFile", "LOCAL")
+    if data_file == "LOCAL":
+        return [path]
+    return [path, path.parent / data_file]
+
+
+def open_memmap(path: str | Path, mode: str = "r") -> np.memmap:
+    """
+    Map the pixel data of ``path`` as a (z, y, x) array without reading it.
+
+    Use ``mode="c"`` for a writable copy-on-write view, pages are only
+    copied once they are modified.
+    """
+    info = read_info(path)
+    return np.memmap(
+        info.data_file,
+        dtype=info.dtype,
+        mode=mode,
+        offset=info.data_offset,
+        shape=info.shape,
+    )
+
+
+def _write_header(
+    path: Path,
+    shape: Sequence[int],
+    spacing: Sequence[float],
+    origin: Optional[Sequence[float]],
+    dtype: np.dtype,
+    raw: Optional[Path] = None,
+    header_size: int = 0,
+) -> Path:
+    raw = raw or path.with_suffix(".raw")
+    element_type = next(
+        k
+        for k, v in ELEMENT_TYPES.items()
+        if np.dtype(v) == dtype.newbyteorder("=")
+    )
+    ndims = len(shape)
+    origin = origin if origin is not None else [0] * ndims
+    identity = np.eye(ndims, dtype=int).ravel()
+    lines = [
+        "ObjectType = Image",
+        f"NDims = {ndims}",
+        "BinaryData = True",
+        f"BinaryDataByteOrderMSB = {dtype.byteorder == '>'}",
+        "CompressedData = False",
+        f"TransformMatrix = {' '.join(str(v) for v in identity)}",
+        f"Offset = {' '.join(str(o) for o in origin)}",
+        f"ElementSpacing = {' '.join(str(s) for s in spacing)}",
+        f"DimSize = {' '.join(str(d) for d in shape[::-1])}",
+        f"ElementType = {element_type}",
+    ]
+    if header_size:
+        lines.append(f"HeaderSize = {header_size}")
+    lines.append(f"ElementDataFile = {raw.name}")
+    with open(path, "w") as f:
+        f.write("\n".join(lines) + "\n")
+    return raw
+
+
+def create_memmap(
+    path: str | Path,
+    shape: Sequence[int],
+    spacing: Sequence[float],
+    dtype=np.float32,
+    origin: Optional[Sequence[float]] = None,
+) -> np.memmap:
+    """Write a header for a (z, y, x) image and map its zeroed raw file."""
+    dtype = np.dtype(dtype)
+    raw = _write_header(Path(path), shape, spacing, origin, dtype)
+    return np.memmap(raw, dtype=dtype, mode="w+", shape=tuple(shape))
+
+
+def write_image(
+    path: str | Path,
+    array: np.ndarray,
+    spacing: Sequence[float],
+    origin: Optional[Sequence[float]] = None,
+) -> None:
+    """Write a (z, y, x) array as header plus raw file."""
+    raw = _write_header(Path(path), array.shape, spacing, origin, array.dtype)
+    np.ascontiguousarray(array).tofile(raw)
+
+
+def write_header(
+    path: str | Path,
+    data_file: str | Path,
+    shape: Sequence[int],
+    spacing: Sequence[float],
+    dtype,
+    header_size: int = 0,
+) -> None:
+    """
+    Describe the (z, y, x) pixel data ``header_size`` bytes into
+    ``data_file``, which must sit next to ``path``, without copying it.
+    """
+    _write_header(
+        Path(path),
+        shape,
+        spacing,
+        None,
+        np.dtype(dtype),
+        Path(data_file),
+        header_size,
+    )
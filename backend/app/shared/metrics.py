@@ -0,0 +1,130 @@
+"""
+In-process latency metrics in the Prometheus text format.
+
+Route latencies are recorded by a middleware, service stages through
+``timed(stage)``. Stages timed while serving a request are also collected
+for that request's ``Server-Timing`` header.
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+REQUEST_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+STAGE_BUCKETS = (0.01, 0.05, 0.1, 0.5, 1, 5, 10, 30, 60, 300, 900, 3600)
+
+
+class Histogram:
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labels: Sequence[str],
+        buckets: Sequence[float],
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self.buckets = tuple(sorted(buckets))
+        # label values -> (count per bucket, sum, count)
+        self._series: Dict[Tuple[str, ...], Tuple[List[int], float, int]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *label_values: str) -> None:
+        with self._lock:
+            counts, total, count = self._series.get(
+                label_values, ([0] * len(self.buckets), 0.0, 0)
+            )
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+            self._series[label_values] = (counts, total + value, count + 1)
+
+    def render(self) -> str:
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} histogram",
+        ]
+        with self._lock:
+            series = sorted(self._series.items())
+        for label_values, (counts, total, count) in series:
+            labels = [
+                f'{k}="{_escape(v)}"'
+                for k, v in zip(self.labels, label_values)
+            ]
+            for bound, n in zip(self.buckets, counts):
+                le = ",".join(labels + [f'le="{bound}"'])
+                lines.append(f"{self.name}_bucket{{{le}}} {n}")
+            le = ",".join(labels + ['le="+Inf"'])
+            lines.append(f"{self.name}_bucket{{{le}}} {count}")
+            joined = ",".join(labels)
+            lines.append(f"{self.name}_sum{{{joined}}} {total}")
+            lines.append(f"{self.name}_count{{{joined}}} {count}")
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", r"\\").replace('"', r"\"").replace("\n", r"\n")
+
+
+REQUEST_DURATION = Histogram(
+    "projct_http_request_duration_seconds",
+    "Latency of HTTP requests by route template.",
+    ("method", "route", "status"),
+    REQUEST_BUCKETS,
+)
+STAGE_DURATION = Histogram(
+    "projct_stage_duration_seconds",
+    "Duration of service stages such as archive parsing, runs and FBP.",
+    ("stage",),
+    STAGE_BUCKETS,
+)
+
+# (stage, seconds) recorded while serving the current request, if any
+_request_timings: ContextVar[Optional[List[Tuple[str, float]]]] = ContextVar(
+    "request_timings", default=None
+)
+
+
+@contextmanager
+def timed(stage: str) -> Iterator[None]:
+    """Record how long the block takes as ``stage``."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        STAGE_DURATION.observe(elapsed, stage)
+        timings = _request_timings.get()
+        if timings is not None:
+            timings.append((stage, elapsed))
+
+
+def start_request() -> List[Tuple[str, float]]:
+    """Collect the stages timed from here on, in this context."""
+    timings: List[Tuple[str, float]] = []
+    _request_timings.set(timings)
+    return timings
+
+
+def detach() -> None:
+    """Stop attributing stages to the request this context was copied from."""
+    _request_timings.set(None)
+
+
+def server_timing(timings: List[Tuple[str, float]], total: float) -> str:
+    """``Server-Timing`` header value, repeated stages are summed up."""
+    durations: Dict[str, float] = {}
+    for stage, elapsed in timings:
+        durations[stage] = durations.get(stage, 0.0) + elapsed
+    durations["total"] = total
+    return ", ".join(
+        f"{stage};dur={elapsed * 1e3:.1f}"
+        for stage, elapsed in durations.items()
+    )
+
+
+def render() -> str:
+    return REQUEST_DURATION.render() + STAGE_DURATION.render()
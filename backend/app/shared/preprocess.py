@@ -0,0 +1,136 @@
+"""
+Detector preprocessing between ``projection.mhd`` and the reconstruction.
+
+Projections are cropped to a region of interest, normalised by flat and
+dark fields, binned and log transformed a few angles at a time, so a large
+panel never has to be held in memory at full resolution.
+"""
+
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+import numpy as np
+
+from app.shared import metaimage
+
+# bytes of full resolution projections processed at once
+CHUNK_BYTES = 64 * 1024**2
+# smallest transmission the log transform sees, dead pixels included
+MIN_TRANSMISSION = 1e-6
+
+
+@dataclass(frozen=True)
+class Preprocessing:
+    angle_step: int = 1
+    # (first column, first row, columns, rows) of the full detector
+    roi: Optional[Tuple[int, int, int, int]] = None
+    binning: int = 1
+    flat_path: Optional[str] = None
+    dark_path: Optional[str] = None
+    log: bool = False
+
+    @property
+    def identity(self) -> bool:
+        return self == Preprocessing()
+
+
+def _window(
+    info: metaimage.MetaImageInfo, prep: Preprocessing
+) -> Tuple[int, int, int, int]:
+    """Detector pixels kept, the ROI shrunk to whole bins."""
+    num_cols, num_rows = info.dims[:2]
+    col0, row0, cols, rows = prep.roi or (0, 0, num_cols, num_rows)
+    if col0 + cols > num_cols or row0 + rows > num_rows:
+        raise ValueError(
+            f"ROI {list(prep.roi)} exceeds the {num_cols}x{num_rows} detector"
+        )
+    cols, rows = cols - cols % prep.binning, rows - rows % prep.binning
+    if not cols or not rows:
+        raise ValueError(f"ROI is smaller than a {prep.binning}x bin")
+    return col0, row0, cols, rows
+
+
+def _crop(window: Tuple[int, int, int, int]) -> Tuple[slice, slice]:
+    """(rows, columns) slices of a detector image inside ``window``."""
+    col0, row0, cols, rows = window
+    return slice(row0, row0 + rows), slice(col0, col0 + cols)
+
+
+def detector_center(
+    info: metaimage.MetaImageInfo, prep: Preprocessing
+) -> Tuple[float, float]:
+    """
+    (row, column) the detector center falls on after preprocessing, in
+    pixels of the preprocessed projections.
+    """
+    col0, row0, _, _ = _window(info, prep)
+    num_cols, num_rows = info.dims[:2]
+    b = prep.binning
+    # binned pixel j covers pixels first + j * b up to first + j * b + b - 1
+    center_row = (0.5 * (num_rows - 1) - row0 - 0.5 * (b - 1)) / b
+    center_col = (0.5 * (num_cols - 1) - col0 - 0.5 * (b - 1)) / b
+    return center_row, center_col
+
+
+def _field(
+    path: str,
+    info: metaimage.MetaImageInfo,
+    window: Tuple[int, int, int, int],
+) -> np.ndarray:
+    """A flat or dark field cropped like the projections, stacks averaged."""
+    field_info = metaimage.read_info(path)
+    if tuple(field_info.dims[:2]) != tuple(info.dims[:2]):
+        raise ValueError(
+            f"{path} is {field_info.dims[0]}x{field_info.dims[1]}, the "
+            f"detector {info.dims[0]}x{info.dims[1]}"
+        )
+    field = metaimage.open_memmap(path)
+    if field.ndim == 3:
+        field = field.mean(axis=0, dtype=np.float64)
+    return np.asarray(field[_crop(window)], dtype=np.float32)
+
+
+def preprocess(proj_path: str, out_path: str, prep: Preprocessing) -> str:
+    """Write the projections of ``proj_path`` preprocessed to ``out_path``."""
+    info = metaimage.read_info(proj_path)
+    _, _, cols, rows = window = _window(info, prep)
+    b = prep.binning
+    num_rows, num_cols = rows // b, cols // b
+
+    dark = (
+        None
+        if prep.dark_path is None
+        else _field(prep.dark_path, info, window)
+    )
+    inv_gain = None
+    if prep.flat_path is not None:
+        gain = _field(prep.flat_path, info, window)
+        if dark is not None:
+            gain -= dark
+        # dead pixels read as no transmission rather than dividing by 0
+        inv_gain = np.divide(
+            1.0, gain, out=np.zeros_like(gain), where=gain > 0
+        )
+
+    proj = metaimage.open_memmap(proj_path)[:: prep.angle_step]
+    spacing = (info.spacing[0] * b, info.spacing[1] * b, info.spacing[2])
+    out = metaimage.create_memmap(
+        out_path, (len(proj), num_rows, num_cols), spacing
+    )
+    chunk = max(1, CHUNK_BYTES // (4 * rows * cols))
+    for a0 in range(0, len(proj), chunk):
+        angles = slice(a0, a0 + chunk)
+        g = np.array(proj[(angles,) + _crop(window)], dtype=np.float32)
+        if dark is not None:
+            g -= dark
+        if inv_gain is not None:
+            g *= inv_gain
+        if b > 1:
+            g = g.reshape(len(g), num_rows, b, num_cols, b).mean(axis=(2, 4))
+        if prep.log:
+            np.maximum(g, MIN_TRANSMISSION, out=g)
+            np.log(g, out=g)
+            np.negative(g, out=g)
+        out[angles] = g
+    out.flush()
+    return out_path
@@ -0,0 +1,30 @@
+"""Downsampling and encoding of 2D image previews."""
+
+import io
+
+import imageio.v3 as iio
+import numpy as np
+
+
+def downsample(img: np.ndarray, size: int) -> np.ndarray:
+    """Block-average ``img`` so that its longest side is at most ``size``."""
+    factor = -(-max(img.shape) // size)
+    if factor <= 1:
+        return np.asarray(img, dtype=np.float32)
+    h, w = (img.shape[0] // factor) * factor, (img.shape[1] // factor) * factor
+    blocks = np.asarray(img[:h, :w], dtype=np.float32).reshape(
+        h // factor, factor, w // factor, factor
+    )
+    return blocks.mean(axis=(1, 3))
+
+
+def to_png(img: np.ndarray) -> bytes:
+    """Window ``img`` to its 0.5-99.5 percentile range as 8-bit grayscale."""
+    finite = img[np.isfinite(img)]
+    lo, hi = np.percentile(finite, [0.5, 99.5]) if finite.size else (0, 0)
+    scaled = (np.nan_to_num(img, nan=lo) - lo) / (hi - lo or 1.0)
+    gray = (np.clip(scaled, 0.0, 1.0) * 255).astype(np.uint8)
+
+    buf = io.BytesIO()
+    iio.imwrite(buf, gray, extension=".png")
+    return buf.getvalue()
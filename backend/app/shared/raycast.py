@@ -0,0 +1,222 @@
+"""
+Analytic forward projection of Box and Sphere phantoms.
+
+A focused source sends every primary through its focus point, so the
+primaries reaching a detector pixel travel along the ray from the focus to
+the pixel center. How many leave the source along that ray follows from
+the source box, how many get through from the Beer-Lambert law: the line
+integral is the ray length in the world material plus, for every volume,
+its chord times how much more it attenuates than its mother. Finally the
+detector counts the primaries interacting in it.
+
+Rays of all pixels are intersected with a volume at once. Lengths are in
+mm, attenuation coefficients in 1/mm.
+"""
+
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# thickness given to flat source boxes, so they have a volume
+MIN_SOURCE_SIZE = 1e-3
+
+
+@dataclass(frozen=True)
+class Body:
+    name: str
+    rotations: np.ndarray  # (runs, 3, 3), local to world
+    translations: np.ndarray  # (runs, 3)
+    half_size: Optional[np.ndarray] = None  # boxes
+    radii: Optional[Tuple[float, float]] = None  # spheres, (rmin, rmax)
+
+
+@dataclass(frozen=True)
+class Beam:
+    focus: np.ndarray
+    center: np.ndarray  # of the source box
+    size: np.ndarray
+    photons: float  # emitted per run
+    mu_world: float
+    # excess over the mother of each body, and of the detector itself
+    mu: Dict[str, float]
+
+
+def _slabs(
+    origin: np.ndarray, direction: np.ndarray, half: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Parameters where the lines ``origin + t * direction`` enter and leave
+    the box ``|x| <= half``, with entry > exit when they miss it.
+    """
+    parallel = direction == 0
+    with np.errstate(divide="ignore", invalid="ignore"):
+        t0 = (-half - origin) / direction
+        t1 = (half - origin) / direction
+    inside = np.abs(origin) <= half
+    # lines parallel to a slab are in it everywhere or nowhere, ordering
+    # their infinite parameters would turn a miss into a hit
+    near, far = np.minimum(t0, t1), np.maximum(t0, t1)
+    lo = np.where(parallel, np.where(inside, -np.inf, np.inf), near)
+    hi = np.where(parallel, np.where(inside, np.inf, -np.inf), far)
+    return lo.max(axis=-1), hi.min(axis=-1)
+
+
+def box_chords(
+    start: np.ndarray,
+    ends: np.ndarray,
+    rotation: np.ndarray,
+    translation: np.ndarray,
+    half_size: np.ndarray,
+    t_max: float = 1.0,
+) -> np.ndarray:
+    """
+    Length of ``start + t * (end - start)``, ``0 <= t <= t_max``, inside
+    the box of ``half_size`` placed by ``rotation`` and ``translation``.
+    """
+    # row vectors times the rotation apply its inverse
+    origin = (start - translation) @ rotation
+    direction = (ends - start) @ rotation
+    enter, leave = _slabs(origin, direction, half_size)
+    inside = np.clip(leave, 0.0, t_max) - np.clip(enter, 0.0, t_max)
+    return np.maximum(inside, 0.0) * np.linalg.norm(direction, axis=-1)
+
+
+def _ball_chords(
+    start: np.ndarray, ends: np.ndarray, center: np.ndarray, radius: float
+) -> np.ndarray:
+    direction = ends - start
+    offset = start - center
+    a = np.einsum("ij,ij->i", direction, direction)
+    b = direction @ offset
+    c = offset @ offset - radius**2
+    disc = np.maximum(b * b - a * c, 0.0)
+    root = np.sqrt(disc)
+    enter = np.clip((-b - root) / a, 0.0, 1.0)
+    leave = np.clip((-b + root) / a, 0.0, 1.0)
+    return (leave - enter) * np.sqrt(a)
+
+
+def sphere_chords(
+    start: np.ndarray,
+    ends: np.ndarray,
+    center: np.ndarray,
+    rmin: float,
+    rmax: float,
+) -> np.ndarray:
+    """Length of the segments from ``start`` to ``ends`` in a shell."""
+    chords = _ball_chords(start, ends, center, rmax)
+    if rmin > 0:
+        # the inner ball is cut out of the same segments
+        chords -= _ball_chords(start, ends, center, rmin)
+    return chords
+
+
+def _chords(body: Body, run: int, start: np.ndarray, ends: np.ndarray):
+    if body.radii is not None:
+        return sphere_chords(start, ends, body.translations[run], *body.radii)
+    return box_chords(
+        start,
+        ends,
+        body.rotations[run],
+        body.translations[run],
+        body.half_size,
+    )
+
+
+def emission(
+    beam: Beam, pixels: np.ndarray, normal: np.ndarray, pixel_area: float
+) -> np.ndarray:
+    """
+    Fraction of the primaries emitted towards each pixel.
+
+    The primaries reaching a pixel start on the line from the pixel through
+    the focus, behind the focus. Over the solid angle ``dw`` the pixel
+    covers, that line sweeps ``dw * integral of r^2 dr`` of the uniformly
+    emitting source box, ``r`` being the distance to the focus.
+    """
+    size = np.maximum(beam.size, MIN_SOURCE_SIZE)
+    to_focus = beam.focus - pixels
+    distance = np.linalg.norm(to_focus, axis=-1)
+    direction = to_focus / distance[:, None]
+    near, far = _slabs(beam.focus - beam.center, direction, size / 2)
+    near = np.maximum(near, 0.0)
+    swept = np.where(far > near, (far**3 - near**3) / 3, 0.0)
+    solid_angle = pixel_area * np.abs(direction @ normal) / distance**2
+    return swept * solid_angle / np.prod(size)
+
+
+def pixel_centers(
+    rotation: np.ndarray,
+    translation: np.ndarray,
+    size: Sequence[int],
+    spacing: Sequence[float],
+) -> np.ndarray:
+    """
+    World positions of the ``(ny * nx, 3)`` pixel centers of a detector
+    centered on its volume, in its local x-y plane, row-major in y.
+    """
+    nx, ny = size
+    sx, sy = spacing
+    x = (np.arange(nx) - (nx - 1) / 2) * sx
+    y = (np.arange(ny) - (ny - 1) / 2) * sy
+    yy, xx = np.meshgrid(y, x, indexing="ij")
+    local = np.stack([xx.ravel(), yy.ravel(), np.zeros(nx * ny)], axis=-1)
+    return local @ rotation.T + translation
+
+
+@dataclass(frozen=True)
+class Scene:
+    detector: Body  # a box, the pixels lie in its local x-y plane
+    material: str  # of the detector
+    size: Tuple[int, int]  # pixels (nx, ny)
+    spacing: Tuple[float, float]
+    beams: List[Beam]
+    # every volume but the world, the detector and the detector's daughters
+    bodies: List[Body]
+
+
+def project_run(scene: Scene, run: int) -> np.ndarray:
+    """Expected primaries detected in every pixel, ``(ny, nx)``, at ``run``."""
+    detector = scene.detector
+    rotation = detector.rotations[run]
+    translation = detector.translations[run]
+    pixels = pixel_centers(rotation, translation, scene.size, scene.spacing)
+    normal = rotation[:, 2]
+    pixel_area = float(scene.spacing[0] * scene.spacing[1])
+
+    counts = np.zeros(len(pixels))
+    for beam in scene.beams:
+        expected = beam.photons * emission(beam, pixels, normal, pixel_area)
+        integral = beam.mu_world * np.linalg.norm(pixels - beam.focus, axis=1)
+        for body in scene.bodies:
+            mu = beam.mu[body.name]
+            if mu:
+                integral += mu * _chords(body, run, beam.focus, pixels)
+        # the ray crosses the pixel's plane in the middle of the detector,
+        # past it the detector material absorbs what it detects
+        depth = box_chords(
+            beam.focus,
+            pixels,
+            rotation,
+            translation,
+            detector.half_size,
+            t_max=2.0,
+        )
+        absorbed = -np.expm1(-beam.mu[detector.name] * depth)
+        counts += expected * np.exp(-integral) * absorbed
+    nx, ny = scene.size
+    return counts.reshape(ny, nx)
+
+
+def project(
+    scene: Scene,
+    out: np.ndarray,
+    report: Callable[[float], None] = lambda fraction: None,
+) -> np.ndarray:
+    """Fill the ``(runs, ny, nx)`` stack ``out`` run by run."""
+    num_runs = len(out)
+    for run in range(num_runs):
+        out[run] = project_run(scene, run)
+        report((run + 1) / num_runs)
+    return out
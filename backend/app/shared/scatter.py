@@ -0,0 +1,158 @@
+"""
+Scatter estimate of hybrid runs, from a low-statistics GATE phase space.
+
+GATE tracks a fraction of the activity for every n-th run only, and
+records the photons entering the detector. Those that are not unscattered
+primaries are binned on a coarse detector grid, weighted by their chance
+to interact in the detector like the ray-cast primaries are. Scatter varies
+slowly across pixels and angles, so the coarse stack is smoothed to remove
+most of the Monte Carlo noise and interpolated back to every run and pixel.
+
+Values are in Geant4 units: MeV, mm and ns.
+"""
+
+from typing import Callable, Sequence
+
+import numpy as np
+from scipy.ndimage import gaussian_filter
+
+from app.shared import hits
+
+TREE = "Scatter"
+ATTRIBUTES = [
+    "KineticEnergy",
+    "PrePosition",
+    "PreDirection",
+    "GlobalTime",
+    "ParticleName",
+    "UnscatteredPrimaryFlag",
+]
+# smoothing of the coarse stack, in coarse pixels and sampled runs
+SIGMA = 1.0
+
+
+def _coarse(n: int, binning: int) -> np.ndarray:
+    """Number of pixels in each coarse bin, the last one may be partial."""
+    return np.minimum(binning, n - np.arange(0, n, binning))
+
+
+def bin_scatter(
+    paths: Sequence[str],
+    run_edges: np.ndarray,
+    angle_step: int,
+    rotations: np.ndarray,
+    translations: np.ndarray,
+    size: Sequence[int],
+    spacing: Sequence[float],
+    binning: int,
+    thickness: float,
+    mu: Callable[[np.ndarray], np.ndarray],
+    weight: float,
+) -> np.ndarray:
+    """
+    Scattered photons detected per pixel, ``(runs, ny, nx)`` on the coarse
+    grid of ``binning`` x ``binning`` pixels, for every ``angle_step``-th
+    run.
+
+    ``rotations`` and ``translations`` place the detector at every run,
+    ``mu`` is the attenuation of its material by energy and ``weight`` that
+    of every recorded photon.
+    """
+    nx, ny = size
+    sx, sy = spacing
+    cols, rows = _coarse(nx, binning), _coarse(ny, binning)
+    num_sampled = len(range(0, len(run_edges) - 1, angle_step))
+    shape = (num_sampled, len(rows), len(cols))
+    counts = np.zeros(int(np.prod(shape)))
+
+    branches = [
+        "KineticEnergy",
+        "GlobalTime",
+        "ParticleName",
+        "UnscatteredPrimaryFlag",
+    ]
+    branches += [
+        f"Pre{v}_{c}" for v in ("Position", "Direction") for c in "XYZ"
+    ]
+    for chunk in hits.chunks(paths, branches, tree=TREE):
+        run = np.searchsorted(run_edges, chunk["GlobalTime"], "right") - 1
+        keep = (
+            (chunk["ParticleName"] == "gamma")
+            & (chunk["UnscatteredPrimaryFlag"] == 0)
+            & (run >= 0)
+            & (run < len(run_edges) - 1)
+            & (run % angle_step == 0)
+        )
+        if not keep.any():
+            continue
+        run = run[keep]
+        position, direction = (
+            np.stack([chunk[f"Pre{v}_{c}"][keep] for c in "XYZ"], axis=-1)
+            for v in ("Position", "Direction")
+        )
+        # into the detector frame of each photon's run
+        matrices = rotations[run]
+        local = np.einsum("nji,nj->ni", matrices, position - translations[run])
+        axial = np.abs(np.einsum("nj,nj->n", matrices[:, :, 2], direction))
+
+        col = np.floor(local[:, 0] / sx + nx / 2).astype(np.int64)
+        row = np.floor(local[:, 1] / sy + ny / 2).astype(np.int64)
+        inside = (col >= 0) & (col < nx) & (row >= 0) & (row < ny)
+        with np.errstate(divide="ignore"):
+            depth = np.where(axial > 0, thickness / axial, np.inf)
+        absorbed = -np.expm1(-mu(chunk["KineticEnergy"][keep]) * depth)
+
+        index = np.ravel_multi_index(
+            (run // angle_step, row // binning, col // binning), shape
+        )
+        counts += np.bincount(
+            index[inside],
+            weights=absorbed[inside] * weight,
+            minlength=counts.size,
+        )
+
+    # per pixel, partial bins at the edges cover fewer of them
+    return counts.reshape(shape) / np.outer(rows, cols)
+
+
+def _interpolation(n: int, coarse: np.ndarray) -> np.ndarray:
+    """
+    ``(n, len(coarse))`` matrix interpolating values at the ``coarse``
+    positions linearly to ``0 .. n - 1``, constant past the ends.
+    """
+    if len(coarse) == 1:
+        return np.ones((n, 1))
+    identity = np.eye(len(coarse))
+    return np.stack(
+        [np.interp(np.arange(n), coarse, column) for column in identity],
+        axis=-1,
+    )
+
+
+def upsampler(
+    coarse: np.ndarray,
+    num_runs: int,
+    angle_step: int,
+    size: Sequence[int],
+    binning: int,
+) -> Callable[[int], np.ndarray]:
+    """
+    Smooth the coarse stack of ``bin_scatter`` and return the ``(ny, nx)``
+    scatter of any run.
+    """
+    nx, ny = size
+    smooth = gaussian_filter(coarse, SIGMA, mode="nearest")
+
+    def centers(n: int) -> np.ndarray:
+        starts = np.arange(0, n, binning)
+        return starts + (_coarse(n, binning) - 1) / 2
+
+    runs = _interpolation(num_runs, np.arange(0, num_runs, angle_step))
+    cols = _interpolation(nx, centers(nx))
+    rows = _interpolation(ny, centers(ny))
+
+    def scatter(run: int) -> np.ndarray:
+        image = np.tensordot(runs[run], smooth, axes=1)
+        return rows @ image @ cols.T
+
+    return scatter
@@ -0,0 +1,250 @@
+"""
+Per-run poses of dynamic volumes.
+
+Each run of a simulation places a dynamic volume at one sample of its
+trajectory. All samples are computed at once and memoized, the same
+trajectories are rebuilt on every volume edit and before every run.
+"""
+
+from functools import lru_cache
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+from fastapi import HTTPException, status
+from opengate.geometry.volumes import VolumeBase as VolumeGATE
+from scipy.spatial.transform import Rotation as R
+
+from app.shared.primitives import UNIT_TO_GATE
+from app.volumes.schema import BoxShape, ImageShape, SphereShape, VolumeBase
+
+PARAMETRISATION_NAME = "trajectory"
+
+
+@lru_cache(maxsize=256)
+def rotations(
+    axis: str, start: float, end: float, num_runs: int
+) -> np.ndarray:
+    """
+    Rotation matrices about ``axis`` from ``start`` towards ``end`` degrees.
+
+    Returns a read-only ``(num_runs, 3, 3)`` array, ``end`` itself is not
+    reached so a full turn does not repeat the first angle.
+    """
+    angles = np.linspace(start, end, num_runs, endpoint=False)
+    matrices = R.from_euler(axis, angles[:, None], degrees=True).as_matrix()
+    matrices.setflags(write=False)
+    return matrices
+
+
+@lru_cache(maxsize=256)
+def translations(
+    start: Tuple[float, ...], end: Tuple[float, ...], num_runs: int
+) -> np.ndarray:
+    """Read-only ``(num_runs, 3)`` positions from ``start`` towards ``end``."""
+    positions = np.linspace(start, end, num_runs, endpoint=False)
+    positions.setflags(write=False)
+    return positions
+
+
+def positions(vol: VolumeBase, num_runs: int) -> Optional[np.ndarray]:
+    """Per-run positions of ``vol`` in Gate units, None if it does not move."""
+    dynamic = vol.dynamic_params
+    if dynamic.translations is not None:
+        pos = np.asarray(dynamic.translations, dtype=float)
+    elif dynamic.translation_end is not None:
+        pos = translations(
+            tuple(vol.translation), tuple(dynamic.translation_end), num_runs
+        )
+    else:
+        return None
+    return pos * UNIT_TO_GATE[vol.translation_unit]
+
+
+def dynamic_parametrisation(
+    vol: VolumeBase, num_runs: int, runs: slice = slice(None)
+) -> Dict[str, Any]:
+    """
+    Keyword arguments of ``add_dynamic_parametrisation`` for ``vol``.
+
+    Only the parameters actually changing over the runs are returned,
+    restricted to ``runs`` when the runs are split across workers.
+    """
+    params: Dict[str, Any] = {}
+    dynamic = vol.dynamic_params
+
+    if dynamic.angle_end is not None:
+        matrices = rotations(
+            vol.rotation.axis.value,
+            vol.rotation.angle,
+            dynamic.angle_end,
+            num_runs,
+        )
+        params["rotation"] = list(matrices[runs])
+
+    pos = positions(vol, num_runs)
+    if pos is not None:
+        params["translation"] = list(pos[runs])
+
+    return params
+
+
+def local_poses(
+    vol: VolumeBase, num_runs: int
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Per-run ``(num_runs, 3, 3)`` rotations and ``(num_runs, 3)``
+    translations of ``vol`` in its mother, in Gate units.
+    """
+    dynamic = vol.dynamic_params
+    matrices = None
+    pos = None
+    if dynamic.enabled:
+        if dynamic.angle_end is not None:
+            matrices = rotations(
+                vol.rotation.axis.value,
+                vol.rotation.angle,
+                dynamic.angle_end,
+                num_runs,
+            )
+        pos = positions(vol, num_runs)
+    if matrices is None:
+        matrix = R.from_euler(
+            vol.rotation.axis.value, vol.rotation.angle, degrees=True
+        ).as_matrix()
+        matrices = np.broadcast_to(matrix, (num_runs, 3, 3))
+    if pos is None:
+        translation = (
+            np.asarray(vol.translation, dtype=float)
+            * UNIT_TO_GATE[vol.translation_unit]
+        )
+        pos = np.broadcast_to(translation, (num_runs, 3))
+    return matrices, pos
+
+
+def world_poses(
+    vols: Dict[str, VolumeBase], num_runs: int
+) -> Dict[str, Tuple[np.ndarray, np.ndarray]]:
+    """
+    Per-run poses of every volume in the world frame, mapping local to
+    world coordinates as ``rotation @ local + translation``.
+    """
+    poses: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+
+    def pose(name: str) -> Tuple[np.ndarray, np.ndarray]:
+        if name not in poses:
+            vol = vols[name]
+            matrices, pos = local_poses(vol, num_runs)
+            if vol.mother in vols:
+                mother_matrices, mother_pos = pose(vol.mother)
+                matrices = mother_matrices @ matrices
+                pos = (
+                    np.einsum("rij,rj->ri", mother_matrices, pos) + mother_pos
+                )
+            poses[name] = (matrices, pos)
+        return poses[name]
+
+    for name in vols:
+        pose(name)
+    return poses
+
+
+def _bounding_radius(vol: VolumeBase) -> float:
+    unit = UNIT_TO_GATE[vol.shape.unit]
+    match vol.shape:
+        case BoxShape() | ImageShape():
+            return float(np.linalg.norm(vol.shape.size)) / 2 * unit
+        case SphereShape():
+            return vol.shape.rmax * unit
+
+
+def _distances(detector: VolumeBase, points: np.ndarray) -> np.ndarray:
+    """Distance of each point to the surface of ``detector``, 0 inside."""
+    center = (
+        np.asarray(detector.translation)
+        * UNIT_TO_GATE[detector.translation_unit]
+    )
+    unit = UNIT_TO_GATE[detector.shape.unit]
+    match detector.shape:
+        case BoxShape() | ImageShape():
+            # axis-aligned bounds of the rotated detector box
+            matrix = R.from_euler(
+                detector.rotation.axis.value,
+                detector.rotation.angle,
+                degrees=True,
+            ).as_matrix()
+            half = np.abs(matrix) @ (np.asarray(detector.shape.size) / 2)
+            outside = np.abs(points - center) - half * unit
+            return np.linalg.norm(np.maximum(outside, 0.0), axis=1)
+        case SphereShape():
+            radius = detector.shape.rmax * unit
+            distance = np.linalg.norm(points - center, axis=1) - radius
+            return np.maximum(distance, 0.0)
+
+
+def validate_trajectory(
+    vol: VolumeBase, num_runs: int, detector: Optional[VolumeBase] = None
+) -> None:
+    """
+    Check that ``vol`` has one pose per run and never reaches the detector.
+
+    ``detector`` is the volume the projection actor is attached to, it is
+    only compared against volumes placed in the same mother. The moving
+    volume is approximated by its bounding sphere.
+    """
+    if not vol.dynamic_params.enabled:
+        return
+
+    steps = vol.dynamic_params.translations
+    if steps is not None and len(steps) != num_runs:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=(
+                f"Volume '{vol.name}' has {len(steps)} translations "
+                f"but the simulation has {num_runs} runs"
+            ),
+        )
+
+    if (
+        detector is None
+        or detector.name == vol.name
+        or detector.mother is None
+        or detector.mother != vol.mother
+    ):
+        return
+    pos = positions(vol, num_runs)
+    if pos is None:
+        return
+
+    hits = np.flatnonzero(_distances(detector, pos) < _bounding_radius(vol))
+    if hits.size:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=(
+                f"Volume '{vol.name}' overlaps the detector "
+                f"'{detector.name}' at run {hits[0]}"
+            ),
+        )
+
+
+def apply_trajectory(
+    gate_vol: VolumeGATE,
+    vol: VolumeBase,
+    num_runs: int,
+    runs: slice = slice(None),
+    detector: Optional[VolumeBase] = None,
+) -> None:
+    """
+    Replace the dynamic parametrisation of ``gate_vol`` by that of ``vol``.
+    """
+    # dynamic_params is read-only in Gate, drop the previous trajectory so
+    # edits and per-worker run slices do not stack parametrisations
+    gate_vol.user_info["dynamic_params"] = None
+    if not vol.dynamic_params.enabled:
+        return
+
+    validate_trajectory(vol, num_runs, detector)
+    params = dynamic_parametrisation(vol, num_runs, runs)
+    if params:
+        gate_vol.add_dynamic_parametrisation(
+            name=PARAMETRISATION_NAME, **params
+        )
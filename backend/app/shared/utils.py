@@ -1,38 +1,43 @@
 from pathlib import Path
+from typing import TYPE_CHECKING, Iterable, Set
 
 import opengate as gate
 from fastapi import HTTPException, status
 
 
-from app.simulations.repository import SimulationRepository
-from app.sources.repository import SourceRepository
+from app.shared import metrics
+from app.shared.archive import get_archive_cache
+from app.simulations.schema import ParallelMode, SimulationRead
 from app.shared.primitives import Unit, UNIT_TO_GATE
 from app.sources.schema import BoxPosition, SourceRead
 
+if TYPE_CHECKING:
+    # the repositories import the models and with them app.core, which
+    # imports the services using this module
+    from app.simulations.repository import SimulationRepository
+    from app.sources.repository import SourceRepository
 
-async def get_gate_sim(
-    id: int, sim_repo: SimulationRepository, src_repo: SourceRepository
-) -> gate.Simulation:
-    sim_rec = await sim_repo.read(id)
-    if not sim_rec:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"Simulation with id {id} not found",
-        )
 
-    cfg = Path(sim_rec.output_dir) / sim_rec.json_archive_filename
+def build_gate_sim(
+    sim: SimulationRead, sources: Iterable[SourceRead]
+) -> gate.Simulation:
+    """The archived GATE simulation of ``sim`` with ``sources`` added."""
+    cfg = Path(sim.output_dir) / sim.json_archive_filename
     if not cfg.exists():
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Simulation configuration file not found",
         )
 
-    sim = gate.Simulation()
-    sim.from_json_file(str(cfg))
+    gate_sim = get_archive_cache().checkout(cfg)
+    # in process mode every shard is a single-threaded process
+    threads = sim.number_of_threads
+    if sim.parallel_mode == ParallelMode.PROCESSES:
+        threads = 1
+    gate_sim.number_of_threads = threads
 
-    for src in await src_repo.read_all(id):
-        data = SourceRead.model_validate(src)
-        gs = sim.add_source("GenericSource", data.name)
+    for data in sources:
+        gs = gate_sim.add_source("GenericSource", data.name)
         gs.particle = data.particle
 
         pos: BoxPosition = data.position
@@ -51,7 +56,32 @@ async def get_gate_sim(
         factor_energy = UNIT_TO_GATE[Unit(data.energy.unit.value)]
         gs.energy.mono = data.energy.energy * factor_energy
 
+        # every Geant4 thread runs its own copy of the source
         activity_factor = UNIT_TO_GATE[Unit(data.unit.value)]
-        gs.activity = data.activity * activity_factor
+        gs.activity = data.activity * activity_factor / threads
+
+    return gate_sim
+
+
+async def get_gate_sim(
+    id: int, sim_repo: "SimulationRepository", src_repo: "SourceRepository"
+) -> gate.Simulation:
+    with metrics.timed("get_gate_sim"):
+        sim_rec = await sim_repo.read(id)
+        if not sim_rec:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Simulation with id {id} not found",
+            )
+        sources = [
+            SourceRead.model_validate(src)
+            for src in await src_repo.read_all(id)
+        ]
+        return build_gate_sim(SimulationRead.model_validate(sim_rec), sources)
+
 
-    return sim
+def material_names(gate_sim: gate.Simulation) -> Set[str]:
+    """Materials ``gate_sim`` can build, Geant4's NIST ones and its own."""
+    database = gate_sim.volume_manager.material_database
+    database.init_NIST()
+    return set(database.nist_material_names) | set(database.material_builders)
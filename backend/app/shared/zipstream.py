@@ -0,0 +1,51 @@
+"""Zip archives generated on the fly, chunk by chunk, without a temp file."""
+
+import io
+import zipfile
+from pathlib import Path
+from typing import Iterable, Iterator, Tuple
+
+CHUNK_SIZE = 1024**2
+
+
+class _ChunkWriter(io.RawIOBase):
+    """Unseekable sink collecting what ``zipfile`` writes until drained."""
+
+    def __init__(self):
+        self._chunks: list[bytes] = []
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, b) -> int:
+        self._chunks.append(bytes(b))
+        return len(b)
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def iter_zip(entries: Iterable[Tuple[Path, str, bool]]) -> Iterator[bytes]:
+    """
+    Yield a zip archive of ``(path, arcname, compress)`` entries.
+
+    Since the sink is not seekable, ``zipfile`` writes sizes and CRCs in data
+    descriptors after each member, so nothing has to be buffered.
+    """
+    sink = _ChunkWriter()
+    with zipfile.ZipFile(sink, "w", allowZip64=True) as zf:
+        for path, arcname, compress in entries:
+            info = zipfile.ZipInfo.from_file(path, arcname)
+            info.compress_type = (
+                zipfile.ZIP_DEFLATED if compress else zipfile.ZIP_STORED
+            )
+            with open(path, "rb") as src, zf.open(info, "w") as dst:
+                for chunk in iter(lambda: src.read(CHUNK_SIZE), b""):
+                    dst.write(chunk)
+                    data = sink.drain()
+                    if data:
+                        yield data
+            yield sink.drain()
+    yield sink.drain()
@@ -18,6 +18,8 @@ class Simulation(Base):
     name = Column(String, index=True, unique=True, nullable=False)
     num_runs = Column(Integer, default=1, nullable=False)
     run_len = Column(Float, default=1.0, nullable=False)
+    number_of_threads = Column(Integer, default=1, nullable=False)
+    parallel_mode = Column(String, default="threads", nullable=False)
     output_dir = Column(String, nullable=False)
     json_archive_filename = Column(String, nullable=False)
     created_at = Column(
@@ -36,3 +38,9 @@ class Simulation(Base):
         back_populates="simulation",
         cascade="all, delete-orphan",
     )
+
+    sweeps = relationship(
+        "Sweep",
+        back_populates="simulation",
+        cascade="all, delete-orphan",
+    )
@@ -2,6 +2,7 @@ from typing import List
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import joinedload, selectinload
 from app.simulations.model import Simulation
 from app.simulations.schema import SimulationCreate, SimulationUpdate
 
@@ -35,6 +36,19 @@ class SimulationRepository:
         )
         return sim.scalar_one_or_none()
 
+    async def read_with_children(self, id: int) -> Simulation | None:
+        """The simulation with its volumes and sources, in two queries."""
+        sim = await self.session.execute(
+            select(Simulation)
+            .where(Simulation.id == id)
+            .options(
+                joinedload(Simulation.volumes),
+                selectinload(Simulation.sources),
+            )
+            .execution_options(populate_existing=True)
+        )
+        return sim.unique().scalar_one_or_none()
+
     async def update(self, id: int, sim_new: SimulationUpdate) -> Simulation:
         sim_old = await self.read(id)
         sim_new: dict = sim_new.model_dump(exclude_unset=True)
@@ -1,18 +1,23 @@
-import os
-from fastapi import APIRouter, BackgroundTasks, status
-from fastapi.responses import FileResponse
+from fastapi import APIRouter, Query, status
+from fastapi.responses import Response, StreamingResponse
 from app.simulations.dependencies import SimulationServiceDep
+from app.jobs.dependencies import JobManagerDep
+from app.jobs.schema import JobRead
 from app.sources.dependencies import SourceRepositoryDep
 from app.shared.message import MessageResponse
 from app.simulations.schema import (
+    ExportCompression,
+    HeatmapPlane,
+    HitStatistics,
+    PreviewFormat,
     ReconstructionParams,
+    RunParams,
     SimulationCreate,
     SimulationUpdate,
     SimulationRead,
+    SlicePlane,
 )
-from typing import List
-
-from app.volumes.dependencies import VolumeRepositoryDep
+from typing import Annotated, List, Optional
 
 router = APIRouter(tags=["Simulations"], prefix="/simulations")
 
@@ -77,22 +82,97 @@ async def import_simulation(service: SimulationServiceDep, sim_id: int):
 
 @router.get(
     "/{sim_id}/export",
-    response_class=FileResponse,
+    response_class=StreamingResponse,
     responses={404: {"model": MessageResponse}},
 )
 async def export_simulation(
-    background_tasks: BackgroundTasks,
     service: SimulationServiceDep,
     sim_id: int,
+    include: Annotated[Optional[List[str]], Query()] = None,
+    exclude: Annotated[Optional[List[str]], Query()] = None,
+    compression: ExportCompression = ExportCompression.AUTO,
 ):
-    zip_path = await service.export_simulation(sim_id)
-
-    background_tasks.add_task(os.remove, zip_path)
+    chunks, filename = await service.export_simulation(
+        sim_id, include, exclude, compression
+    )
 
-    return FileResponse(
-        path=zip_path,
+    return StreamingResponse(
+        chunks,
         media_type="application/zip",
-        filename=os.path.basename(zip_path),
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
+def _preview_response(content: bytes, shape, fmt: PreviewFormat) -> Response:
+    if fmt == PreviewFormat.PNG:
+        return Response(content, media_type="image/png")
+    return Response(
+        content,
+        media_type="application/octet-stream",
+        headers={"X-Shape": f"{shape[0]},{shape[1]}", "X-Dtype": "float32"},
+    )
+
+
+@router.get(
+    "/{sim_id}/previews/projections/{index}",
+    response_class=Response,
+    responses={
+        200: {"content": {"image/png": {}, "application/octet-stream": {}}},
+        404: {"model": MessageResponse},
+    },
+)
+async def preview_projection(
+    service: SimulationServiceDep,
+    sim_id: int,
+    index: int,
+    size: Annotated[int, Query(gt=0, le=4096)] = 256,
+    format: PreviewFormat = PreviewFormat.PNG,
+):
+    """Downsampled projection at one angle, PNG or little-endian float32."""
+    content, shape = await service.preview_projection(
+        sim_id, index, size, format
+    )
+    return _preview_response(content, shape, format)
+
+
+@router.get(
+    "/{sim_id}/previews/reconstruction/{plane}",
+    response_class=Response,
+    responses={
+        200: {"content": {"image/png": {}, "application/octet-stream": {}}},
+        404: {"model": MessageResponse},
+    },
+)
+async def preview_reconstruction(
+    service: SimulationServiceDep,
+    sim_id: int,
+    plane: SlicePlane,
+    index: Optional[int] = None,
+    size: Annotated[int, Query(gt=0, le=4096)] = 256,
+    format: PreviewFormat = PreviewFormat.PNG,
+):
+    """Downsampled slice of the reconstruction, the central one by default."""
+    content, shape = await service.preview_reconstruction(
+        sim_id, plane, index, size, format
+    )
+    return _preview_response(content, shape, format)
+
+
+@router.get(
+    "/{sim_id}/hits/statistics",
+    response_model=HitStatistics,
+    responses={404: {"model": MessageResponse}},
+)
+async def hit_statistics(
+    service: SimulationServiceDep,
+    sim_id: int,
+    energy_bins: Annotated[int, Query(gt=0, le=4096)] = 100,
+    heatmap_bins: Annotated[int, Query(gt=0, le=1024)] = 64,
+    plane: HeatmapPlane = HeatmapPlane.XY,
+):
+    """Energy histogram, hits per run and a position heatmap of the hits."""
+    return await service.hit_statistics(
+        sim_id, energy_bins, heatmap_bins, plane
     )
 
 
@@ -111,31 +191,31 @@ async def view_simulation(
 
 @router.post(
     "/{sim_id}/run",
-    status_code=status.HTTP_200_OK,
+    status_code=status.HTTP_202_ACCEPTED,
+    response_model=JobRead,
     responses={404: {"model": MessageResponse}},
 )
 async def run_simulation(
     service: SimulationServiceDep,
-    src_repo: SourceRepositoryDep,
-    vol_repo: VolumeRepositoryDep,
+    jobs: JobManagerDep,
     sim_id: int,
+    params: Optional[RunParams] = None,
 ):
-    return await service.run_simulation(sim_id, src_repo, vol_repo)
+    """Queue a simulation run, poll `/jobs/{job_id}` for its status."""
+    return await service.run_simulation(sim_id, jobs, params or RunParams())
 
 
 @router.post(
     "/{sim_id}/reconstruct",
     status_code=status.HTTP_202_ACCEPTED,
-    response_model=MessageResponse,
+    response_model=JobRead,
     responses={404: {"model": MessageResponse}},
 )
 async def reconstruct(
     sim_id: int,
     params: ReconstructionParams,
     service: SimulationServiceDep,
+    jobs: JobManagerDep,
 ):
-    """Trigger FBP reconstruction of the projection stack."""
-    await service.reconstruct_simulation(sim_id, params.sod, params.sdd)
-    return {
-        "message": "Reconstruction finished, for results export the simulation"
-    }
+    """Queue reconstruction of the projection stack."""
+    return await service.reconstruct_simulation(sim_id, params, jobs)
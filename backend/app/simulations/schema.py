@@ -1,13 +1,227 @@
-from typing import List, Optional
-from pydantic import BaseModel, Field, ConfigDict
+from enum import Enum
+from typing import Dict, List, Optional
+from pydantic import (
+    BaseModel,
+    Field,
+    ConfigDict,
+    NonNegativeInt,
+    PositiveInt,
+    model_validator,
+)
 from datetime import datetime
 
+from app.sources.schema import SourceRead
+from app.volumes.schema import VolumeRead
+
+
+class PreviewFormat(str, Enum):
+    PNG = "png"
+    RAW = "raw"
+
+
+class ExportCompression(str, Enum):
+    AUTO = "auto"
+    DEFLATE = "deflate"
+    STORE = "store"
+
+
+class SlicePlane(str, Enum):
+    AXIAL = "axial"
+    CORONAL = "coronal"
+    SAGITTAL = "sagittal"
+
+
+class ParallelMode(str, Enum):
+    THREADS = "threads"  # Geant4 worker threads in one process
+    PROCESSES = "processes"  # single-threaded processes, one per shard
+
+
+class RunMode(str, Enum):
+    MONTE_CARLO = "monte_carlo"  # Geant4 tracking with GATE
+    FAST = "fast"  # analytic ray-cast of the primary beam
+    # ray-cast primaries plus scatter from a low-statistics GATE run
+    HYBRID = "hybrid"
+
+
+class HeatmapPlane(str, Enum):
+    XY = "xy"
+    XZ = "xz"
+    YZ = "yz"
+
+
+class Histogram(BaseModel):
+    edges: List[float] = Field(description="Bin edges, one more than counts")
+    counts: List[int]
+
+
+class Heatmap(BaseModel):
+    plane: HeatmapPlane
+    u_edges: List[float] = Field(description="Edges along the first axis")
+    v_edges: List[float] = Field(description="Edges along the second axis")
+    counts: List[List[int]] = Field(description="Hits per [u][v] bin")
+
+
+class HitStatistics(BaseModel):
+    """Aggregates over every hit of the last run, in MeV, mm and ns."""
+
+    num_hits: int
+    total_energy: float = Field(description="Sum of the energy deposits")
+    energy: Histogram = Field(description="Energy deposit per hit")
+    runs: List[int] = Field(description="Hits per run")
+    heatmap: Heatmap = Field(description="Hit positions on a plane")
+
+
+class ReconAlgorithm(str, Enum):
+    FBP = "fbp"  # FDK on the cone-beam geometry
+    SART = "sart"
+    SIRT = "sirt"
+
+
+class RampFilter(str, Enum):
+    SHEPP_LOGAN = "shepp_logan"
+    RAM_LAK = "ram_lak"
+    COSINE = "cosine"
+
 
 class ReconstructionParams(BaseModel):
     sod: float = Field(..., gt=0, description="Source-to-object distance (mm)")
     sdd: float = Field(
         ..., gt=0, description="Source-to-detector distance (mm)"
     )
+    memory_budget_mb: Optional[int] = Field(
+        None,
+        gt=0,
+        description=(
+            "Peak memory above which slabs of slices are reconstructed"
+        ),
+    )
+    algorithm: ReconAlgorithm = Field(
+        ReconAlgorithm.FBP, description="Reconstruction algorithm"
+    )
+    filter: RampFilter = Field(
+        RampFilter.SHEPP_LOGAN, description="Ramp filter of FBP"
+    )
+    num_iterations: int = Field(
+        10, gt=0, description="Iterations of SART or SIRT"
+    )
+    num_subsets: int = Field(
+        1, gt=0, description="Ordered subsets of projections per SART pass"
+    )
+    angular_range: float = Field(
+        360.0,
+        gt=0,
+        le=360,
+        description="Degrees covered by the projections, evenly spaced",
+    )
+    volume_dims: Optional[List[PositiveInt]] = Field(
+        None,
+        min_length=3,
+        max_length=3,
+        description="Output voxels [x, y, z], LEAP's default if unset",
+    )
+    voxel_size: Optional[float] = Field(
+        None,
+        gt=0,
+        description="Transaxial voxel size (mm), the axial one scales along",
+    )
+    num_threads: Optional[int] = Field(
+        None, gt=0, description="CPU threads, all cores if unset"
+    )
+    binning: int = Field(
+        1, gt=0, description="Average n x n detector pixels into one"
+    )
+    angle_step: int = Field(
+        1, gt=0, description="Use only every n-th projection"
+    )
+    roi: Optional[List[NonNegativeInt]] = Field(
+        None,
+        min_length=4,
+        max_length=4,
+        description="Detector pixels kept [first col, first row, cols, rows]",
+    )
+    flat_field: Optional[str] = Field(
+        None,
+        description="Flat field image, relative to the output directory",
+    )
+    dark_field: Optional[str] = Field(
+        None,
+        description="Dark field image, relative to the output directory",
+    )
+    log_transform: bool = Field(
+        False, description="Reconstruct -log of the flat-normalised data"
+    )
+
+    @model_validator(mode="after")
+    def check_distances(self) -> "ReconstructionParams":
+        if self.sdd <= self.sod:
+            raise ValueError(
+                f"Must satisfy 0 < SOD={self.sod} < SDD={self.sdd}."
+            )
+        return self
+
+    @model_validator(mode="after")
+    def check_preprocessing(self) -> "ReconstructionParams":
+        if self.roi is not None and 0 in self.roi[2:]:
+            raise ValueError("ROI must be at least one pixel wide and high.")
+        if self.log_transform and self.flat_field is None:
+            raise ValueError("The log transform needs a flat field.")
+        return self
+
+    @model_validator(mode="after")
+    def check_subsets(self) -> "ReconstructionParams":
+        if self.num_subsets > 1 and self.algorithm != ReconAlgorithm.SART:
+            raise ValueError("Only SART supports ordered subsets.")
+        return self
+
+
+class RunParams(BaseModel):
+    mode: RunMode = Field(
+        RunMode.MONTE_CARLO,
+        description="Track particles or ray-cast the primary beam only",
+    )
+    scatter_fraction: float = Field(
+        0.1,
+        gt=0,
+        le=1,
+        description="Fraction of the activity GATE tracks in hybrid mode",
+    )
+    scatter_binning: int = Field(
+        8,
+        gt=0,
+        description="Scatter is estimated on n x n detector pixel bins",
+    )
+    scatter_angle_step: int = Field(
+        4, gt=0, description="Scatter is simulated for every n-th run"
+    )
+    num_workers: Optional[int] = Field(
+        None,
+        gt=0,
+        description=(
+            "No. of processes simulating projection shards at once, "
+            "number_of_threads in process mode and 1 otherwise by default"
+        ),
+    )
+    seed: Optional[int] = Field(
+        None,
+        ge=0,
+        description="Base random seed, shard k uses seed + k",
+    )
+    shard_size: Optional[int] = Field(
+        None,
+        gt=0,
+        description=(
+            "Runs per projection shard, defaults to one shard per worker, "
+            "or up to 8 when reconstructing incrementally"
+        ),
+    )
+    reconstruct: Optional[ReconstructionParams] = Field(
+        None,
+        description="Reconstruct incrementally as the shards finish",
+    )
+    force: bool = Field(
+        False,
+        description="Rerun even if nothing changed since the last run",
+    )
 
 
 class ActorBase(BaseModel):
@@ -52,6 +266,13 @@ class SimulationBase(BaseModel):
     run_len: float = Field(
         1.0, gt=0, description="Length (in seconds) of each run"
     )
+    number_of_threads: int = Field(
+        1, gt=0, description="Geant4 threads, or processes in process mode"
+    )
+    parallel_mode: ParallelMode = Field(
+        ParallelMode.THREADS,
+        description="Run in one multi-threaded or in several processes",
+    )
     actor: ActorBase = Field(description="Primary actor in the simulation")
 
 
@@ -67,6 +288,8 @@ class SimulationUpdate(BaseModel):
     name: Optional[str] = None
     num_runs: Optional[int] = Field(None, gt=0)
     run_len: Optional[float] = Field(None, gt=0)
+    number_of_threads: Optional[int] = Field(None, gt=0)
+    parallel_mode: Optional[ParallelMode] = None
     actor: Optional[ActorUpdate] = None
 
 
@@ -85,3 +308,17 @@ class SimulationRead(SimulationBase):
     json_archive_filename: str = Field(
         description="Filename of the simulation's JSON archive"
     )
+
+
+class RunPlan(BaseModel):
+    """A simulation with every volume and source a run of it needs."""
+
+    model_config = ConfigDict(from_attributes=True)
+
+    simulation: SimulationRead
+    volumes: List[VolumeRead]
+    sources: List[SourceRead]
+
+    @property
+    def volume_map(self) -> Dict[str, VolumeRead]:
+        return {vol.name: vol for vol in self.volumes}
@@ -1,27 +1,431 @@
+import asyncio
+import json
 import os
+import secrets
 import shutil
+import tempfile
+from contextlib import nullcontext
+from functools import lru_cache
+from fnmatch import fnmatch
+from pathlib import Path
+from typing import (
+    Callable,
+    ContextManager,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+)
 from fastapi import HTTPException
 from fastapi.concurrency import run_in_threadpool
 from app.simulations.repository import SimulationRepository
 from app.sources.repository import SourceRepository
 from app.shared.message import MessageResponse
 from app.simulations.schema import (
+    ExportCompression,
+    HeatmapPlane,
+    HitStatistics,
+    ParallelMode,
+    PreviewFormat,
+    RampFilter,
+    ReconAlgorithm,
+    ReconstructionParams,
+    SlicePlane,
+    RunMode,
+    RunParams,
+    RunPlan,
     SimulationCreate,
     SimulationRead,
     SimulationUpdate,
 )
-from app.shared.utils import get_gate_sim
+from app.shared import attenuation, hits, metaimage, metrics, preview
+from app.shared import raycast, scatter
+from app.shared.preprocess import Preprocessing, detector_center, preprocess
+from app.shared.archive import get_archive_cache
+from app.shared.cache import DiskCache, file_digest, file_stamp
+from app.shared.trajectory import apply_trajectory, world_poses
+from app.shared.utils import build_gate_sim, get_gate_sim
+from app.shared.zipstream import iter_zip
+from app.core.config import get_settings
+from app.jobs.manager import Job, JobManager
+from app.jobs.schema import JobRead
+from app.jobs.workers import run_gate_simulation
 import opengate as gate
 from opengate.geometry.volumes import VolumeBase as VolumeGATE
 
 import numpy as np
-from scipy.spatial.transform import Rotation as R
 from app.shared.primitives import UNIT_TO_GATE, Unit
 from app.simulations.model import Simulation
-from app.volumes.repository import VolumeRepository
-from app.volumes.schema import VolumeRead
-import SimpleITK as sitk
+from app.volumes.schema import BoxShape, ImageShape, SphereShape, VolumeRead
 from leapctype import tomographicModels
+from threadpoolctl import threadpool_limits
+
+PROJECTION_FILE = "output/projection.mhd"
+HITS_FILE = "output/hits.root"
+RECONSTRUCTION_FILE = "output/reconstruction.mhd"
+RUN_FILE = "output/run.json"
+# per-shard working directories, removed once the shards are merged
+SHARDS_DIR = "shards"
+SCATTER_FILE = "output/scatter.root"
+
+# run parameters only hybrid runs depend on
+HYBRID_PARAMS = {"scatter_fraction", "scatter_binning", "scatter_angle_step"}
+
+# Already compressed or high-entropy outputs, deflating them only costs CPU
+INCOMPRESSIBLE_SUFFIXES = {".root", ".raw", ".zip", ".gz", ".png", ".npy"}
+
+# shards a reconstructing run is split into by default, so the preview
+# grows while the simulation goes on even when a single worker runs them
+PREVIEW_SHARDS = 8
+
+# orders of the finite-difference ramps LEAP's set_rampFilter takes, see
+# the leapctype.tomographicModels.set_rampFilter docstring: 2 (its default)
+# is the Shepp-Logan filter, the higher even orders up to 10 sharpen it
+# towards Ram-Lak. LEAP has no cosine window, _apodize applies it to Ram-Lak.
+RAMP_FILTERS = {
+    RampFilter.SHEPP_LOGAN: 2,
+    RampFilter.COSINE: 10,
+    RampFilter.RAM_LAK: 10,
+}
+
+
+ProgressCallback = Callable[[str, float], None]
+
+
+def _ignore_progress(stage: str, progress: float) -> None:
+    pass
+
+
+@lru_cache
+def get_recon_cache() -> DiskCache:
+    settings = get_settings()
+    return DiskCache(
+        os.path.join(settings.CACHE_DIR, "reconstructions"),
+        settings.RECON_CACHE_MAX_BYTES,
+    )
+
+
+@lru_cache
+def get_preprocess_cache() -> DiskCache:
+    settings = get_settings()
+    return DiskCache(
+        os.path.join(settings.CACHE_DIR, "preprocessed"),
+        settings.PREPROCESS_CACHE_MAX_BYTES,
+    )
+
+
+@lru_cache
+def get_preview_cache() -> DiskCache:
+    settings = get_settings()
+    return DiskCache(
+        os.path.join(settings.CACHE_DIR, "previews"),
+        settings.PREVIEW_CACHE_MAX_BYTES,
+    )
+
+
+def _unlink_image(path: str) -> None:
+    # outputs may be hard links into the cache, never write through them
+    if os.path.exists(path):
+        for data_file in metaimage.data_files(path):
+            data_file.unlink(missing_ok=True)
+
+
+def _angles(num_angles: int, params: ReconstructionParams) -> np.ndarray:
+    """Projection angles in degrees, spaced as LEAP's ``setAngleArray``."""
+    step = params.angular_range / num_angles
+    return np.arange(num_angles, dtype=np.float32) * np.float32(step)
+
+
+def _conebeam(
+    info: metaimage.MetaImageInfo,
+    phis: np.ndarray,
+    params: ReconstructionParams,
+    center: Optional[Tuple[float, float]] = None,
+) -> Tuple[tomographicModels, dict, tuple]:
+    """
+    LEAP cone-beam model of projections shaped like ``info`` taken at
+    ``phis``, with the volume and filter ``params`` ask for. ``center`` is
+    the (row, column) of the detector center, the middle pixel by default.
+    """
+    num_cols, num_rows = info.dims[:2]
+    pix_w, pix_h = info.spacing[:2]
+
+    if center is None:
+        center = (0.5 * (num_rows - 1), 0.5 * (num_cols - 1))
+
+    ct = tomographicModels()
+    geometry = dict(
+        numAngles=len(phis),
+        numRows=num_rows,
+        numCols=num_cols,
+        pixelWidth=pix_w,
+        pixelHeight=pix_h,
+        centerRow=center[0],
+        centerCol=center[1],
+        phis=phis,
+        sod=params.sod,
+        sdd=params.sdd,
+    )
+    ct.set_conebeam(**geometry)
+    ct.set_default_volume()
+    if params.voxel_size is not None:
+        # same field of view, fewer voxels the larger they get
+        ct.set_default_volume(params.voxel_size / ct.get_voxelWidth())
+    if params.volume_dims is not None:
+        num_x, num_y, num_z = params.volume_dims
+        ct.set_volume(
+            num_x, num_y, num_z, ct.get_voxelWidth(), ct.get_voxelHeight()
+        )
+    ct.set_rampFilter(RAMP_FILTERS[params.filter])
+    spacing = (ct.get_voxelWidth(),) * 2 + (ct.get_voxelHeight(),)
+    return ct, geometry, spacing
+
+
+def _apodize(g: np.ndarray, ramp: RampFilter) -> None:
+    """
+    Window the detector rows of ``g`` in place for the ``ramp`` filter.
+
+    Only the cosine filter needs it, Ram-Lak times ``cos(pi f)`` with ``f``
+    in cycles per pixel, so it is zero at Nyquist. The rows are padded with
+    their edge values, the wrap-around of the FFT lands in the padding, and
+    filtered one projection at a time.
+    """
+    if ramp != RampFilter.COSINE:
+        return
+    num_cols = g.shape[-1]
+    n = 1 << int(np.ceil(np.log2(2 * num_cols)))
+    left = (n - num_cols) // 2
+    right = left + num_cols
+    pad = ((0, 0), (left, n - right))
+    window = np.cos(np.pi * np.fft.rfftfreq(n))
+    for k in range(len(g)):
+        rows = np.pad(g[k], pad, mode="edge")
+        rows = np.fft.irfft(np.fft.rfft(rows) * window, n)
+        g[k] = rows[:, left:right]
+
+
+def _reconstruct(
+    ct: tomographicModels,
+    g: np.ndarray,
+    f: np.ndarray,
+    params: ReconstructionParams,
+) -> None:
+    with metrics.timed(f"recon_{params.algorithm.value}"):
+        match params.algorithm:
+            case ReconAlgorithm.FBP:
+                _apodize(g, params.filter)
+                ct.FBP(g, f)
+            case ReconAlgorithm.SART:
+                ct.SART(g, f, params.num_iterations, params.num_subsets)
+            case ReconAlgorithm.SIRT:
+                ct.SIRT(g, f, params.num_iterations)
+
+
+def _cpu_threads(params: ReconstructionParams) -> ContextManager:
+    """Cap LEAP's OpenMP threads in the calling thread, if asked to."""
+    if params.num_threads is None:
+        return nullcontext()
+    return threadpool_limits(limits=params.num_threads, user_api="openmp")
+
+
+def _field_path(output_dir: str, name: Optional[str]) -> Optional[str]:
+    """Resolve a flat or dark field inside the simulation's outputs."""
+    if name is None:
+        return None
+    root = Path(output_dir).resolve()
+    path = (root / name).resolve()
+    if not path.is_relative_to(root) or not path.is_file():
+        raise HTTPException(
+            404, detail=f"Field image '{name}' not found in {output_dir}"
+        )
+    return str(path)
+
+
+def _preprocessing(
+    params: ReconstructionParams, output_dir: str
+) -> Preprocessing:
+    return Preprocessing(
+        angle_step=params.angle_step,
+        roi=None if params.roi is None else tuple(params.roi),
+        binning=params.binning,
+        flat_path=_field_path(output_dir, params.flat_field),
+        dark_path=_field_path(output_dir, params.dark_field),
+        log=params.log_transform,
+    )
+
+
+def _field_digests(prep: Preprocessing) -> List[Optional[str]]:
+    return [
+        None if path is None else file_digest(*metaimage.data_files(path))
+        for path in (prep.flat_path, prep.dark_path)
+    ]
+
+
+def _preprocessed(proj_path: str, out_path: str, prep: Preprocessing) -> str:
+    """Preprocess ``proj_path`` into ``out_path``, or restore it from cache."""
+    cache = get_preprocess_cache()
+    key = cache.key(
+        "preprocess",
+        file_digest(*metaimage.data_files(proj_path)),
+        prep.angle_step,
+        prep.roi,
+        prep.binning,
+        prep.log,
+        *_field_digests(prep),
+    )
+    if cache.restore(key, os.path.dirname(out_path)):
+        return out_path
+
+    with metrics.timed("preprocess"):
+        preprocess(proj_path, out_path, prep)
+    cache.store(key, metaimage.data_files(out_path))
+    return out_path
+
+
+def _recon_key(
+    proj_path: str, params: ReconstructionParams, prep: Preprocessing
+) -> str:
+    info = metaimage.read_info(proj_path)
+    # neither threads nor the memory budget change the result
+    options = params.model_dump(
+        mode="json", exclude={"num_threads", "memory_budget_mb"}
+    )
+    return get_recon_cache().key(
+        "recon",
+        file_digest(*metaimage.data_files(proj_path)),
+        options,
+        *_field_digests(prep),
+        info.dims[2],
+        *info.spacing[:2],
+    )
+
+
+def _shard_bounds(
+    num_runs: int,
+    num_workers: int,
+    shard_size: Optional[int] = None,
+    streams: bool = False,
+) -> np.ndarray:
+    """
+    First run of every contiguous shard and ``num_runs``. By default one
+    shard per worker, or when ``streams`` up to ``PREVIEW_SHARDS`` of at
+    least two runs, so an incremental reconstruction grows as they finish.
+    """
+    if shard_size is not None:
+        return np.append(np.arange(0, num_runs, shard_size), num_runs)
+    num_shards = num_workers
+    if streams:
+        num_shards = max(num_shards, min(PREVIEW_SHARDS, num_runs // 2))
+    return np.linspace(0, num_runs, num_shards + 1, dtype=int)
+
+
+def _angular_step(phis: np.ndarray) -> float:
+    """Angle between projections as LEAP infers it, the span over the gaps."""
+    return float(phis[-1] - phis[0]) / (len(phis) - 1)
+
+
+class IncrementalReconstruction:
+    """
+    FBP of a projection stack accumulated shard by shard.
+
+    FBP is linear in the projections and filters every projection on its
+    own, so each shard is filtered and backprojected by a model holding only
+    its own angles, weighted by the full scan's angular step, and summed
+    into the volume a single FBP of the merged stack would give. A shard
+    thus costs its share of a reconstruction, not a whole one. The running
+    sum lives in a mapped ``reconstruction.mhd``, previews can read it while
+    the simulation is still going. Iterative algorithms and preprocessed
+    projections are not accumulated, they are reconstructed once all shards
+    are merged, and neither are shards of a single angle, whose angular
+    step LEAP cannot infer.
+    """
+
+    def __init__(
+        self,
+        out_path: str,
+        num_angles: int,
+        params: ReconstructionParams,
+        budget: int,
+        prep: Preprocessing,
+    ):
+        self.out_path = out_path
+        self.num_angles = num_angles
+        self.params = params
+        self.budget = budget
+        self.angles_done = 0
+        # set once the first shard tells the detector size
+        self.enabled: Optional[bool] = None
+        if not self.accumulates(params, prep):
+            self.enabled = False
+        self._phis = _angles(num_angles, params)
+        self._info: Optional[metaimage.MetaImageInfo] = None
+        self._volume_args: Optional[tuple] = None
+        self._volume: Optional[np.memmap] = None
+
+    @staticmethod
+    def accumulates(params: ReconstructionParams, prep: Preprocessing) -> bool:
+        """Whether shards reconstructed with ``params`` can be accumulated."""
+        return params.algorithm == ReconAlgorithm.FBP and prep.identity
+
+    @property
+    def complete(self) -> bool:
+        return bool(self.enabled) and self.angles_done == self.num_angles
+
+    def add(self, shard_path: str, first: int) -> None:
+        """Filter and backproject the shard of the angles from ``first`` on."""
+        info = metaimage.read_info(shard_path)
+        if self.enabled is None:
+            self._open(info)
+        num_shard = info.dims[2]
+        if num_shard < 2:
+            # the remaining shards are left to the reconstruction at the end
+            self.enabled = False
+        if not self.enabled:
+            return
+
+        end = first + num_shard
+        phis = self._phis[first:end]
+        ct, _, _ = _conebeam(self._info, phis, self.params)
+        ct.set_volume(*self._volume_args)
+        # filtering works in place, never on the shard's mapped file
+        g = np.array(metaimage.open_memmap(shard_path), dtype=np.float32)
+        f = ct.allocate_volume()
+        with metrics.timed("recon_incremental"), _cpu_threads(self.params):
+            _apodize(g, self.params.filter)
+            ct.filterProjections(g)
+            ct.weightedBackproject(g, f)
+            f *= _angular_step(self._phis) / _angular_step(phis)
+            self._volume += f
+        self._volume.flush()
+        self.angles_done += num_shard
+
+    def _open(self, info: metaimage.MetaImageInfo) -> None:
+        if self.num_angles < 2:
+            self.enabled = False
+            return
+        ct, _, spacing = _conebeam(info, self._phis, self.params)
+        shape = (ct.get_numZ(), ct.get_numY(), ct.get_numX())
+        proj_bytes = 4 * int(np.prod(info.shape))
+        vol_bytes = 4 * int(np.prod(shape))
+        # one shard's projections and volume, and the running sum
+        self.enabled = proj_bytes + 2 * vol_bytes <= self.budget
+        if not self.enabled:
+            return
+
+        _unlink_image(self.out_path)
+        self._info = info
+        # every shard model reconstructs into the full scan's volume
+        self._volume_args = (
+            ct.get_numX(),
+            ct.get_numY(),
+            ct.get_numZ(),
+            ct.get_voxelWidth(),
+            ct.get_voxelHeight(),
+            ct.get_offsetX(),
+            ct.get_offsetY(),
+            ct.get_offsetZ(),
+        )
+        self._volume = metaimage.create_memmap(self.out_path, shape, spacing)
 
 
 class SimulationService:
@@ -30,11 +434,9 @@ class SimulationService:
 
     async def get_gate_sim_without_sources(self, id: int) -> gate.Simulation:
         sim = await self.read_simulation(id)
-        gate_sim = gate.Simulation()
-        gate_sim.from_json_file(
+        return get_archive_cache().checkout(
             f"{sim.output_dir}/{sim.json_archive_filename}"
         )
-        return gate_sim
 
     async def create_simulation(
         self, sim_create: SimulationCreate
@@ -50,7 +452,7 @@ class SimulationService:
             run_timing_intervals=run_intervals,
         )
         try:
-            gate_sim.to_json_file()
+            get_archive_cache().save(gate_sim)
         except OSError as e:
             raise HTTPException(
                 500, detail=f"Failed to write simulation archive: {e}"
@@ -68,6 +470,24 @@ class SimulationService:
             )
         return SimulationRead.model_validate(sim)
 
+    async def read_run_plan(self, id: int) -> RunPlan:
+        """The simulation, its volumes and its sources, loaded at once."""
+        with metrics.timed("read_run_plan"):
+            sim: Simulation | None = await self.sim_repo.read_with_children(id)
+            if not sim:
+                raise HTTPException(
+                    status_code=404,
+                    detail=f"Simulation with id {id} not found",
+                )
+            return RunPlan.model_validate(
+                {
+                    "simulation": sim,
+                    "volumes": sim.volumes,
+                    "sources": sim.sources,
+                },
+                from_attributes=True,
+            )
+
     async def update_simulation(
         self, id: int, sim_update: SimulationUpdate
     ) -> MessageResponse:
@@ -84,7 +504,7 @@ class SimulationService:
             run_timing_intervals=run_intervals,
         )
         try:
-            gate_sim.to_json_file()
+            get_archive_cache().save(gate_sim)
         except OSError as e:
             raise HTTPException(
                 500, detail=f"Failed to write simulation archive: {e}"
@@ -99,6 +519,9 @@ class SimulationService:
             raise HTTPException(
                 status_code=404, detail=f"Simulation with id {id} not found"
             )
+        get_archive_cache().invalidate(
+            os.path.join(sim.output_dir, sim.json_archive_filename)
+        )
         if os.path.exists(sim.output_dir):
             shutil.rmtree(sim.output_dir)
         return {"message": f"Simulation '{sim.name}' deleted successfully"}
@@ -121,22 +544,36 @@ class SimulationService:
             )
         return {"message": "Simulation {sim.name} imported successfully!"}
 
-    async def export_simulation(self, id: int) -> MessageResponse:
+    async def export_simulation(
+        self,
+        id: int,
+        include: Optional[List[str]] = None,
+        exclude: Optional[List[str]] = None,
+        compression: ExportCompression = ExportCompression.AUTO,
+    ) -> Tuple[Iterator[bytes], str]:
         sim = await self.read_simulation(id)
-        output_dir = os.path.abspath(sim.output_dir)
-        zip_path = f"{output_dir}.zip"
-
-        if os.path.exists(zip_path):
-            os.remove(zip_path)
-
-        try:
-            shutil.make_archive(
-                base_name=output_dir, format="zip", root_dir=output_dir
+        output_dir = Path(sim.output_dir)
+        if not output_dir.is_dir():
+            raise HTTPException(
+                404, detail=f"Simulation {id} has no outputs to export"
             )
-        except OSError as e:
-            raise HTTPException(500, detail=f"Failed to compress outputs: {e}")
 
-        return zip_path
+        entries = []
+        for path in sorted(output_dir.rglob("*")):
+            if not path.is_file():
+                continue
+            arcname = path.relative_to(output_dir).as_posix()
+            if include and not any(fnmatch(arcname, p) for p in include):
+                continue
+            if exclude and any(fnmatch(arcname, p) for p in exclude):
+                continue
+            if compression == ExportCompression.AUTO:
+                compress = path.suffix.lower() not in INCOMPRESSIBLE_SUFFIXES
+            else:
+                compress = compression == ExportCompression.DEFLATE
+            entries.append((path, arcname, compress))
+
+        return iter_zip(entries), f"{sim.name}.zip"
 
     async def view_simulation(
         self, id: int, src_repo: SourceRepository
@@ -150,67 +587,805 @@ class SimulationService:
         return {"message": "Simulation visualization ended"}
 
     async def run_simulation(
-        self, id: int, src_repo: SourceRepository, vol_repo: VolumeRepository
-    ) -> MessageResponse:
-        sim_read: SimulationRead = await self.read_simulation(id)
-        gate_sim: gate.Simulation = await get_gate_sim(
-            id, self.sim_repo, src_repo
+        self, id: int, jobs: JobManager, params: RunParams
+    ) -> JobRead:
+        plan = await self.read_run_plan(id)
+        sim_read = plan.simulation
+        num_runs = sim_read.num_runs
+
+        output_dir = sim_read.output_dir
+        recon_params = params.reconstruct
+        prep = None
+        streams = False
+        if recon_params is not None:
+            prep = _preprocessing(recon_params, output_dir)
+            streams = IncrementalReconstruction.accumulates(recon_params, prep)
+
+        # split the projection angles into contiguous shards, more of them
+        # only if they can be reconstructed as they finish, at most
+        # num_workers simulated at once
+        num_workers = params.num_workers
+        if num_workers is None:
+            num_workers = 1
+            if sim_read.parallel_mode == ParallelMode.PROCESSES:
+                num_workers = sim_read.number_of_threads
+        num_workers = min(num_workers, num_runs)
+        bounds = _shard_bounds(
+            num_runs, num_workers, params.shard_size, streams
         )
+        num_shards = len(bounds) - 1
+
+        fingerprint = self._run_fingerprint(plan, params, bounds)
+        scene = None
+        if params.mode != RunMode.MONTE_CARLO:
+            # reject unsupported geometries before anything is queued
+            scene = self._raycast_scene(plan)
+        cached = None
+        if not params.force:
+            cached = self._cached_run(output_dir, fingerprint)
+        if cached is not None:
+            return self._restore_run(
+                id, jobs, output_dir, cached, fingerprint, params.reconstruct
+            ).read()
+
+        base_seed = params.seed
+        if base_seed is None:
+            base_seed = secrets.randbelow(2**31)
+        if scene is not None:
+            scatter_sim = None
+            if params.mode == RunMode.HYBRID:
+                scatter_sim = self.prepare_run(
+                    plan,
+                    output_dir,
+                    base_seed,
+                    slice(0, num_runs, params.scatter_angle_step),
+                    scatter_only=True,
+                )
+                for src in scatter_sim.source_manager.sources.values():
+                    src.activity *= params.scatter_fraction
+            return self._run_fast(
+                id, jobs, sim_read, scene, fingerprint, params, scatter_sim
+            ).read()
+
+        shard_dirs = [output_dir]
+        if num_shards > 1:
+            shard_dirs = [
+                self._shard_dir(output_dir, k) for k in range(num_shards)
+            ]
 
+        gate_sims: list[gate.Simulation] = [
+            self.prepare_run(
+                plan,
+                shard_dirs[k],
+                base_seed + k,
+                slice(bounds[k], bounds[k + 1]),
+            )
+            for k in range(num_shards)
+        ]
+        if num_shards == 1:
+            gate_sims[0].progress_bar = True
+
+        events_expected = int(
+            sum(
+                src.activity
+                for src in gate_sims[0].source_manager.sources.values()
+            )
+            * gate_sims[0].number_of_threads
+            * num_runs
+            * sim_read.run_len
+            * UNIT_TO_GATE[Unit.SEC]
+        )
+
+        proj_path = os.path.join(output_dir, PROJECTION_FILE)
+        loop = asyncio.get_running_loop()
+        recon = None
+        if recon_params is not None:
+            recon = IncrementalReconstruction(
+                os.path.join(output_dir, RECONSTRUCTION_FILE),
+                num_runs,
+                recon_params,
+                self._memory_budget(recon_params),
+                prep,
+            )
+
+        slots = asyncio.Semaphore(num_workers)
+
+        async def run_shard(k: int) -> int:
+            async with slots:
+                with metrics.timed("gate_run"):
+                    await jobs.run_in_process(
+                        run_gate_simulation, gate_sims[k]
+                    )
+            await run_in_threadpool(
+                hits.merge_thread_files,
+                os.path.join(shard_dirs[k], HITS_FILE),
+            )
+            return k
+
+        # everything below runs after the request (and its DB session) ended
+        async def run(job: Job) -> dict:
+            # outputs are about to change, the last run no longer matches them
+            run_file = os.path.join(output_dir, RUN_FILE)
+            if os.path.exists(run_file):
+                os.remove(run_file)
+
+            job.update(
+                stage="simulating",
+                cached=False,
+                fingerprint=fingerprint,
+                num_runs=num_runs,
+                num_workers=num_workers,
+                num_shards=num_shards,
+                runs_completed=0,
+                events_expected=events_expected,
+                events_simulated=0,
+            )
+            tasks = [
+                asyncio.create_task(run_shard(k)) for k in range(num_shards)
+            ]
+            try:
+                runs_completed = 0
+                for task in asyncio.as_completed(tasks):
+                    k = await task
+                    runs_completed += int(bounds[k + 1] - bounds[k])
+                    fraction = runs_completed / num_runs
+                    # Geant4 reports nothing per event to Python, progress is
+                    # tracked per finished shard
+                    job.update(
+                        progress=0.9 * fraction,
+                        runs_completed=runs_completed,
+                        events_simulated=int(events_expected * fraction),
+                    )
+                    if recon is not None:
+                        # the remaining shards keep simulating meanwhile
+                        await run_in_threadpool(
+                            recon.add,
+                            os.path.join(shard_dirs[k], PROJECTION_FILE),
+                            int(bounds[k]),
+                        )
+                        job.update(angles_reconstructed=recon.angles_done)
+
+                if num_shards > 1:
+                    job.update(stage="merging shards")
+                    await run_in_threadpool(
+                        self._merge_shards, shard_dirs, output_dir
+                    )
+            except BaseException:
+                for task in tasks:
+                    task.cancel()
+                await asyncio.gather(*tasks, return_exceptions=True)
+                raise
+            finally:
+                if num_shards > 1:
+                    # merged into the outputs, or of a run that failed
+                    await run_in_threadpool(
+                        shutil.rmtree,
+                        os.path.join(output_dir, SHARDS_DIR),
+                        ignore_errors=True,
+                    )
+
+            result = {
+                "projection": proj_path,
+                "hits": [os.path.join(output_dir, HITS_FILE)],
+                "seeds": [base_seed + k for k in range(num_shards)],
+            }
+            self._save_run(output_dir, fingerprint, result)
+            if recon is None:
+                return result
+
+            if recon.complete:
+                job.update(stage="caching reconstruction", progress=0.95)
+                await run_in_threadpool(
+                    get_recon_cache().store,
+                    _recon_key(proj_path, recon_params, prep),
+                    metaimage.data_files(recon.out_path),
+                )
+            else:
+                # too large to accumulate in memory, reconstruct in slabs
+                def report(stage: str, progress: float) -> None:
+                    loop.call_soon_threadsafe(
+                        job.update, stage, 0.9 + 0.1 * progress
+                    )
+
+                await run_in_threadpool(
+                    self._do_recon, proj_path, output_dir, recon_params, report
+                )
+            result["reconstruction"] = recon.out_path
+            return result
+
+        job = jobs.submit(id, "run", run)
+        return job.read()
+
+    def prepare_run(
+        self,
+        plan: RunPlan,
+        output_dir: str,
+        seed: int,
+        runs: slice = slice(None),
+        scatter_only: bool = False,
+    ) -> gate.Simulation:
+        """
+        Load the GATE simulation set up to simulate ``runs`` only, recording
+        the photons entering the detector instead of projections if
+        ``scatter_only``.
+        """
+        sim_read = plan.simulation
+        with metrics.timed("get_gate_sim"):
+            gate_sim = build_gate_sim(sim_read, plan.sources)
         gate_sim.visu = False
-        gate_sim.progress_bar = True
+        gate_sim.progress_bar = False
+        gate_sim.random_seed = seed
+        gate_sim.run_timing_intervals = self._compute_run_timing_intervals(
+            sim_read.num_runs, sim_read.run_len
+        )[runs]
+        gate_sim.output_dir = output_dir
 
-        await self._init_volumes(id, sim_read, gate_sim, vol_repo)
-        self._init_actors(sim_read, gate_sim)
+        with metrics.timed("init_volumes"):
+            self._init_volumes(plan, gate_sim, runs)
+        with metrics.timed("init_actors"):
+            self._init_actors(sim_read, gate_sim, scatter_only)
+        return gate_sim
 
-        await run_in_threadpool(gate_sim.run, start_new_process=True)
+    @staticmethod
+    def _run_fingerprint(
+        plan: RunPlan, params: RunParams, bounds: np.ndarray
+    ) -> str:
+        """
+        Digest of everything a run's outputs depend on: the simulation,
+        volume and source rows, the GATE archive and, only when a seed is
+        given, the seed and how the runs are sharded.
+        """
+        sim_read = plan.simulation
+        exclude = {"id", "simulation_id"}
+        vols = sorted(
+            (v.model_dump(mode="json", exclude=exclude) for v in plan.volumes),
+            key=lambda v: v["name"],
+        )
+        srcs = sorted(
+            (s.model_dump(mode="json", exclude=exclude) for s in plan.sources),
+            key=lambda s: s["name"],
+        )
+        archive = os.path.join(
+            sim_read.output_dir, sim_read.json_archive_filename
+        )
+        seeding = None
+        if params.seed is not None:
+            seeding = [params.seed, bounds.tolist()]
 
-        return {"message": "Simulation finished running"}
+        return DiskCache.key(
+            "run",
+            sim_read.model_dump(
+                mode="json",
+                include={
+                    "num_runs",
+                    "run_len",
+                    "number_of_threads",
+                    "parallel_mode",
+                    "actor",
+                },
+            ),
+            vols,
+            srcs,
+            file_digest(archive) if os.path.exists(archive) else None,
+            seeding,
+            params.model_dump(
+                mode="json",
+                include=(
+                    {"mode", *HYBRID_PARAMS}
+                    if params.mode == RunMode.HYBRID
+                    else {"mode"}
+                ),
+            ),
+        )
 
-    async def reconstruct_simulation(
-        self, id: int, sod: float, sdd: float
+    @staticmethod
+    def _raycast_scene(plan: RunPlan) -> raycast.Scene:
+        """Geometry of a fast run, in Gate units."""
+        sim_read = plan.simulation
+        vols = plan.volume_map
+        srcs = plan.sources
+        actor = sim_read.actor
+        detector = vols.get(actor.attached_to)
+        if (
+            detector is None
+            or detector.mother is None
+            or not isinstance(detector.shape, BoxShape)
+        ):
+            raise HTTPException(
+                422,
+                detail=(
+                    "The fast mode needs the projection actor attached to "
+                    f"a box volume, not to '{actor.attached_to}'"
+                ),
+            )
+        if not srcs:
+            raise HTTPException(422, detail="The simulation has no sources")
+        voxelized = sorted(
+            v.name for v in vols.values() if isinstance(v.shape, ImageShape)
+        )
+        if voxelized:
+            raise HTTPException(
+                422,
+                detail=(
+                    f"Image volumes {voxelized} are not ray-cast, run them "
+                    "in the Monte Carlo mode"
+                ),
+            )
+        for src in srcs:
+            if src.particle != "gamma" or not any(src.position.size):
+                raise HTTPException(
+                    422,
+                    detail=(
+                        f"Source '{src.name}' is not a gamma box source, "
+                        "the fast mode only ray-casts those"
+                    ),
+                )
+
+        world = next(v for v in vols.values() if v.mother is None)
+
+        def in_detector(name: Optional[str]) -> bool:
+            while name in vols:
+                if name == detector.name:
+                    return True
+                name = vols[name].mother
+            return False
+
+        poses = world_poses(vols, sim_read.num_runs)
+
+        def body(vol: VolumeRead) -> raycast.Body:
+            unit = UNIT_TO_GATE[vol.shape.unit]
+            match vol.shape:
+                case BoxShape():
+                    return raycast.Body(
+                        vol.name,
+                        *poses[vol.name],
+                        half_size=np.asarray(vol.shape.size) * unit / 2,
+                    )
+                case SphereShape():
+                    return raycast.Body(
+                        vol.name,
+                        *poses[vol.name],
+                        radii=(vol.shape.rmin * unit, vol.shape.rmax * unit),
+                    )
+
+        # the detector and its daughters detect rather than attenuate
+        inside = [v for v in vols.values() if v.mother is not None]
+        bodies = [body(v) for v in inside if not in_detector(v.name)]
+
+        beams = []
+        for src in srcs:
+            energy = (
+                src.energy.energy
+                * UNIT_TO_GATE[src.energy.unit]
+                / UNIT_TO_GATE[Unit.KEV]
+            )
+            attenuation.check_materials(
+                {v.material for v in vols.values()}, energy
+            )
+
+            def mu(vol: VolumeRead) -> float:
+                return attenuation.mu(vol.material, energy)
+
+            excess = {
+                v.name: mu(v) - mu(vols.get(v.mother, world)) for v in inside
+            }
+            excess[detector.name] = mu(detector)
+            factor = UNIT_TO_GATE[src.position.unit]
+            photons = src.activity * UNIT_TO_GATE[src.unit]
+            photons *= sim_read.run_len * UNIT_TO_GATE[Unit.SEC]
+            beams.append(
+                raycast.Beam(
+                    focus=np.asarray(src.focus_point) * factor,
+                    center=np.asarray(src.position.translation) * factor,
+                    size=np.asarray(src.position.size) * factor,
+                    photons=photons,
+                    mu_world=mu(world),
+                    mu=excess,
+                )
+            )
+
+        return raycast.Scene(
+            detector=body(detector),
+            material=detector.material,
+            size=tuple(actor.size),
+            spacing=tuple(s * UNIT_TO_GATE[Unit.MM] for s in actor.spacing),
+            beams=beams,
+            bodies=bodies,
+        )
+
+    def _run_fast(
+        self,
+        id: int,
+        jobs: JobManager,
+        sim_read: SimulationRead,
+        scene: raycast.Scene,
+        fingerprint: str,
+        params: RunParams,
+        scatter_sim: Optional[gate.Simulation] = None,
+    ) -> Job:
+        """Ray-cast the primaries, plus the scatter of ``scatter_sim``."""
+        output_dir = sim_read.output_dir
+        proj_path = os.path.join(output_dir, PROJECTION_FILE)
+        recon_params = params.reconstruct
+        loop = asyncio.get_running_loop()
+
+        async def run(job: Job) -> dict:
+            def report(stage: str, progress: float) -> None:
+                # called from the worker thread
+                loop.call_soon_threadsafe(job.update, stage, progress)
+
+            run_file = os.path.join(output_dir, RUN_FILE)
+            if os.path.exists(run_file):
+                os.remove(run_file)
+            job.update(
+                stage="ray casting",
+                cached=False,
+                fingerprint=fingerprint,
+                num_runs=sim_read.num_runs,
+            )
+            result = {
+                "projection": proj_path,
+                "hits": [],
+                "mode": params.mode.value,
+            }
+            scatter_of = None
+            if scatter_sim is not None:
+                # stale files would be read along with the new ones
+                scatter_path = os.path.join(output_dir, SCATTER_FILE)
+                for path in hits.output_files(scatter_path):
+                    os.remove(path)
+                job.update(stage="simulating scatter")
+                with metrics.timed("gate_run"):
+                    await jobs.run_in_process(run_gate_simulation, scatter_sim)
+                job.update(stage="estimating scatter", progress=0.6)
+                with metrics.timed("scatter"):
+                    scatter_of = await run_in_threadpool(
+                        self._estimate_scatter, sim_read, scene, params
+                    )
+                result["scatter"] = hits.output_files(scatter_path)
+                result["seeds"] = [scatter_sim.random_seed]
+
+            start = 0.0 if scatter_of is None else 0.7
+            with metrics.timed("raycast"):
+                await run_in_threadpool(
+                    self._write_raycast,
+                    scene,
+                    sim_read.num_runs,
+                    sim_read.actor.origin_as_image_center,
+                    proj_path,
+                    lambda fraction: report(
+                        "ray casting", start + (0.9 - start) * fraction
+                    ),
+                    scatter_of,
+                )
+
+            self._save_run(output_dir, fingerprint, result)
+            if recon_params is None:
+                return result
+            out_path = await run_in_threadpool(
+                self._do_recon,
+                proj_path,
+                output_dir,
+                recon_params,
+                lambda stage, progress: report(stage, 0.9 + 0.1 * progress),
+            )
+            return {**result, "reconstruction": out_path}
+
+        return jobs.submit(id, "run", run)
+
+    @staticmethod
+    def _write_raycast(
+        scene: raycast.Scene,
+        num_runs: int,
+        origin_as_image_center: bool,
+        proj_path: str,
+        report: Callable[[float], None],
+        scatter_of: Optional[Callable[[int], np.ndarray]] = None,
     ) -> str:
+        """
+        Ray-cast every run into a stack laid out like GATE's, adding
+        ``scatter_of(run)`` if given.
+        """
+        nx, ny = scene.size
+        sx, sy = scene.spacing
+        origin = None
+        if origin_as_image_center:
+            origin = [-(nx * sx) / 2 + sx / 2, -(ny * sy) / 2 + sy / 2, 0.0]
+        os.makedirs(os.path.dirname(proj_path), exist_ok=True)
+        _unlink_image(proj_path)
+        out = metaimage.create_memmap(
+            proj_path, (num_runs, ny, nx), (sx, sy, 1.0), origin=origin
+        )
+        raycast.project(scene, out, report)
+        if scatter_of is not None:
+            for run in range(num_runs):
+                out[run] += scatter_of(run)
+        out.flush()
+        return proj_path
+
+    @staticmethod
+    def _estimate_scatter(
+        sim_read: SimulationRead, scene: raycast.Scene, params: RunParams
+    ) -> Callable[[int], np.ndarray]:
+        """Smoothed scatter per run from the phase space of a hybrid run."""
+        # the tree holds particle names, which cannot be merged, every
+        # thread's file is read instead
+        paths = hits.output_files(
+            os.path.join(sim_read.output_dir, SCATTER_FILE)
+        )
+        num_runs = sim_read.num_runs
+        detector = scene.detector
+        run_edges = (
+            np.arange(num_runs + 1) * sim_read.run_len * UNIT_TO_GATE[Unit.SEC]
+        )
+        coarse = scatter.bin_scatter(
+            paths,
+            run_edges,
+            params.scatter_angle_step,
+            detector.rotations,
+            detector.translations,
+            scene.size,
+            scene.spacing,
+            params.scatter_binning,
+            2 * detector.half_size[2],
+            lambda energy: attenuation.mu(
+                scene.material, energy / UNIT_TO_GATE[Unit.KEV]
+            ),
+            1 / params.scatter_fraction,
+        )
+        return scatter.upsampler(
+            coarse,
+            num_runs,
+            params.scatter_angle_step,
+            scene.size,
+            params.scatter_binning,
+        )
+
+    @staticmethod
+    def _cached_run(output_dir: str, fingerprint: str) -> Optional[dict]:
+        """The last run's result if it had ``fingerprint`` and still exists."""
+        try:
+            with open(os.path.join(output_dir, RUN_FILE)) as f:
+                record = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if record.get("fingerprint") != fingerprint:
+            return None
+
+        result = record["result"]
+        outputs = [result["projection"], *result["hits"]]
+        if not all(os.path.exists(path) for path in outputs):
+            return None
+        return result
+
+    @staticmethod
+    def _save_run(output_dir: str, fingerprint: str, result: dict) -> None:
+        with open(os.path.join(output_dir, RUN_FILE), "w") as f:
+            json.dump({"fingerprint": fingerprint, "result": result}, f)
+
+    def _restore_run(
+        self,
+        id: int,
+        jobs: JobManager,
+        output_dir: str,
+        result: dict,
+        fingerprint: str,
+        recon_params: Optional[ReconstructionParams],
+    ) -> Job:
+        async def restore(job: Job) -> dict:
+            job.update(
+                stage="restored from cache",
+                cached=True,
+                fingerprint=fingerprint,
+            )
+            if recon_params is None:
+                return result
+            out_path = await run_in_threadpool(
+                self._do_recon, result["projection"], output_dir, recon_params
+            )
+            return {**result, "reconstruction": out_path}
+
+        return jobs.submit(id, "run", restore)
+
+    async def reconstruct_simulation(
+        self, id: int, params: ReconstructionParams, jobs: JobManager
+    ) -> JobRead:
         sim = await self.read_simulation(id)
-        proj_path = os.path.join(sim.output_dir, "output/projection.mhd")
+        proj_path = os.path.join(sim.output_dir, PROJECTION_FILE)
         if not os.path.exists(proj_path):
             raise HTTPException(
                 404, detail=f"projection.mhd not found at {proj_path}"
             )
+        # fail before queueing if a field image is missing
+        _preprocessing(params, sim.output_dir)
+
+        loop = asyncio.get_running_loop()
+
+        async def reconstruct(job: Job) -> dict:
+            def report(stage: str, progress: float) -> None:
+                # called from the worker thread
+                loop.call_soon_threadsafe(job.update, stage, progress)
+
+            out_path = await run_in_threadpool(
+                self._do_recon, proj_path, sim.output_dir, params, report
+            )
+            return {"reconstruction": out_path}
+
+        job = jobs.submit(id, "reconstruct", reconstruct)
+        return job.read()
+
+    async def preview_projection(
+        self, id: int, index: int, size: int, fmt: PreviewFormat
+    ) -> Tuple[bytes, Tuple[int, int]]:
+        sim = await self.read_simulation(id)
+        path = self._require_output(sim, PROJECTION_FILE)
+        return await run_in_threadpool(
+            self._render_preview, path, None, index, size, fmt
+        )
 
+    async def preview_reconstruction(
+        self,
+        id: int,
+        plane: SlicePlane,
+        index: Optional[int],
+        size: int,
+        fmt: PreviewFormat,
+    ) -> Tuple[bytes, Tuple[int, int]]:
+        sim = await self.read_simulation(id)
+        path = self._require_output(sim, RECONSTRUCTION_FILE)
         return await run_in_threadpool(
-            self._do_recon, proj_path, sim.output_dir, sod, sdd
+            self._render_preview, path, plane, index, size, fmt
+        )
+
+    async def hit_statistics(
+        self,
+        id: int,
+        energy_bins: int,
+        heatmap_bins: int,
+        plane: HeatmapPlane,
+    ) -> HitStatistics:
+        sim = await self.read_simulation(id)
+        paths = self._hits_files(sim)
+        run_edges = (
+            np.arange(sim.num_runs + 1) * sim.run_len * UNIT_TO_GATE[Unit.SEC]
+        )
+
+        def compute() -> HitStatistics:
+            cache = get_preview_cache()
+            key = cache.key(
+                "hit_statistics",
+                [file_digest(path) for path in paths],
+                run_edges.tolist(),
+                energy_bins,
+                heatmap_bins,
+                plane,
+            )
+            entry = cache.lookup(key)
+            if entry is None:
+                with metrics.timed("hit_statistics"):
+                    stats = hits.statistics(
+                        paths, run_edges, energy_bins, heatmap_bins, plane
+                    )
+                content = HitStatistics.model_validate(stats)
+                entry = cache.store_bytes(
+                    key, {"statistics.json": content.model_dump_json()}
+                )
+            return HitStatistics.model_validate_json(
+                (entry / "statistics.json").read_bytes()
+            )
+
+        return await run_in_threadpool(compute)
+
+    @staticmethod
+    def _hits_files(sim: SimulationRead) -> List[str]:
+        """Hits file of the last run."""
+        try:
+            with open(os.path.join(sim.output_dir, RUN_FILE)) as f:
+                paths = json.load(f)["result"]["hits"]
+        except (OSError, ValueError, KeyError):
+            paths = [os.path.join(sim.output_dir, HITS_FILE)]
+        paths = [path for path in paths if os.path.exists(path)]
+        if not paths:
+            raise HTTPException(
+                404, detail=f"hits.root not found in {sim.output_dir}"
+            )
+        return paths
+
+    @staticmethod
+    def _require_output(sim: SimulationRead, filename: str) -> str:
+        path = os.path.join(sim.output_dir, filename)
+        if not os.path.exists(path):
+            raise HTTPException(
+                404, detail=f"{os.path.basename(path)} not found at {path}"
+            )
+        return path
+
+    @staticmethod
+    def _render_preview(
+        path: str,
+        plane: Optional[SlicePlane],
+        index: Optional[int],
+        size: int,
+        fmt: PreviewFormat,
+    ) -> Tuple[bytes, Tuple[int, int]]:
+        """
+        Cut one 2D slice out of a mapped image (the projection at ``index``
+        when ``plane`` is None), downsample and encode it, cached on disk.
+        """
+        volume = metaimage.open_memmap(path)
+        axis = {
+            None: 0,
+            SlicePlane.AXIAL: 0,
+            SlicePlane.CORONAL: 1,
+            SlicePlane.SAGITTAL: 2,
+        }[plane]
+        if index is None:
+            index = volume.shape[axis] // 2
+        if not 0 <= index < volume.shape[axis]:
+            raise HTTPException(
+                400,
+                detail=f"Index {index} out of range [0, {volume.shape[axis]})",
+            )
+
+        cache = get_preview_cache()
+        # hashing a multi-GB image to cut one slice costs more than the
+        # slice, and a reconstruction still being accumulated changes often
+        key = cache.key(
+            file_stamp(*metaimage.data_files(path)),
+            plane,
+            index,
+            size,
+            fmt,
         )
+        filename = f"preview.{fmt.value}"
+        entry = cache.lookup(key)
+        if entry is None:
+            img = preview.downsample(np.take(volume, index, axis=axis), size)
+            if axis > 0:
+                # show z upwards for the planes containing it
+                img = np.flipud(img)
+            content = (
+                preview.to_png(img)
+                if fmt == PreviewFormat.PNG
+                else np.ascontiguousarray(img, dtype="<f4").tobytes()
+            )
+            entry = cache.store_bytes(
+                key,
+                {filename: content, "shape": f"{img.shape[0]},{img.shape[1]}"},
+            )
+        h, w = (int(v) for v in (entry / "shape").read_text().split(","))
+        return (entry / filename).read_bytes(), (h, w)
 
     @staticmethod
-    async def _init_volumes(id, sim_read, gate_sim, vol_repo):
+    def _init_volumes(
+        plan: RunPlan, gate_sim: gate.Simulation, runs: slice = slice(None)
+    ):
+        sim_read = plan.simulation
+        vols = plan.volume_map
+        detector = vols.get(sim_read.actor.attached_to)
         for name in gate_sim.volume_manager.volume_names:
-            vol = await vol_repo.read(id, name)
-            data: VolumeRead = VolumeRead.model_validate(vol)
-            vol: VolumeGATE = gate_sim.volume_manager.get_volume(data.name)
-            if data.dynamic_params.enabled:
-                num_runs = sim_read.num_runs
-
-                angle_start = data.rotation.angle
-                angle_end = data.dynamic_params.angle_end or angle_start
-                angles = np.linspace(
-                    angle_start, angle_end, num_runs, endpoint=False
-                )
-                rotations = [
-                    R.from_euler(
-                        data.rotation.axis.value, a, degrees=True
-                    ).as_matrix()
-                    for a in angles
-                ]
-                vol.add_dynamic_parametrisation(rotation=rotations)
+            vol: VolumeGATE = gate_sim.volume_manager.get_volume(name)
+            apply_trajectory(
+                vol, vols[name], sim_read.num_runs, runs, detector
+            )
 
     @staticmethod
-    def _init_actors(sim_read, gate_sim):
+    def _init_actors(sim_read, gate_sim, scatter_only: bool = False):
         actor = sim_read.actor
         attached_to = actor.attached_to
         spacing = [s * UNIT_TO_GATE[Unit.MM] for s in actor.spacing]
         size = actor.size
         origin = actor.origin_as_image_center
 
+        if scatter_only:
+            if scatter.TREE not in gate_sim.actor_manager.actors.keys():
+                phsp = gate_sim.add_actor("PhaseSpaceActor", scatter.TREE)
+                phsp.attached_to = attached_to
+                phsp.attributes = scatter.ATTRIBUTES
+                phsp.steps_to_store = "entering"
+                phsp.output_filename = SCATTER_FILE
+            return
+
         if "Hits" not in gate_sim.actor_manager.actors.keys():
             hits_actor = gate_sim.add_actor(
                 "DigitizerHitsCollectionActor", "Hits"
@@ -221,7 +1396,7 @@ class SimulationService:
                 "PostPosition",
                 "GlobalTime",
             ]
-            hits_actor.output_filename = "output/hits.root"
+            hits_actor.output_filename = HITS_FILE
 
         if "Projection" not in gate_sim.actor_manager.actors.keys():
             proj_actor = gate_sim.add_actor(
@@ -232,44 +1407,190 @@ class SimulationService:
             proj_actor.spacing = spacing
             proj_actor.size = size
             proj_actor.origin_as_image_center = origin
-            proj_actor.output_filename = "output/projection.mhd"
+            proj_actor.output_filename = PROJECTION_FILE
+
+    @staticmethod
+    def _merge_shards(shard_dirs: List[str], output_dir: str) -> None:
+        """Merge the projections and hits of the shards into the outputs."""
+        with metrics.timed("merge_projections"):
+            SimulationService._merge_projections(
+                [os.path.join(d, PROJECTION_FILE) for d in shard_dirs],
+                os.path.join(output_dir, PROJECTION_FILE),
+            )
+        hits_path = os.path.join(output_dir, HITS_FILE)
+        if os.path.exists(hits_path):
+            os.remove(hits_path)
+        sources = [os.path.join(d, HITS_FILE) for d in shard_dirs]
+        sources = [path for path in sources if os.path.exists(path)]
+        if sources:
+            with metrics.timed("merge_hits"):
+                hits.merge_files(sources, hits_path)
+
+    @staticmethod
+    def _shard_dir(output_dir: str, k: int) -> str:
+        return os.path.join(output_dir, SHARDS_DIR, str(k))
 
     @staticmethod
-    def _do_recon(proj_path: str, out_dir: str, SOD: float, SDD: float) -> str:
-        proj_itk = sitk.ReadImage(proj_path)
-        proj = sitk.GetArrayFromImage(proj_itk).astype(np.float32)
-        NUM_ANGLES, NUM_ROWS, NUM_COLS = proj.shape
-        PIX_W, PIX_H, _ = proj_itk.GetSpacing()
-
-        ct = tomographicModels()
-        phis = ct.setAngleArray(NUM_ANGLES, 360.0)
-
-        if not (SOD > 0 and SDD > 0 and SDD > SOD):
-            raise ValueError(f"Must satisfy 0 < SOD={SOD} < SDD={SDD}.")
-
-        ct.set_conebeam(
-            numAngles=NUM_ANGLES,
-            numRows=NUM_ROWS,
-            numCols=NUM_COLS,
-            pixelWidth=PIX_W,
-            pixelHeight=PIX_H,
-            centerRow=0.5 * (NUM_ROWS - 1),
-            centerCol=0.5 * (NUM_COLS - 1),
-            phis=phis,
-            sod=SOD,
-            sdd=SDD,
+    def _merge_projections(paths: list[str], out_path: str) -> str:
+        """Stack projection shards, in angle order, into one image."""
+        info = metaimage.read_info(paths[0])
+        stacks = [metaimage.open_memmap(p) for p in paths]
+        shape = (sum(len(st) for st in stacks),) + stacks[0].shape[1:]
+
+        os.makedirs(os.path.dirname(out_path), exist_ok=True)
+        merged = metaimage.create_memmap(
+            out_path, shape, info.spacing, info.dtype, info.origin
         )
-        ct.set_default_volume()
+        start = 0
+        for stack in stacks:
+            end = start + len(stack)
+            merged[start:end] = stack
+            start = end
+        merged.flush()
+        return out_path
 
-        g = proj.astype(np.float32)
-        f = ct.allocate_volume()
-        ct.FBP(g, f)
+    @staticmethod
+    def _do_recon(
+        proj_path: str,
+        out_dir: str,
+        params: ReconstructionParams,
+        report: ProgressCallback = _ignore_progress,
+    ) -> str:
+        info = metaimage.read_info(proj_path)
+        NUM_ANGLES = info.dims[2]
+
+        out_path = os.path.join(out_dir, RECONSTRUCTION_FILE)
+        cache = get_recon_cache()
+        prep = _preprocessing(params, out_dir)
+        key = _recon_key(proj_path, params, prep)
+        if cache.restore(key, os.path.dirname(out_path)):
+            report("restored from cache", 1.0)
+            return out_path
+
+        _unlink_image(out_path)
+        # preprocessed stacks are linked from the cache next to the output
+        with (
+            tempfile.TemporaryDirectory(dir=os.path.dirname(out_path)) as tmp,
+            _cpu_threads(params),
+        ):
+            phis = _angles(NUM_ANGLES, params)[:: params.angle_step]
+            center = None
+            if not prep.identity:
+                report("preprocessing projections", 0.05)
+                center = detector_center(info, prep)
+                proj_path = _preprocessed(
+                    proj_path, os.path.join(tmp, "projection.mhd"), prep
+                )
+                info = metaimage.read_info(proj_path)
+            ct, geometry, spacing = _conebeam(info, phis, params, center)
 
-        recon_itk = sitk.GetImageFromArray(f)
-        out_path = os.path.join(out_dir, "output/reconstruction.mhd")
-        sitk.WriteImage(recon_itk, out_path)
+            budget = SimulationService._memory_budget(params)
+            vol_bytes = 4 * ct.get_numX() * ct.get_numY() * ct.get_numZ()
+            # iterative algorithms revisit all projections, only FBP slabs
+            if (
+                params.algorithm != ReconAlgorithm.FBP
+                or 4 * int(np.prod(info.dims)) + vol_bytes <= budget
+            ):
+                # copy-on-write mapping, pages are only read (and copied if
+                # LEAP filters in place) on demand, no upfront full read
+                if info.dtype == np.dtype(np.float32):
+                    g = metaimage.open_memmap(proj_path, mode="c")
+                else:
+                    g = metaimage.open_memmap(proj_path).astype(np.float32)
+                f = ct.allocate_volume()
+                report("reconstructing", 0.1)
+                _reconstruct(ct, g, f, params)
+                report("writing reconstruction", 0.9)
+                with metrics.timed("recon_write"):
+                    metaimage.write_image(out_path, f, spacing)
+            else:
+                SimulationService._recon_chunked(
+                    ct,
+                    geometry,
+                    proj_path,
+                    out_path,
+                    spacing,
+                    budget,
+                    report,
+                    params.filter,
+                )
+
+        report("caching reconstruction", 0.95)
+        with metrics.timed("recon_cache_store"):
+            cache.store(key, metaimage.data_files(out_path))
         return out_path
 
+    @staticmethod
+    def _memory_budget(params: ReconstructionParams) -> int:
+        mb = params.memory_budget_mb or get_settings().RECON_MEMORY_BUDGET_MB
+        return mb * 1024**2
+
+    @staticmethod
+    def _recon_chunked(
+        ct,
+        geometry: dict,
+        proj_path: str,
+        out_path: str,
+        spacing: tuple,
+        budget: int,
+        report: ProgressCallback = _ignore_progress,
+        ramp: RampFilter = RampFilter.SHEPP_LOGAN,
+    ) -> None:
+        """
+        FBP slab by slab of z-slices, reading only the detector rows a slab
+        projects onto and writing each slab straight into a mapped output.
+        """
+        nx, ny, nz = ct.get_numX(), ct.get_numY(), ct.get_numZ()
+        T, T_z = ct.get_voxelWidth(), ct.get_voxelHeight()
+        off_x, off_y = ct.get_offsetX(), ct.get_offsetY()
+        off_z = ct.get_offsetZ()
+
+        proj = metaimage.open_memmap(proj_path)
+        out = metaimage.create_memmap(out_path, (nz, ny, nx), spacing)
+
+        def set_slab(k0: int, k1: int) -> None:
+            slab_off_z = off_z + (0.5 * (k0 + k1 - 1) - 0.5 * (nz - 1)) * T_z
+            ct.set_volume(nx, ny, k1 - k0, T, T_z, off_x, off_y, slab_off_z)
+
+        row_bytes = 4 * geometry["numAngles"] * geometry["numCols"]
+        slice_bytes = 4 * nx * ny
+        slab_nz, k0 = nz, 0
+        while k0 < nz:
+            k1 = min(k0 + slab_nz, nz)
+            ct.set_conebeam(**geometry)
+            set_slab(k0, k1)
+            r0, r1 = (int(r) for r in ct.rowRangeNeededForBackprojection())
+            r0, r1 = max(r0, 0), min(r1, geometry["numRows"] - 1)
+
+            slab_bytes = (k1 - k0) * slice_bytes + (r1 - r0 + 1) * row_bytes
+            if slab_bytes > budget and k1 - k0 > 1:
+                slab_nz = (k1 - k0) // 2
+                continue
+
+            ct.set_conebeam(
+                **{
+                    **geometry,
+                    "numRows": r1 - r0 + 1,
+                    "centerRow": geometry["centerRow"] - r0,
+                }
+            )
+            set_slab(k0, k1)
+            report(
+                f"backprojecting slices {k0}-{k1} of {nz}", 0.1 + 0.8 * k0 / nz
+            )
+            with metrics.timed("recon_read"):
+                rows = slice(r0, r1 + 1)
+                g = np.array(proj[:, rows, :], dtype=np.float32)
+            f = ct.allocate_volume()
+            with metrics.timed("recon_fbp"):
+                _apodize(g, ramp)
+                ct.FBP(g, f)
+            with metrics.timed("recon_write"):
+                out[k0:k1] = f
+            k0 = k1
+
+        out.flush()
+
     @staticmethod
     def _handle_directory_rename(current, new_name: str) -> None:
         old_dir, new_dir = current.output_dir, f"./outputs/{new_name}"
@@ -21,5 +21,7 @@ def get_source_service(
     return SourceService(sims, repo)
 
 
-SourceRepositoryDep = Annotated[SourceRepository, Depends(get_source_repository)]
+SourceRepositoryDep = Annotated[
+    SourceRepository, Depends(get_source_repository)
+]
 SourceServiceDep = Annotated[SourceService, Depends(get_source_service)]
@@ -28,7 +28,9 @@ async def create_source(
 
 
 @router.get("/{simulation_id}/sources/{name}", response_model=SourceRead)
-async def read_source(service: SourceServiceDep, simulation_id: int, name: str):
+async def read_source(
+    service: SourceServiceDep, simulation_id: int, name: str
+):
     return await service.read_source(simulation_id, name)
 
 
@@ -42,6 +44,10 @@ async def update_source(
     return await service.update_source(simulation_id, name, source_update)
 
 
-@router.delete("/{simulation_id}/sources/{name}", response_model=MessageResponse)
-async def delete_source(service: SourceServiceDep, simulation_id: int, name: str):
+@router.delete(
+    "/{simulation_id}/sources/{name}", response_model=MessageResponse
+)
+async def delete_source(
+    service: SourceServiceDep, simulation_id: int, name: str
+):
     return await service.delete_source(simulation_id, name)
@@ -0,0 +1,25 @@
+from typing import Annotated
+from fastapi import Depends
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.database import get_session
+from app.simulations.dependencies import SimulationServiceDep
+from app.sweeps.repository import SweepRepository
+from app.sweeps.service import SweepService
+
+
+def get_sweep_repository(
+    db: Annotated[AsyncSession, Depends(get_session)],
+) -> SweepRepository:
+    return SweepRepository(db)
+
+
+def get_sweep_service(
+    sim_svc: SimulationServiceDep,
+    repo: Annotated[SweepRepository, Depends(get_sweep_repository)],
+) -> SweepService:
+    return SweepService(sim_svc, repo)
+
+
+SweepRepositoryDep = Annotated[SweepRepository, Depends(get_sweep_repository)]
+SweepServiceDep = Annotated[SweepService, Depends(get_sweep_service)]
@@ -0,0 +1,34 @@
+from sqlalchemy import (
+    JSON,
+    Column,
+    DateTime,
+    ForeignKey,
+    Integer,
+    String,
+    func,
+)
+from sqlalchemy.orm import relationship
+from app.core import Base
+
+
+class Sweep(Base):
+    __tablename__ = "sweeps"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    simulation_id = Column(
+        Integer,
+        ForeignKey("simulations.id", ondelete="CASCADE"),
+        index=True,
+        nullable=False,
+    )
+
+    job_id = Column(String, nullable=True)
+    status = Column(String, default="queued", nullable=False)
+    output_dir = Column(String, nullable=True)
+    params = Column(JSON, nullable=False)
+    variants = Column(JSON, default=list, nullable=False)
+    created_at = Column(
+        DateTime(timezone=True), server_default=func.now(), nullable=False
+    )
+
+    simulation = relationship("Simulation", back_populates="sweeps")
@@ -0,0 +1,56 @@
+from typing import List
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import update
+from sqlalchemy.future import select
+from app.jobs.schema import JobStatus
+from app.sweeps.model import Sweep
+from app.sweeps.schema import SweepCreate
+
+
+class SweepRepository:
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    async def create(self, sim_id: int, sweep_create: SweepCreate) -> Sweep:
+        sweep = Sweep(
+            simulation_id=sim_id,
+            params=sweep_create.model_dump(mode="json"),
+            variants=[],
+        )
+        self.session.add(sweep)
+        await self.session.commit()
+        await self.session.refresh(sweep)
+        return sweep
+
+    async def read_all(self, sim_id: int) -> List[Sweep]:
+        result = await self.session.execute(
+            select(Sweep).where(Sweep.simulation_id == sim_id)
+        )
+        return result.scalars().all()
+
+    async def read(self, sim_id: int, sweep_id: int) -> Sweep | None:
+        result = await self.session.execute(
+            select(Sweep).where(
+                Sweep.simulation_id == sim_id, Sweep.id == sweep_id
+            )
+        )
+        return result.scalar_one_or_none()
+
+    async def get(self, sweep_id: int) -> Sweep | None:
+        return await self.session.get(Sweep, sweep_id)
+
+    async def update(self, sweep: Sweep) -> Sweep:
+        self.session.add(sweep)
+        await self.session.commit()
+        await self.session.refresh(sweep)
+        return sweep
+
+    async def fail_unfinished(self) -> None:
+        """Fail sweeps whose job was lost with a previous server process."""
+        unfinished = [JobStatus.QUEUED.value, JobStatus.RUNNING.value]
+        await self.session.execute(
+            update(Sweep)
+            .where(Sweep.status.in_(unfinished))
+            .values(status=JobStatus.FAILED.value)
+        )
+        await self.session.commit()
@@ -0,0 +1,42 @@
+from typing import List
+
+from fastapi import APIRouter, status
+
+from app.jobs.dependencies import JobManagerDep
+from app.shared.message import MessageResponse
+from app.sweeps.dependencies import SweepServiceDep
+from app.sweeps.schema import SweepCreate, SweepRead
+
+router = APIRouter(tags=["Sweeps"], prefix="/simulations")
+
+
+@router.post(
+    "/{simulation_id}/sweeps",
+    response_model=SweepRead,
+    status_code=status.HTTP_202_ACCEPTED,
+    responses={404: {"model": MessageResponse}},
+)
+async def create_sweep(
+    service: SweepServiceDep,
+    jobs: JobManagerDep,
+    simulation_id: int,
+    sweep: SweepCreate,
+):
+    """Queue one run per combination of the grid, as a single job."""
+    return await service.create_sweep(simulation_id, sweep, jobs)
+
+
+@router.get("/{simulation_id}/sweeps", response_model=List[SweepRead])
+async def read_sweeps(service: SweepServiceDep, simulation_id: int):
+    return await service.read_sweeps(simulation_id)
+
+
+@router.get(
+    "/{simulation_id}/sweeps/{sweep_id}",
+    response_model=SweepRead,
+    responses={404: {"model": MessageResponse}},
+)
+async def read_sweep(
+    service: SweepServiceDep, simulation_id: int, sweep_id: int
+):
+    return await service.read_sweep(simulation_id, sweep_id)
@@ -0,0 +1,84 @@
+from datetime import datetime
+from typing import List, Optional
+
+from pydantic import BaseModel, ConfigDict, Field, model_validator
+
+from app.jobs.schema import JobStatus
+from app.shared.primitives import Unit
+
+
+class SweepGrid(BaseModel):
+    """Values to sweep, every combination becomes one variant."""
+
+    energies: Optional[List[float]] = Field(
+        None, min_length=1, description="Mono energies of the sources"
+    )
+    energy_unit: Unit = Unit.KEV
+    activities: Optional[List[float]] = Field(
+        None, min_length=1, description="Activities of the sources"
+    )
+    activity_unit: Unit = Unit.BQ
+    materials: Optional[List[str]] = Field(
+        None, min_length=1, description="Materials of the swept volume"
+    )
+
+
+class SweepCreate(BaseModel):
+    """Model for creating a sweep over variants of a simulation."""
+
+    grid: SweepGrid
+    sources: Optional[List[str]] = Field(
+        None,
+        description="Sources the energies and activities apply to, "
+        "all sources by default",
+    )
+    volume: Optional[str] = Field(
+        None, description="Volume the materials apply to"
+    )
+    num_workers: Optional[int] = Field(
+        None,
+        gt=0,
+        description="No. of variants simulated at once, "
+        "defaults to SWEEP_WORKERS",
+    )
+    seed: Optional[int] = Field(
+        None, ge=0, description="Random seed shared by all variants"
+    )
+
+    @model_validator(mode="after")
+    def check_grid(self) -> "SweepCreate":
+        grid = self.grid
+        if not (grid.energies or grid.activities or grid.materials):
+            raise ValueError("The grid must sweep at least one parameter")
+        if grid.materials and self.volume is None:
+            raise ValueError("Sweeping materials requires a volume")
+        return self
+
+
+class SweepVariant(BaseModel):
+    """One combination of the grid and where its outputs are written."""
+
+    index: int
+    energy: Optional[float] = None
+    activity: Optional[float] = None
+    material: Optional[str] = None
+    output_dir: str
+    projection: Optional[str] = None
+    hits: Optional[str] = None
+
+
+class SweepRead(BaseModel):
+    """Model for reading a sweep and the outputs of its variants."""
+
+    model_config = ConfigDict(from_attributes=True)
+
+    id: int
+    simulation_id: int
+    job_id: Optional[str] = Field(
+        None, description="Job simulating the variants"
+    )
+    status: JobStatus
+    output_dir: Optional[str] = None
+    params: SweepCreate
+    variants: List[SweepVariant] = Field(default_factory=list)
+    created_at: datetime
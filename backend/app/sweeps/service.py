@@ -0,0 +1,213 @@
+import asyncio
+import itertools
+import os
+import secrets
+import uuid
+from typing import Any, List
+
+from fastapi import HTTPException, status
+from fastapi.concurrency import run_in_threadpool
+import opengate as gate
+
+from app.core.config import get_settings
+from app.core.database import AsyncSessionLocal
+from app.jobs.manager import Job, JobManager
+from app.jobs.schema import JobStatus
+from app.jobs.workers import run_gate_simulation
+from app.shared import hits, metrics
+from app.shared.primitives import UNIT_TO_GATE
+from app.shared.utils import material_names
+from app.simulations.service import (
+    HITS_FILE,
+    PROJECTION_FILE,
+    SimulationService,
+)
+from app.sweeps.repository import SweepRepository
+from app.sweeps.schema import SweepCreate, SweepRead, SweepVariant
+
+
+class SweepService:
+    def __init__(
+        self,
+        simulation_service: SimulationService,
+        sweep_repository: SweepRepository,
+    ):
+        self.sim_service = simulation_service
+        self.sweep_repo = sweep_repository
+
+    async def create_sweep(
+        self,
+        sim_id: int,
+        sweep_create: SweepCreate,
+        jobs: JobManager,
+    ) -> SweepRead:
+        plan = await self.sim_service.read_run_plan(sim_id)
+        sim_read = plan.simulation
+        names = sweep_create.sources or [src.name for src in plan.sources]
+        unknown = set(names) - {src.name for src in plan.sources}
+        if unknown:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Sources {sorted(unknown)} not found",
+            )
+        volume = sweep_create.volume
+        if volume is not None and volume not in plan.volume_map:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Volume '{volume}' not found",
+            )
+        grid = sweep_create.grid
+        if grid.materials:
+            gate_sim = await self.sim_service.get_gate_sim_without_sources(
+                sim_id
+            )
+            unknown = set(grid.materials) - material_names(gate_sim)
+            if unknown:
+                raise HTTPException(
+                    status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                    detail=f"Unknown materials {sorted(unknown)}",
+                )
+
+        sweep = await self.sweep_repo.create(sim_id, sweep_create)
+        sweep_id = sweep.id
+        output_dir = os.path.join(sim_read.output_dir, "sweeps", str(sweep_id))
+        seed = sweep_create.seed
+        if seed is None:
+            seed = secrets.randbelow(2**31)
+
+        # every variant is the shared archive plus a few overrides in
+        # memory, nothing of the base simulation is copied on disk
+        combinations = itertools.product(
+            grid.energies or [None],
+            grid.activities or [None],
+            grid.materials or [None],
+        )
+        variants: List[dict] = []
+        gate_sims: List[gate.Simulation] = []
+        for index, (energy, activity, material) in enumerate(combinations):
+            variant_dir = os.path.join(output_dir, str(index))
+            gate_sim = self.sim_service.prepare_run(plan, variant_dir, seed)
+            for name in names:
+                gate_src = gate_sim.source_manager.get_source(name)
+                if energy is not None:
+                    factor = UNIT_TO_GATE[grid.energy_unit]
+                    gate_src.energy.mono = energy * factor
+                if activity is not None:
+                    factor = UNIT_TO_GATE[grid.activity_unit]
+                    gate_src.activity = (
+                        activity * factor / gate_sim.number_of_threads
+                    )
+            if material is not None:
+                gate_vol = gate_sim.volume_manager.get_volume(volume)
+                gate_vol.material = material
+
+            gate_sims.append(gate_sim)
+            variant = SweepVariant(
+                index=index,
+                energy=energy,
+                activity=activity,
+                material=material,
+                output_dir=variant_dir,
+            )
+            variants.append(variant.model_dump(mode="json"))
+
+        settings = get_settings()
+        slots = asyncio.Semaphore(
+            sweep_create.num_workers or settings.SWEEP_WORKERS
+        )
+
+        async def run_variant(index: int) -> int:
+            async with slots:
+                with metrics.timed("gate_run"):
+                    await jobs.run_in_process(
+                        run_gate_simulation, gate_sims[index]
+                    )
+                await run_in_threadpool(
+                    hits.merge_thread_files,
+                    os.path.join(variants[index]["output_dir"], HITS_FILE),
+                )
+            return index
+
+        # everything below runs after the request (and its DB session) ended
+        async def run(job: Job) -> dict:
+            await self._record(sweep_id, status=JobStatus.RUNNING.value)
+            num_variants = len(variants)
+            job.update(
+                stage="simulating variants",
+                sweep_id=sweep_id,
+                num_variants=num_variants,
+                variants_completed=0,
+            )
+            tasks = [
+                asyncio.create_task(run_variant(index))
+                for index in range(num_variants)
+            ]
+            try:
+                completed = 0
+                for task in asyncio.as_completed(tasks):
+                    index = await task
+                    variant_dir = variants[index]["output_dir"]
+                    variants[index].update(
+                        projection=os.path.join(variant_dir, PROJECTION_FILE),
+                        hits=os.path.join(variant_dir, HITS_FILE),
+                    )
+                    completed += 1
+                    job.update(
+                        progress=completed / num_variants,
+                        variants_completed=completed,
+                    )
+                    await self._record(sweep_id, variants=variants)
+            except BaseException:
+                for task in tasks:
+                    task.cancel()
+                await asyncio.gather(*tasks, return_exceptions=True)
+                raise
+
+            return {
+                "sweep_id": sweep_id,
+                "projections": [v["projection"] for v in variants],
+            }
+
+        async def finish(job: Job) -> None:
+            await self._record(sweep_id, status=job.status.value)
+
+        # the sweep is recorded in full before its job starts, from then on
+        # only the job changes its status, its final one also when the job
+        # is cancelled while still queued
+        job_id = uuid.uuid4().hex
+        sweep.output_dir = output_dir
+        sweep.variants = variants
+        sweep.job_id = job_id
+        sweep.status = JobStatus.QUEUED.value
+        sweep = await self.sweep_repo.update(sweep)
+
+        jobs.submit(sim_id, "sweep", run, job_id=job_id, on_finish=finish)
+        return SweepRead.model_validate(sweep)
+
+    async def read_sweeps(self, sim_id: int) -> List[SweepRead]:
+        await self.sim_service.read_simulation(sim_id)
+        return [
+            SweepRead.model_validate(sweep)
+            for sweep in await self.sweep_repo.read_all(sim_id)
+        ]
+
+    async def read_sweep(self, sim_id: int, sweep_id: int) -> SweepRead:
+        sweep = await self.sweep_repo.read(sim_id, sweep_id)
+        if not sweep:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Sweep with id {sweep_id} not found",
+            )
+        return SweepRead.model_validate(sweep)
+
+    @staticmethod
+    async def _record(sweep_id: int, **fields: Any) -> None:
+        """Update a sweep from a job, outside of any request's session."""
+        async with AsyncSessionLocal() as session:
+            repo = SweepRepository(session)
+            sweep = await repo.get(sweep_id)
+            if not sweep:  # deleted along with its simulation
+                return
+            for key, value in fields.items():
+                setattr(sweep, key, value)
+            await repo.update(sweep)
@@ -4,7 +4,6 @@ from app.volumes.model import Volume
 from app.volumes.schema import VolumeType
 from app.shared.primitives import Axis, Unit
 
-
 WORLD_VOLUME = {
     "name": "world",
     "mother": None,
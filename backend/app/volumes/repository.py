@@ -25,6 +25,27 @@ class VolumeRepository:
             await self.session.rollback()
             raise
 
+    async def create_many(
+        self, sim_id: int, vol_creates: List[VolumeCreate]
+    ) -> List[Volume]:
+        session_vols = [
+            Volume(simulation_id=sim_id, **vol.model_dump(mode="json"))
+            for vol in vol_creates
+        ]
+        self.session.add_all(session_vols)
+        try:
+            await self.session.flush()
+            return session_vols
+        except IntegrityError:
+            await self.session.rollback()
+            raise
+
+    async def commit(self) -> None:
+        await self.session.commit()
+
+    async def rollback(self) -> None:
+        await self.session.rollback()
+
     async def read_all(self, sim_id: int) -> List[Volume]:
         vol_list = await self.session.execute(
             select(Volume).where(Volume.simulation_id == sim_id)
@@ -1,8 +1,10 @@
-from fastapi import APIRouter, status
-from typing import List
+from fastapi import APIRouter, Body, Path, Request, status
+from typing import Annotated, List
 
 from app.shared.message import MessageResponse
 from app.volumes.schema import (
+    DIGEST_PATTERN,
+    ImageRead,
     VolumeCreate,
     VolumeRead,
     VolumeUpdate,
@@ -23,6 +25,55 @@ async def create_volume(
     return await service.create_volume(simulation_id, volume)
 
 
+@router.post(
+    "/{simulation_id}/volumes:batch",
+    response_model=MessageResponse,
+    status_code=status.HTTP_201_CREATED,
+    responses={409: {"model": MessageResponse}},
+)
+async def create_volumes(
+    service: VolumeServiceDep,
+    simulation_id: int,
+    volumes: Annotated[List[VolumeCreate], Body(min_length=1)],
+):
+    """Create all volumes with one archive write and one transaction."""
+    return await service.create_volumes(simulation_id, volumes)
+
+
+@router.post(
+    "/{simulation_id}/images",
+    response_model=ImageRead,
+    status_code=status.HTTP_201_CREATED,
+    responses={422: {"model": MessageResponse}},
+)
+async def upload_image(
+    service: VolumeServiceDep,
+    simulation_id: int,
+    filename: str,
+    request: Request,
+):
+    """
+    Upload a label map as the raw request body, streamed to disk. The
+    suffix of ``filename`` (.mha/.mhd, .nrrd or .npy) gives its format.
+    """
+    return await service.upload_image(
+        simulation_id, filename, request.stream()
+    )
+
+
+@router.get(
+    "/{simulation_id}/images/{digest}",
+    response_model=ImageRead,
+    responses={404: {"model": MessageResponse}},
+)
+async def read_image(
+    service: VolumeServiceDep,
+    simulation_id: int,
+    digest: Annotated[str, Path(pattern=DIGEST_PATTERN)],
+):
+    return await service.read_image(simulation_id, digest)
+
+
 @router.get("/{simulation_id}/volumes", response_model=List[str])
 async def read_volumes(service: VolumeServiceDep, simulation_id: int):
     return await service.read_volumes(simulation_id)
@@ -33,17 +84,26 @@ async def read_volumes(service: VolumeServiceDep, simulation_id: int):
     response_model=VolumeRead,
     responses={404: {"model": MessageResponse}},
 )
-async def read_volume(service: VolumeServiceDep, simulation_id: int, name: str):
+async def read_volume(
+    service: VolumeServiceDep, simulation_id: int, name: str
+):
     return await service.read_volume(simulation_id, name)
 
 
 @router.put("/{simulation_id}/volumes/{name}", response_model=MessageResponse)
 async def update_volume(
-    service: VolumeServiceDep, simulation_id: int, name: str, volume: VolumeUpdate
+    service: VolumeServiceDep,
+    simulation_id: int,
+    name: str,
+    volume: VolumeUpdate,
 ):
     return await service.update_volume(simulation_id, name, volume)
 
 
-@router.delete("/{simulation_id}/volumes/{name}", response_model=MessageResponse)
-async def delete_volume(service: VolumeServiceDep, simulation_id: int, name: str):
+@router.delete(
+    "/{simulation_id}/volumes/{name}", response_model=MessageResponse
+)
+async def delete_volume(
+    service: VolumeServiceDep, simulation_id: int, name: str
+):
     return await service.delete_volume(simulation_id, name)
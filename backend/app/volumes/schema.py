@@ -1,14 +1,18 @@
 from enum import Enum
-from typing import Annotated, Literal, Union
+from typing import Annotated, Dict, List, Literal, Union
 
-from pydantic import BaseModel, ConfigDict, Field
+from pydantic import BaseModel, ConfigDict, Field, model_validator
 
 from app.shared.primitives import Vector3, Rotation, Unit
 
+# SHA-256 of an uploaded image
+DIGEST_PATTERN = r"^[0-9a-f]{64}$"
+
 
 class VolumeType(str, Enum):
     BOX = "Box"
     SPHERE = "Sphere"
+    IMAGE = "Image"
 
 
 class BaseShape(BaseModel):
@@ -26,16 +30,50 @@ class SphereShape(BaseShape):
     rmax: float = Field(1.0, gt=0.0)
 
 
+class ImageShape(BaseShape):
+    """Voxelized phantom, ``unit`` applies to ``spacing`` and ``size``."""
+
+    type: Literal[VolumeType.IMAGE] = Field(VolumeType.IMAGE, frozen=True)
+    image: str = Field(
+        pattern=DIGEST_PATTERN, description="Digest of an uploaded label map"
+    )
+    labels: Dict[int, str] = Field(
+        min_length=1,
+        description=(
+            "Material of every label, other labels get the volume's material"
+        ),
+    )
+    spacing: Vector3 | None = Field(
+        None, description="Voxel size, instead of the image's own"
+    )
+    size: Vector3 | None = Field(
+        None, description="Extent of the image, set when the volume is saved"
+    )
+
+
 VolumeShape = Annotated[
-    Union[BoxShape, SphereShape], Field(discriminator="type")
+    Union[BoxShape, SphereShape, ImageShape], Field(discriminator="type")
 ]
 
 
 class DynamicParams(BaseModel):
     enabled: bool = False
     translation_end: Vector3 | None = None
+    translations: List[Vector3] | None = Field(
+        None,
+        min_length=1,
+        description="Position of every run, instead of a linear trajectory",
+    )
     angle_end: float | None = None
 
+    @model_validator(mode="after")
+    def check_translation(self) -> "DynamicParams":
+        if self.translation_end is not None and self.translations is not None:
+            raise ValueError(
+                "translation_end and translations are mutually exclusive"
+            )
+        return self
+
 
 class VolumeBase(BaseModel):
     name: str
@@ -68,3 +106,14 @@ class VolumeRead(VolumeBase):
 
     id: int
     simulation_id: int
+
+
+class ImageRead(BaseModel):
+    digest: str
+    format: str
+    dims: List[int] = Field(description="Voxels along x, y and z")
+    spacing: List[float] = Field(description="Voxel size in mm")
+    dtype: str
+    labels: List[int] | None = Field(
+        description="Distinct values, None for too many to be labels"
+    )
@@ -1,24 +1,50 @@
 # app/volumes/service.py
 
+import os
+from functools import lru_cache
+from pathlib import Path
+from typing import AsyncIterable
+
 from fastapi import HTTPException
-import numpy as np
+from fastapi.concurrency import run_in_threadpool
 from scipy.spatial.transform import Rotation as R
 
+from app.simulations.schema import SimulationRead
 from app.simulations.service import SimulationService
 from app.volumes.schema import (
     VolumeCreate,
     VolumeRead,
     VolumeUpdate,
     BoxShape,
+    ImageRead,
+    ImageShape,
     SphereShape,
 )
 from app.volumes.repository import VolumeRepository
+from app.core.config import get_settings
+from app.shared import images
+from app.shared.archive import get_archive_cache
+from app.shared.cache import DiskCache
 from app.shared.primitives import UNIT_TO_GATE
+from app.shared.trajectory import apply_trajectory
 from app.shared.message import MessageResponse
 import opengate as gate
 from opengate.geometry.volumes import VolumeBase
 
 
+@lru_cache
+def get_voxel_cache() -> DiskCache:
+    settings = get_settings()
+    return DiskCache(
+        os.path.join(settings.CACHE_DIR, "voxels"),
+        settings.VOXEL_CACHE_MAX_BYTES,
+    )
+
+
+def image_dir(sim_read: SimulationRead) -> Path:
+    return Path(sim_read.output_dir) / "images"
+
+
 class VolumeService:
     def __init__(
         self,
@@ -49,18 +75,59 @@ class VolumeService:
         await self._process_vol(sim_id, gate_vol, vol_create)
 
         # write out the updated Gate JSON
-        gate_sim.to_json_file()
+        get_archive_cache().save(gate_sim)
 
         # then persist to the database
         await self.vol_repo.create(sim_id, vol_create)
 
         return {"message": f"Volume '{vol_create.name}' created successfully"}
 
+    async def create_volumes(
+        self, sim_id: int, vol_creates: list[VolumeCreate]
+    ) -> MessageResponse:
+        gate_sim: gate.Simulation = (
+            await self.sim_service.get_gate_sim_without_sources(sim_id)
+        )
+        sim_read = await self.sim_service.read_simulation(sim_id)
+
+        names = [vol.name for vol in vol_creates]
+        duplicates = {n for n in names if names.count(n) > 1} | (
+            set(names) & set(gate_sim.volume_manager.volume_names)
+        )
+        if duplicates:
+            raise HTTPException(
+                status_code=409,
+                detail=f"Volumes {sorted(duplicates)} already exist",
+            )
+
+        # apply everything in memory first, nothing is persisted on failure
+        for vol_create in vol_creates:
+            gate_vol: VolumeBase = gate_sim.add_volume(
+                vol_create.shape.type.value, vol_create.name
+            )
+            await self._process_vol(
+                sim_id, gate_vol, vol_create, sim_read, vol_creates
+            )
+
+        await self.vol_repo.create_many(sim_id, vol_creates)
+        try:
+            get_archive_cache().save(gate_sim)
+        except OSError as e:
+            await self.vol_repo.rollback()
+            raise HTTPException(
+                500, detail=f"Failed to write simulation archive: {e}"
+            )
+        await self.vol_repo.commit()
+
+        return {"message": f"{len(vol_creates)} volumes created successfully"}
+
     async def _process_vol(
         self,
         sim_id: int,
         gate_vol: VolumeBase,
         vol: VolumeCreate | VolumeUpdate,
+        sim_read: SimulationRead | None = None,
+        batch: list[VolumeCreate] | None = None,
     ):
         gate_vol.mother = vol.mother
         gate_vol.material = vol.material
@@ -79,24 +146,71 @@ class VolumeService:
             case SphereShape():
                 gate_vol.rmin = vol.shape.rmin * shape_unit
                 gate_vol.rmax = vol.shape.rmax * shape_unit
+            case ImageShape():
+                if sim_read is None:
+                    sim_read = await self.sim_service.read_simulation(sim_id)
+                await run_in_threadpool(
+                    self._voxelize, sim_read, gate_vol, vol
+                )
 
+        num_runs, detector = 0, None
         if vol.dynamic_params.enabled:
-            sim_read = await self.sim_service.read_simulation(sim_id)
+            if sim_read is None:
+                sim_read = await self.sim_service.read_simulation(sim_id)
             num_runs = sim_read.num_runs
+            detector = await self._detector(sim_read, batch)
+        apply_trajectory(gate_vol, vol, num_runs, detector=detector)
 
-            angle_start = vol.rotation.angle
-            angle_end = vol.dynamic_params.angle_end or angle_start
-            angles = np.linspace(
-                angle_start, angle_end, num_runs, endpoint=False
-            )
-            rotations = [
-                R.from_euler(
-                    vol.rotation.axis.value, a, degrees=True
-                ).as_matrix()
-                for a in angles
-            ]
+    @staticmethod
+    def _voxelize(
+        sim_read: SimulationRead,
+        gate_vol: VolumeBase,
+        vol: VolumeCreate | VolumeUpdate,
+    ) -> None:
+        """Point ``gate_vol`` at the material map of its label map."""
+        shape: ImageShape = vol.shape
+        root = image_dir(sim_read)
+        info = images.read(root, shape.image)
+        unit = UNIT_TO_GATE[shape.unit]
+        spacing = info["spacing"]
+        if shape.spacing is not None:
+            spacing = [s * unit for s in shape.spacing]
+
+        labels, materials = images.voxelize(
+            get_voxel_cache(),
+            root,
+            shape.image,
+            shape.labels,
+            vol.material,
+            spacing,
+        )
+        gate_vol.image = str(labels.resolve())
+        # material indices are whole numbers, each gets its own interval
+        gate_vol.voxel_materials = [
+            [i, i + 1, material] for i, material in enumerate(materials)
+        ]
+        shape.size = [n * s / unit for n, s in zip(info["dims"], spacing)]
+
+    async def _detector(
+        self, sim_read: SimulationRead, batch: list[VolumeCreate] | None
+    ) -> VolumeCreate | VolumeRead | None:
+        """Volume the projection actor is attached to, if it exists yet."""
+        name = sim_read.actor.attached_to
+        for vol in batch or []:
+            if vol.name == name:
+                return vol
+        db = await self.vol_repo.read(sim_read.id, name)
+        return VolumeRead.model_validate(db) if db else None
+
+    async def upload_image(
+        self, sim_id: int, filename: str, stream: AsyncIterable[bytes]
+    ) -> ImageRead:
+        sim_read = await self.sim_service.read_simulation(sim_id)
+        return await images.store(image_dir(sim_read), filename, stream)
 
-            gate_vol.add_dynamic_parametrisation(rotation=rotations)
+    async def read_image(self, sim_id: int, digest: str) -> ImageRead:
+        sim_read = await self.sim_service.read_simulation(sim_id)
+        return images.read(image_dir(sim_read), digest)
 
     async def read_volumes(self, sim_id: int) -> list[str]:
         vols = await self.vol_repo.read_all(sim_id)
@@ -130,7 +244,7 @@ class VolumeService:
         await self._process_vol(sim_id, gate_vol, vol_update)
 
         # 4) write out the updated Gate JSON
-        gate_sim.to_json_file()
+        get_archive_cache().save(gate_sim)
 
         # 5) persist the same update to the database
         await self.vol_repo.update(sim_id, name, vol_update)
@@ -143,5 +257,5 @@ class VolumeService:
             raise HTTPException(404, "Volume not found")
         gate_sim = await self.sim_service.get_gate_sim_without_sources(sim_id)
         gate_sim.volume_manager.remove_volume(name)
-        gate_sim.to_json_file()
+        get_archive_cache().save(gate_sim)
         return {"message": f"Volume '{name}' deleted successfully"}
@@ -0,0 +1,63 @@
+"""
+Run the benchmark suite and save the results as JSON.
+
+    python -m benchmarks [--quick] [--only NAME ...] [--output PATH]
+
+Run from the backend directory. Reconstructions use LEAP's CPU path, no GPU
+is needed.
+"""
+
+import argparse
+import json
+import os
+import sys
+from datetime import datetime
+
+from benchmarks.cases import suite
+from benchmarks.harness import report, run_case
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks")
+    parser.add_argument(
+        "--quick", action="store_true", help="small sizes, for a smoke run"
+    )
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument(
+        "--only", nargs="+", metavar="NAME", help="run only these cases"
+    )
+    parser.add_argument("--output", help="JSON file to write the results to")
+    args = parser.parse_args()
+
+    results = []
+    for name, case, params in suite(args.quick, args.repeats):
+        if args.only and name not in args.only:
+            continue
+        result = run_case(name, case, params)
+        summary = result.summary()
+        print(
+            f"{name:<20} {json.dumps(params):<60} "
+            f"best {summary['best_s'] * 1e3:10.2f} ms  "
+            f"median {summary['median_s'] * 1e3:10.2f} ms  "
+            f"peak RSS {result.peak_rss_bytes / 1024**2:8.1f} MiB",
+            flush=True,
+        )
+        results.append(result)
+
+    data = report(results)
+    output = args.output
+    if output is None:
+        stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+        commit = (data["commit"] or "unknown")[:8]
+        output = os.path.join(RESULTS_DIR, f"{stamp}-{commit}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(data, f, indent=2)
+    print(f"Results written to {output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,254 @@
+"""
+Benchmark cases for the simulation, volume and reconstruction hot paths.
+
+Cases execute inside spawned workers, after the harness has pointed the
+settings at a scratch directory. That is why ``app`` is only imported
+within the functions, never at module level.
+"""
+
+import asyncio
+import os
+import shutil
+from typing import Any, Dict, List
+
+import numpy as np
+
+from benchmarks.harness import timed, timed_async
+
+SIM_ID = 1
+
+
+def _box(index: int, dynamic: bool):
+    from app.volumes.schema import BoxShape, DynamicParams, VolumeCreate
+
+    # spread along x so no two boxes ever overlap
+    return VolumeCreate(
+        name=f"box_{index}",
+        material="G4_WATER",
+        translation=[20.0 * index, 0.0, 0.0],
+        shape=BoxShape(size=[10.0, 10.0, 10.0]),
+        dynamic_params=DynamicParams(
+            enabled=dynamic,
+            angle_end=360.0 if dynamic else None,
+            translation_end=[20.0 * index, 0.0, 50.0] if dynamic else None,
+        ),
+    )
+
+
+async def _setup(num_runs: int = 1, num_volumes: int = 0, dynamic=False):
+    """Scratch database holding one simulation with ``num_volumes`` boxes."""
+    from app.core import Base, engine
+    from app.core.database import AsyncSessionLocal
+    from app.simulations.repository import SimulationRepository
+    from app.simulations.schema import ActorBase, SimulationCreate
+    from app.simulations.service import SimulationService
+    from app.volumes.repository import VolumeRepository
+    from app.volumes.service import VolumeService
+
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    session = AsyncSessionLocal()
+    sims = SimulationService(SimulationRepository(session))
+    await sims.create_simulation(
+        SimulationCreate(name="bench", num_runs=num_runs, actor=ActorBase())
+    )
+    vols = VolumeService(sims, VolumeRepository(session))
+    if num_volumes:
+        await vols.create_volumes(
+            SIM_ID, [_box(i, dynamic) for i in range(num_volumes)]
+        )
+    return session, sims, vols
+
+
+def gate_sim_load(num_volumes: int, repeats: int) -> Dict[str, Any]:
+    """Load a phantom of ``num_volumes`` boxes from its GATE archive."""
+
+    async def main():
+        import opengate as gate
+
+        from app.shared.utils import get_gate_sim
+        from app.sources.repository import SourceRepository
+
+        session, sims, _ = await _setup(num_volumes=num_volumes)
+        sim = await sims.read_simulation(SIM_ID)
+        path = os.path.join(sim.output_dir, sim.json_archive_filename)
+        src_repo = SourceRepository(session)
+
+        def from_json_file():
+            gate.Simulation().from_json_file(path)
+
+        from_json = timed(from_json_file, repeats)
+        times = await timed_async(
+            lambda: get_gate_sim(SIM_ID, sims.sim_repo, src_repo), repeats
+        )
+        await session.close()
+        return {
+            "times_s": times,
+            "from_json_file_s": from_json,
+            "archive_bytes": os.path.getsize(path),
+        }
+
+    return asyncio.run(main())
+
+
+def volume_throughput(num_volumes: int) -> Dict[str, Any]:
+    """Create, then update, ``num_volumes`` boxes one request at a time."""
+
+    async def main():
+        from app.volumes.schema import VolumeUpdate
+
+        session, _, vols = await _setup()
+        boxes = [_box(i, dynamic=False) for i in range(num_volumes)]
+
+        it = iter(boxes)
+        creates = await timed_async(
+            lambda: vols.create_volume(SIM_ID, next(it)), num_volumes
+        )
+
+        def update(box):
+            data = box.model_dump()
+            data["translation"] = [data["translation"][0], 5.0, 0.0]
+            return vols.update_volume(
+                SIM_ID, box.name, VolumeUpdate.model_validate(data)
+            )
+
+        it = iter(boxes)
+        updates = await timed_async(lambda: update(next(it)), num_volumes)
+        await session.close()
+        return {
+            "times_s": creates,
+            "update_times_s": updates,
+            "creates_per_s": num_volumes / sum(creates),
+            "updates_per_s": num_volumes / sum(updates),
+        }
+
+    return asyncio.run(main())
+
+
+def init_volumes(
+    num_runs: int, num_volumes: int, repeats: int
+) -> Dict[str, Any]:
+    """Set up the trajectories of ``num_volumes`` moving boxes."""
+
+    async def main():
+        from app.shared import trajectory
+        from app.simulations.service import SimulationService
+
+        session, sims, _ = await _setup(num_runs, num_volumes, dynamic=True)
+        gate_sim = await sims.get_gate_sim_without_sources(SIM_ID)
+
+        async def run():
+            plan = await sims.read_run_plan(SIM_ID)
+            SimulationService._init_volumes(plan, gate_sim)
+
+        async def cold():
+            trajectory.rotations.cache_clear()
+            trajectory.translations.cache_clear()
+            await run()
+
+        cold_times = await timed_async(cold, repeats)
+        warm_times = await timed_async(run, repeats)
+        await session.close()
+        return {"times_s": cold_times, "memoized_times_s": warm_times}
+
+    return asyncio.run(main())
+
+
+def _force_cpu_recon() -> None:
+    """Make every LEAP model the service creates run on the CPU."""
+    from leapctype import tomographicModels
+
+    from app.simulations import service
+
+    def cpu_models():
+        ct = tomographicModels()
+        ct.set_gpu(-1)
+        return ct
+
+    service.tomographicModels = cpu_models
+
+
+def reconstruct(
+    num_angles: int,
+    size: int,
+    repeats: int,
+    memory_budget_mb: int | None = None,
+) -> Dict[str, Any]:
+    """FBP of a synthetic ``num_angles`` x ``size`` x ``size`` stack."""
+    from app.shared import metaimage
+    from app.simulations.schema import ReconstructionParams
+    from app.simulations.service import (
+        PROJECTION_FILE,
+        SimulationService,
+        get_recon_cache,
+    )
+
+    _force_cpu_recon()
+
+    out_dir = os.path.abspath("recon")
+    proj_path = os.path.join(out_dir, PROJECTION_FILE)
+    os.makedirs(os.path.dirname(proj_path))
+    rng = np.random.default_rng(0)
+    stack = rng.random((num_angles, size, size), dtype=np.float32)
+    metaimage.write_image(proj_path, stack, (1.0, 1.0, 1.0))
+    del stack
+
+    params = ReconstructionParams(
+        sod=500.0, sdd=1000.0, memory_budget_mb=memory_budget_mb
+    )
+    cache_root = get_recon_cache().root
+
+    def run():
+        # measure the reconstruction itself, not a cache restore
+        shutil.rmtree(cache_root, ignore_errors=True)
+        SimulationService._do_recon(proj_path, out_dir, params)
+
+    return {"times_s": timed(run, repeats)}
+
+
+def suite(quick: bool, repeats: int) -> List[tuple]:
+    """``(name, case, params)`` of every benchmark to run."""
+    volume_counts = [1, 10] if quick else [1, 10, 50, 200]
+    run_counts = [36] if quick else [360, 3600]
+    stacks = [(36, 32)] if quick else [(90, 64), (180, 128), (360, 256)]
+
+    cases: List[tuple] = []
+    for n in volume_counts:
+        cases.append(
+            (
+                "gate_sim_load",
+                gate_sim_load,
+                {"num_volumes": n, "repeats": repeats},
+            )
+        )
+    for n in volume_counts:
+        cases.append(
+            ("volume_throughput", volume_throughput, {"num_volumes": n})
+        )
+    for n in run_counts:
+        cases.append(
+            (
+                "init_volumes",
+                init_volumes,
+                {"num_runs": n, "num_volumes": 5, "repeats": repeats},
+            )
+        )
+    for num_angles, size in stacks:
+        params = {"num_angles": num_angles, "size": size, "repeats": repeats}
+        cases.append(("reconstruct", reconstruct, params))
+    # slab path, the largest stack under a budget it does not fit into
+    num_angles, size = stacks[-1]
+    cases.append(
+        (
+            "reconstruct",
+            reconstruct,
+            {
+                "num_angles": num_angles,
+                "size": size,
+                "repeats": repeats,
+                "memory_budget_mb": 1,
+            },
+        )
+    )
+    return cases
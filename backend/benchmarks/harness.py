@@ -0,0 +1,151 @@
+"""
+Timing harness shared by the benchmark cases.
+
+Every case runs in a freshly spawned interpreter against its own scratch
+database and output directory, so peak RSS is per case and Geant4 state
+never leaks from one case into the next.
+"""
+
+import multiprocessing
+import os
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, List
+
+_MP_CONTEXT = multiprocessing.get_context("spawn")
+
+
+@dataclass
+class Result:
+    name: str
+    params: Dict[str, Any]
+    times_s: List[float]
+    peak_rss_bytes: int
+    extra: Dict[str, Any] = field(default_factory=dict)
+
+    def summary(self) -> Dict[str, Any]:
+        data = asdict(self)
+        data["best_s"] = min(self.times_s)
+        data["median_s"] = statistics.median(self.times_s)
+        return data
+
+
+def timed(func: Callable[[], Any], repeats: int) -> List[float]:
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return times
+
+
+async def timed_async(
+    func: Callable[[], Awaitable[Any]], repeats: int
+) -> List[float]:
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        await func()
+        times.append(time.perf_counter() - start)
+    return times
+
+
+def peak_rss_bytes() -> int:
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return rss if sys.platform == "darwin" else rss * 1024
+
+
+def _scratch_env(root: str) -> None:
+    """Point the app at a scratch database and cache before it is imported."""
+    os.environ.update(
+        TITLE="benchmarks",
+        DESCRIPTION="benchmarks",
+        VERSION="0",
+        SQLALCHEMY_DATABASE_URI=(
+            f"sqlite+aiosqlite:///{os.path.join(root, 'bench.db')}"
+        ),
+        CACHE_DIR=os.path.join(root, "cache"),
+    )
+    # simulations write their outputs relative to the working directory
+    os.chdir(root)
+
+
+def _child(case: Callable[..., Dict[str, Any]], params: dict, conn) -> None:
+    try:
+        with tempfile.TemporaryDirectory(prefix="bench-") as root:
+            _scratch_env(root)
+            # the routers import every domain module, load them in the
+            # app's order before a case imports any one of them
+            import app.core  # noqa: F401
+
+            outcome = case(**params)
+        outcome["peak_rss_bytes"] = peak_rss_bytes()
+        conn.send(("ok", outcome))
+    except BaseException as e:
+        conn.send(("error", f"{type(e).__name__}: {e}"))
+    finally:
+        conn.close()
+
+
+def run_case(
+    name: str, case: Callable[..., Dict[str, Any]], params: dict
+) -> Result:
+    """
+    Run ``case(**params)`` in a spawned process.
+
+    The case returns ``{"times_s": [...], **extra}``, extra values end up
+    in the result as they are.
+    """
+    parent, child = _MP_CONTEXT.Pipe(duplex=False)
+    proc = _MP_CONTEXT.Process(target=_child, args=(case, params, child))
+    proc.start()
+    child.close()
+    try:
+        status, outcome = parent.recv()
+    except EOFError:
+        status, outcome = "error", f"worker exited with {proc.exitcode}"
+    proc.join()
+    if status != "ok":
+        raise RuntimeError(f"{name}{params}: {outcome}")
+
+    return Result(
+        name=name,
+        params=params,
+        times_s=outcome.pop("times_s"),
+        peak_rss_bytes=outcome.pop("peak_rss_bytes"),
+        extra=outcome,
+    )
+
+
+def _git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def report(results: List[Result]) -> Dict[str, Any]:
+    import numpy as np
+
+    return {
+        "commit": _git_commit(),
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "numpy": np.__version__,
+        "results": [r.summary() for r in results],
+    }
@@ -0,0 +1,37 @@
+import os
+import tempfile
+
+# settings are read on import, keep the suite off the real database and cache
+os.environ.setdefault("TITLE", "ProjeCT")
+os.environ.setdefault("DESCRIPTION", "Test suite")
+os.environ.setdefault("VERSION", "0.0.0")
+_TMP = tempfile.mkdtemp(prefix="project-tests-")
+os.environ.setdefault(
+    "SQLALCHEMY_DATABASE_URI", f"sqlite+aiosqlite:///{_TMP}/test.db"
+)
+os.environ.setdefault("CACHE_DIR", os.path.join(_TMP, "cache"))
+
+# modules importing the application, which needs a working opengate
+APP_TESTS = [
+    "test_benchmarks.py",
+    "test_imports.py",
+    "test_jobs.py",
+    "test_simulations.py",
+    "test_sweeps.py",
+    "test_trajectory.py",
+    "test_volumes.py",
+]
+
+try:
+    # the routers import every domain module, load them in the app's order
+    import app.core  # noqa: E402,F401
+except Exception as e:  # opengate missing, or its Geant4 data
+    APP_ERROR = e
+    collect_ignore = APP_TESTS
+else:
+    APP_ERROR = None
+
+
+def pytest_report_header(config):
+    if APP_ERROR is not None:
+        return f"skipping {APP_TESTS}, the app does not import: {APP_ERROR!r}"
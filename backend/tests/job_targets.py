@@ -0,0 +1,20 @@
+"""
+Worker process targets of the job tests.
+
+Spawned workers import the module of their target, this one stays free of
+app imports so they start without loading the whole application.
+"""
+
+import os
+import sys
+import time
+
+
+def sleep(pid_file: str) -> None:
+    with open(pid_file, "w") as f:
+        f.write(str(os.getpid()))
+    time.sleep(60)
+
+
+def exit_with(code: int) -> None:
+    sys.exit(code)
@@ -0,0 +1,34 @@
+import json
+import os
+import subprocess
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_quick_case_runs(tmp_path):
+    output = tmp_path / "results.json"
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(sys.path))
+    subprocess.run(
+        [
+            sys.executable,
+            "-m",
+            "benchmarks",
+            "--quick",
+            "--repeats",
+            "1",
+            "--only",
+            "volume_throughput",
+            "--output",
+            str(output),
+        ],
+        cwd=BACKEND_DIR,
+        env=env,
+        check=True,
+    )
+    results = json.loads(output.read_text())["results"]
+    assert results
+    for result in results:
+        assert result["name"] == "volume_throughput"
+        assert len(result["times_s"]) == result["params"]["num_volumes"]
+        assert result["peak_rss_bytes"] > 0
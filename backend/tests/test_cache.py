@@ -0,0 +1,70 @@
+import os
+import time
+
+from app.shared.cache import DiskCache, file_digest, file_stamp
+
+
+def _age(entry, seconds):
+    stamp = time.time() - seconds
+    os.utime(entry, (stamp, stamp))
+
+
+def test_key_is_stable():
+    key = DiskCache.key("recon", {"b": 1, "a": [1.5, None]}, 3)
+    assert key == DiskCache.key("recon", {"a": [1.5, None], "b": 1}, 3)
+    assert key != DiskCache.key("recon", {"a": [1.5, None], "b": 2}, 3)
+    assert len(key) == 64
+
+
+def test_store_and_restore(tmp_path):
+    cache = DiskCache(tmp_path / "cache", 1 << 20)
+    src = tmp_path / "a.raw"
+    src.write_bytes(b"abc")
+    cache.store("k", [src])
+
+    dest = tmp_path / "out"
+    assert cache.restore("k", dest)
+    assert (dest / "a.raw").read_bytes() == b"abc"
+    assert not cache.restore("missing", dest)
+
+
+def test_evicts_least_recently_used(tmp_path):
+    cache = DiskCache(tmp_path, max_bytes=1 << 20)
+    for i, key in enumerate("abc"):
+        entry = cache.store_bytes(key, {"data": b"x" * 10})
+        _age(entry, 100 - i)
+    # "a" is the oldest entry, reading it makes "b" the one to go
+    assert cache.lookup("a") is not None
+    cache.max_bytes = 25
+    cache.evict()
+
+    assert cache.lookup("a") is not None
+    assert cache.lookup("b") is None
+    assert cache.lookup("c") is not None
+
+
+def test_store_evicts_down_to_budget(tmp_path):
+    cache = DiskCache(tmp_path, max_bytes=15)
+    _age(cache.store_bytes("old", {"data": b"x" * 10}), 100)
+    cache.store_bytes("new", {"data": b"x" * 10})
+    assert cache.lookup("old") is None
+    assert cache.lookup("new") is not None
+
+
+def test_file_digest_follows_contents(tmp_path):
+    path = tmp_path / "f"
+    path.write_bytes(b"one")
+    first = file_digest(path)
+    assert file_digest(path) == first
+    path.write_bytes(b"two!")
+    assert file_digest(path) != first
+
+
+def test_file_stamp_follows_writes(tmp_path):
+    path = tmp_path / "f"
+    path.write_bytes(b"one")
+    first = file_stamp(path)
+    assert file_stamp(path) == first
+    # same size, only the modification time tells the write
+    _age(path, 60)
+    assert file_stamp(path) != first
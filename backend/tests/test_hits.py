@@ -0,0 +1,60 @@
+import awkward as ak
+import numpy as np
+import pytest
+import uproot
+
+from app.shared import hits
+
+
+def _write(path, **branches):
+    with uproot.recreate(path) as f:
+        f[hits.TREE] = branches
+
+
+def _read(path):
+    with uproot.open(path) as f:
+        return f[hits.TREE].arrays(library="np")
+
+
+def test_merge_in_thread_order(tmp_path):
+    path = str(tmp_path / "hits.root")
+    # thread 10 sorts after thread 2, not lexically before it
+    _write(tmp_path / "hits_t10.root", E=np.array([3.0]), n=np.array([3]))
+    _write(
+        tmp_path / "hits_t2.root", E=np.array([1.0, 2.0]), n=np.array([1, 2])
+    )
+    _write(tmp_path / "hits_tx.root", E=np.array([9.0]), n=np.array([9]))
+
+    assert hits.thread_files(path) == [
+        str(tmp_path / "hits_t2.root"),
+        str(tmp_path / "hits_t10.root"),
+    ]
+    assert hits.merge_thread_files(path) == path
+    merged = _read(path)
+    np.testing.assert_array_equal(merged["E"], [1.0, 2.0, 3.0])
+    np.testing.assert_array_equal(merged["n"], [1, 2, 3])
+    assert hits.thread_files(path) == []
+    assert (tmp_path / "hits_tx.root").exists()
+
+
+def test_merge_without_thread_files(tmp_path):
+    path = str(tmp_path / "hits.root")
+    assert hits.merge_thread_files(path) == path
+    assert not (tmp_path / "hits.root").exists()
+
+
+def test_merge_rejects_string_branches(tmp_path):
+    path = str(tmp_path / "hits.root")
+    for k in range(2):
+        _write(
+            tmp_path / f"hits_t{k}.root",
+            E=np.array([1.0]),
+            ParticleName=ak.Array(["gamma"]),
+        )
+
+    with pytest.raises(ValueError, match="ParticleName"):
+        hits.merge_thread_files(path)
+    # nothing is lost, the per-thread files can still be read
+    assert len(hits.thread_files(path)) == 2
+    assert not (tmp_path / "hits.root").exists()
+    assert not (tmp_path / "hits.root.merging").exists()
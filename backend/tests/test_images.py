@@ -0,0 +1,83 @@
+import asyncio
+import io
+
+import numpy as np
+import pytest
+
+from app.shared import images, metaimage
+from app.shared.cache import DiskCache
+
+
+def _upload(root, filename, data: bytes):
+    async def stream():
+        # odd sized parts, as a client would send them
+        for start in range(0, len(data), 7):
+            end = start + 7
+            yield data[start:end]
+
+    return asyncio.run(images.store(root, filename, stream()))
+
+
+def _npy(array) -> bytes:
+    buffer = io.BytesIO()
+    np.save(buffer, array)
+    return buffer.getvalue()
+
+
+def _label_map():
+    array = np.zeros((2, 3, 4), dtype=np.int16)
+    array[0, 1, 1:3] = 5
+    array[1] = 9
+    return array
+
+
+def test_store_npy(tmp_path):
+    array = _label_map()
+    info = _upload(tmp_path, "phantom.npy", _npy(array))
+    assert info["format"] == "NumPy"
+    assert info["dims"] == [4, 3, 2]
+    assert info["labels"] == [0, 5, 9]
+    assert images.read(tmp_path, info["digest"]) == info
+    # the header points into the uploaded file, nothing is copied
+    header = images.header_path(tmp_path, info["digest"])
+    np.testing.assert_array_equal(metaimage.open_memmap(header), array)
+
+    again = _upload(tmp_path, "copy.npy", _npy(array))
+    assert again == info
+
+
+def test_store_rejects(tmp_path):
+    with pytest.raises(Exception) as excinfo:
+        _upload(tmp_path, "phantom.png", b"")
+    assert excinfo.value.status_code == 422
+
+    floats = _npy(np.zeros((2, 2, 2), dtype=np.float32))
+    with pytest.raises(Exception) as excinfo:
+        _upload(tmp_path, "phantom.npy", floats)
+    assert excinfo.value.status_code == 422
+    # failed uploads leave nothing behind
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_voxelize(tmp_path):
+    info = _upload(tmp_path, "phantom.npy", _npy(_label_map()))
+    cache = DiskCache(tmp_path / "cache", 1 << 20)
+    # label 9 has no entry and gets the volume's own material
+    table = {5: "G4_BONE_COMPACT_ICRU", 0: "G4_WATER"}
+
+    labels, materials = images.voxelize(
+        cache, tmp_path, info["digest"], table, "G4_AIR", [1.0, 1.0, 2.0]
+    )
+    assert materials == ["G4_AIR", "G4_BONE_COMPACT_ICRU", "G4_WATER"]
+    expected = np.full((2, 3, 4), 2, dtype=np.uint8)
+    expected[0, 1, 1:3] = 1
+    expected[1] = 0
+    np.testing.assert_array_equal(metaimage.open_memmap(labels), expected)
+    assert metaimage.read_info(labels).spacing == (1.0, 1.0, 2.0)
+
+    # built once, restored from the voxel cache afterwards
+    again, _ = images.voxelize(
+        cache, tmp_path, info["digest"], table, "G4_AIR", [1.0, 1.0, 2.0]
+    )
+    assert again == labels
+    np.testing.assert_array_equal(metaimage.open_memmap(again), expected)
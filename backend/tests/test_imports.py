@@ -0,0 +1,14 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+
+@pytest.mark.parametrize("module", ["app.shared.archive", "app.shared.utils"])
+def test_importable_on_its_own(module):
+    # a fresh interpreter, the suite has long imported app.core
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(sys.path))
+    subprocess.run(
+        [sys.executable, "-c", f"import {module}"], env=env, check=True
+    )
@@ -0,0 +1,110 @@
+import asyncio
+import os
+
+import pytest
+
+import job_targets
+from app.jobs.manager import JobManager
+from app.jobs.schema import JobStatus
+
+
+def _run(func):
+    async def main():
+        jobs = JobManager(max_workers=1)
+        job = jobs.submit(1, "test", func)
+        await asyncio.wait_for(job.task, 30)
+        return job
+
+    return asyncio.run(main())
+
+
+def test_cancel_terminates_worker(tmp_path):
+    pid_file = tmp_path / "pid"
+
+    async def main():
+        jobs = JobManager(max_workers=1)
+        job = jobs.submit(
+            1,
+            "sleep",
+            lambda job: JobManager.run_in_process(
+                job_targets.sleep, str(pid_file)
+            ),
+        )
+        for _ in range(600):
+            if pid_file.exists() and pid_file.read_text():
+                break
+            assert not job.done, job.error
+            await asyncio.sleep(0.05)
+        jobs.cancel(job.id)
+        await asyncio.wait_for(job.task, 30)
+        return job, int(pid_file.read_text())
+
+    job, pid = asyncio.run(main())
+    assert job.status == JobStatus.CANCELLED
+    assert job.finished_at is not None
+    with pytest.raises(ProcessLookupError):
+        os.kill(pid, 0)
+
+
+def test_failing_worker_fails_job():
+    job = _run(lambda job: JobManager.run_in_process(job_targets.exit_with, 3))
+    assert job.status == JobStatus.FAILED
+    assert "code 3" in job.error
+
+
+def test_result_is_kept():
+    async def func(job):
+        job.update(stage="working", progress=0.5)
+        return {"answer": 42}
+
+    job = _run(func)
+    assert job.status == JobStatus.SUCCEEDED
+    assert job.result == {"answer": 42}
+    assert job.progress == 1.0
+
+
+def test_cancel_finished_job_conflicts():
+    async def main():
+        jobs = JobManager(max_workers=1)
+        job = jobs.submit(1, "noop", lambda job: asyncio.sleep(0))
+        await job.task
+        with pytest.raises(Exception) as excinfo:
+            jobs.cancel(job.id)
+        return excinfo.value
+
+    assert asyncio.run(main()).status_code == 409
+
+
+def test_submit_with_known_id():
+    async def main():
+        jobs = JobManager(max_workers=1)
+        job = jobs.submit(1, "noop", lambda job: asyncio.sleep(0), "abc")
+        await job.task
+        return jobs.get("abc")
+
+    job = asyncio.run(main())
+    assert job.id == "abc"
+    assert job.status == JobStatus.SUCCEEDED
+
+
+def test_on_finish_sees_cancel_before_start():
+    finished = []
+
+    async def on_finish(job):
+        finished.append(job.status)
+
+    async def main():
+        jobs = JobManager(max_workers=1)
+        job = jobs.submit(
+            1, "noop", lambda job: asyncio.sleep(0), on_finish=on_finish
+        )
+        # cancelled before the event loop ever ran the task
+        jobs.cancel(job.id)
+        await asyncio.gather(job.task, return_exceptions=True)
+        await jobs.shutdown()
+        return job
+
+    job = asyncio.run(main())
+    assert job.status == JobStatus.CANCELLED
+    assert job.finished_at is not None
+    assert finished == [JobStatus.CANCELLED]
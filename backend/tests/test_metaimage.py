@@ -0,0 +1,87 @@
+import numpy as np
+import pytest
+
+from app.shared import metaimage
+
+
+def _image(dtype=np.float32):
+    return np.arange(2 * 3 * 4, dtype=dtype).reshape(2, 3, 4)
+
+
+def test_round_trip(tmp_path):
+    path = tmp_path / "img.mhd"
+    array = _image()
+    metaimage.write_image(path, array, [0.5, 1.0, 2.0], origin=[1, 2, 3])
+
+    info = metaimage.read_info(path)
+    assert info.dims == (4, 3, 2)
+    assert info.shape == (2, 3, 4)
+    assert info.spacing == (0.5, 1.0, 2.0)
+    assert info.origin == (1.0, 2.0, 3.0)
+    assert info.dtype == np.float32
+    assert info.data_file == tmp_path / "img.raw"
+    assert metaimage.data_files(path) == [path, tmp_path / "img.raw"]
+
+    image = metaimage.open_memmap(path)
+    assert isinstance(image, np.memmap)
+    np.testing.assert_array_equal(image, array)
+
+
+def test_big_endian(tmp_path):
+    path = tmp_path / "img.mhd"
+    array = _image(np.dtype(">i2"))
+    metaimage.write_image(path, array, [1, 1, 1])
+
+    assert metaimage.read_header(path)["BinaryDataByteOrderMSB"] == "True"
+    image = metaimage.open_memmap(path)
+    assert image.dtype == np.dtype(">i2")
+    np.testing.assert_array_equal(image, array)
+
+
+def test_local_data_with_header_size(tmp_path):
+    path = tmp_path / "img.mha"
+    array = _image(np.uint8)
+    path.write_text(
+        "ObjectType = Image\n"
+        "NDims = 3\n"
+        "DimSize = 4 3 2\n"
+        "ElementType = MET_UCHAR\n"
+        "HeaderSize = 5\n"
+        "ElementDataFile = LOCAL\n"
+    )
+    with open(path, "ab") as f:
+        f.write(b"skip!" + array.tobytes())
+
+    info = metaimage.read_info(path)
+    assert info.data_file == path
+    assert metaimage.data_files(path) == [path]
+    np.testing.assert_array_equal(metaimage.open_memmap(path), array)
+
+
+def test_create_memmap_is_zeroed_and_writable(tmp_path):
+    path = tmp_path / "out.mhd"
+    out = metaimage.create_memmap(path, (3, 2, 2), [1, 1, 1], np.uint16)
+    assert out.shape == (3, 2, 2)
+    assert not out.any()
+    out[1] = 7
+    out.flush()
+    np.testing.assert_array_equal(metaimage.open_memmap(path)[1], 7)
+
+
+def test_copy_on_write_leaves_file(tmp_path):
+    path = tmp_path / "img.mhd"
+    metaimage.write_image(path, _image(), [1, 1, 1])
+    view = metaimage.open_memmap(path, mode="c")
+    view[:] = -1
+    np.testing.assert_array_equal(metaimage.open_memmap(path), _image())
+
+
+def test_compressed_data_is_rejected(tmp_path):
+    path = tmp_path / "img.mhd"
+    metaimage.write_image(path, _image(), [1, 1, 1])
+    header = path.read_text().replace(
+        "CompressedData = False", "CompressedData = True"
+    )
+    path.write_text(header)
+    with pytest.raises(ValueError):
+        metaimage.read_info(path)
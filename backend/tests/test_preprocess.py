@@ -0,0 +1,99 @@
+import numpy as np
+import pytest
+
+from app.shared import metaimage, preprocess
+from app.shared.preprocess import Preprocessing, detector_center
+
+# 5 angles on a detector of 6 rows by 8 columns
+SHAPE = (5, 6, 8)
+
+
+def _projections(tmp_path, array=None):
+    if array is None:
+        array = np.arange(np.prod(SHAPE), dtype=np.float32).reshape(SHAPE)
+    path = tmp_path / "projection.mhd"
+    metaimage.write_image(path, array, [0.5, 0.25, 1.0])
+    return path, array
+
+
+def _binned(array, b):
+    angles, rows, cols = array.shape
+    return array.reshape(angles, rows // b, b, cols // b, b).mean(axis=(2, 4))
+
+
+def _run(tmp_path, prep, array=None):
+    path, array = _projections(tmp_path, array)
+    out = preprocess.preprocess(path, tmp_path / "out.mhd", prep)
+    return array, metaimage.read_info(out), metaimage.open_memmap(out)
+
+
+def test_binning_averages_blocks(tmp_path):
+    array, info, out = _run(tmp_path, Preprocessing(binning=2))
+    assert out.shape == (5, 3, 4)
+    assert info.spacing == (1.0, 0.5, 1.0)
+    np.testing.assert_allclose(out, _binned(array, 2))
+
+
+def test_roi_is_shrunk_to_whole_bins(tmp_path):
+    # 5 columns and 3 rows keep 4 columns and 2 rows in 2x2 bins
+    prep = Preprocessing(roi=(1, 2, 5, 3), binning=2)
+    array, _, out = _run(tmp_path, prep)
+    np.testing.assert_allclose(out, _binned(array[:, 2:4, 1:5], 2))
+
+
+def test_angle_step(tmp_path):
+    array, _, out = _run(tmp_path, Preprocessing(angle_step=2))
+    np.testing.assert_array_equal(out, array[::2])
+
+
+def test_flat_dark_and_log(tmp_path):
+    rng = np.random.default_rng(0)
+    flat = rng.uniform(50, 100, SHAPE[1:]).astype(np.float32)
+    dark = rng.uniform(0, 5, SHAPE[1:]).astype(np.float32)
+    mu = rng.uniform(0, 2, SHAPE).astype(np.float32)
+    array = (flat - dark) * np.exp(-mu) + dark
+    metaimage.write_image(tmp_path / "flat.mhd", flat[None], [0.5, 0.25, 1])
+    metaimage.write_image(tmp_path / "dark.mhd", dark, [0.5, 0.25, 1])
+
+    prep = Preprocessing(
+        flat_path=str(tmp_path / "flat.mhd"),
+        dark_path=str(tmp_path / "dark.mhd"),
+        log=True,
+    )
+    _, _, out = _run(tmp_path, prep, array)
+    np.testing.assert_allclose(out, mu, atol=1e-4)
+
+
+def test_roi_outside_the_detector(tmp_path):
+    with pytest.raises(ValueError):
+        _run(tmp_path, Preprocessing(roi=(4, 0, 5, 6)))
+
+
+@pytest.mark.parametrize(
+    "prep",
+    [
+        Preprocessing(),
+        Preprocessing(binning=2),
+        Preprocessing(roi=(2, 1, 4, 4)),
+        Preprocessing(roi=(1, 0, 6, 5), binning=2),
+    ],
+)
+def test_detector_center_stays_in_place(tmp_path, prep):
+    path, _ = _projections(tmp_path)
+    info = metaimage.read_info(path)
+    row, col = detector_center(info, prep)
+
+    col0, row0 = (prep.roi or (0, 0))[:2]
+    b = prep.binning
+    # map the center back to pixels of the full resolution detector
+    assert row0 + row * b + 0.5 * (b - 1) == pytest.approx(2.5)
+    assert col0 + col * b + 0.5 * (b - 1) == pytest.approx(3.5)
+
+
+def test_detector_center_shifts_with_the_roi(tmp_path):
+    path, _ = _projections(tmp_path)
+    info = metaimage.read_info(path)
+    roi = Preprocessing(roi=(2, 1, 4, 4))
+    assert detector_center(info, Preprocessing()) == (2.5, 3.5)
+    assert detector_center(info, roi) == (1.5, 1.5)
+    assert detector_center(info, Preprocessing(binning=2)) == (1.0, 1.5)
@@ -0,0 +1,84 @@
+import numpy as np
+import pytest
+from scipy.spatial.transform import Rotation as R
+
+from app.shared.raycast import box_chords, sphere_chords
+
+IDENTITY = np.eye(3)
+ORIGIN = np.zeros(3)
+
+
+def _ends(*points):
+    return np.array(points, dtype=float)
+
+
+def test_box_chords_axis_aligned():
+    start = np.array([-50.0, 0.0, 0.0])
+    ends = _ends(
+        [50, 0, 0],  # through the middle
+        [50, 4, 0],  # slanted, from y = 1.6 to 2.4 across the box
+        [50, 10, 0],  # slanted, leaves through y = 5 at x = 0
+        [0, 0, 0],  # stops in the middle of the box
+        [-50, 0, 50],  # parallel to the x faces, outside of them
+    )
+    half = np.array([10.0, 5.0, 5.0])
+    chords = box_chords(start, ends, IDENTITY, ORIGIN, half)
+    slant = [np.hypot(100, 4) / 100, np.hypot(100, 10) / 100]
+    np.testing.assert_allclose(
+        chords, [20, 20 * slant[0], 10 * slant[1], 10, 0], atol=1e-12
+    )
+
+
+def test_box_chords_diagonal():
+    start = np.array([-10.0, -10.0, -10.0])
+    ends = _ends([10, 10, 10])
+    chords = box_chords(start, ends, IDENTITY, ORIGIN, np.ones(3))
+    np.testing.assert_allclose(chords, [2 * np.sqrt(3)])
+
+
+def test_box_chords_placed():
+    start = np.array([-50.0, 0.0, 0.0])
+    ends = _ends([50, 0, 0])
+    half = np.array([10.0, 5.0, 5.0])
+    # a quarter turn about z puts the short side along the ray
+    turned = R.from_euler("z", 90, degrees=True).as_matrix()
+    assert box_chords(start, ends, turned, ORIGIN, half) == pytest.approx([10])
+    # moved up by 7 the box spans y = 2 to 12, above the ray
+    moved = np.array([0.0, 7.0, 0.0])
+    assert box_chords(start, ends, IDENTITY, moved, half) == pytest.approx([0])
+
+
+def test_box_chords_t_max():
+    start = np.array([-50.0, 0.0, 0.0])
+    ends = _ends([50, 0, 0])
+    half = np.array([10.0, 5.0, 5.0])
+    # the segments end at x = 25, -5 and -20
+    for t_max, chord in ((0.75, 20), (0.45, 5), (0.3, 0)):
+        assert box_chords(
+            start, ends, IDENTITY, ORIGIN, half, t_max
+        ) == pytest.approx([chord])
+
+
+def test_sphere_chords():
+    start = np.array([-50.0, 0.0, 0.0])
+    ends = _ends(
+        [50, 0, 0],  # through the center
+        [50, 6, 0],  # passes 3 / cos(slope) from it
+        [50, 12, 0],  # passes 6 / cos(slope) from it, misses
+        [0, 0, 0],  # stops at the center
+    )
+    chords = sphere_chords(start, ends, ORIGIN, 0.0, 5.0)
+    distance = 300 / np.hypot(100, 6)
+    np.testing.assert_allclose(
+        chords, [10, 2 * np.sqrt(25 - distance**2), 0, 5], atol=1e-12
+    )
+
+
+def test_sphere_chords_shell_and_center():
+    start = np.array([-50.0, 0.0, 0.0])
+    ends = _ends([50, 0, 0], [0, 0, 0])
+    center = np.array([0.0, 0.0, 0.0])
+    shell = sphere_chords(start, ends, center, 2.0, 5.0)
+    np.testing.assert_allclose(shell, [6, 3])
+    moved = sphere_chords(start, ends, np.array([0.0, 0.0, 5.0]), 0.0, 5.0)
+    np.testing.assert_allclose(moved, [0, 0], atol=1e-6)
@@ -0,0 +1,46 @@
+import awkward as ak
+import numpy as np
+import uproot
+
+from app.shared import hits, scatter
+
+
+def _write(path, names, flags, x):
+    n = len(names)
+    branches = {
+        "KineticEnergy": np.full(n, 0.05),
+        "GlobalTime": np.full(n, 0.5),
+        "ParticleName": ak.Array(names),
+        "UnscatteredPrimaryFlag": np.array(flags, dtype=np.int32),
+    }
+    for c, values in zip("XYZ", (x, np.zeros(n), np.zeros(n))):
+        branches[f"PrePosition_{c}"] = np.asarray(values, dtype=float)
+    for c, value in zip("XYZ", (0.0, 0.0, 1.0)):
+        branches[f"PreDirection_{c}"] = np.full(n, value)
+    with uproot.recreate(path) as f:
+        f[scatter.TREE] = branches
+
+
+def test_bin_scatter_reads_every_thread_file(tmp_path):
+    path = str(tmp_path / "scatter.root")
+    # one scattered gamma per thread, an electron and a primary are dropped
+    _write(tmp_path / "scatter_t0.root", ["gamma", "e-"], [0, 0], [-1.5, 0])
+    _write(tmp_path / "scatter_t1.root", ["gamma", "gamma"], [0, 1], [1.5, 0])
+    paths = hits.output_files(path)
+    assert len(paths) == 2
+
+    coarse = scatter.bin_scatter(
+        paths,
+        run_edges=np.array([0.0, 1.0]),
+        angle_step=1,
+        rotations=np.eye(3)[None],
+        translations=np.zeros((1, 3)),
+        size=(4, 4),
+        spacing=(1.0, 1.0),
+        binning=2,
+        thickness=1.0,
+        mu=lambda energy: np.full_like(energy, np.inf),
+        weight=1.0,
+    )
+    # each gamma is absorbed, over the 4 pixels of its coarse bin
+    np.testing.assert_allclose(coarse, [[[0.0, 0.0], [0.25, 0.25]]])
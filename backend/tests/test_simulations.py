@@ -0,0 +1,66 @@
+import os
+
+import numpy as np
+import pytest
+import uproot
+
+from app.shared import hits, metaimage
+from app.shared.preprocess import Preprocessing
+from app.simulations.schema import ReconAlgorithm, ReconstructionParams
+from app.simulations.service import (
+    HITS_FILE,
+    PREVIEW_SHARDS,
+    PROJECTION_FILE,
+    IncrementalReconstruction,
+    SimulationService,
+    _shard_bounds,
+)
+
+
+def _num_shards(num_runs, num_workers, params, prep=Preprocessing()):
+    streams = IncrementalReconstruction.accumulates(params, prep)
+    return len(_shard_bounds(num_runs, num_workers, None, streams)) - 1
+
+
+@pytest.mark.parametrize("algorithm", [ReconAlgorithm.SART, "sirt"])
+def test_iterative_runs_keep_one_shard_per_worker(algorithm):
+    params = ReconstructionParams(sod=500, sdd=1000, algorithm=algorithm)
+    assert _num_shards(360, 1, params) == 1
+    assert _num_shards(360, 4, params) == 4
+
+
+def test_preprocessed_runs_keep_one_shard_per_worker():
+    params = ReconstructionParams(sod=500, sdd=1000)
+    assert _num_shards(360, 2, params, Preprocessing(binning=2)) == 2
+
+
+def test_fbp_runs_stream():
+    params = ReconstructionParams(sod=500, sdd=1000)
+    assert _num_shards(360, 1, params) == PREVIEW_SHARDS
+    assert _num_shards(360, 16, params) == 16
+    # every shard keeps at least two angles
+    assert _num_shards(6, 1, params) == 3
+
+
+def test_shard_size_wins():
+    bounds = _shard_bounds(10, 1, shard_size=4, streams=True)
+    np.testing.assert_array_equal(bounds, [0, 4, 8, 10])
+
+
+def test_merge_shards(tmp_path):
+    shard_dirs = []
+    for k, first in enumerate((0, 3)):
+        shard = tmp_path / "shards" / str(k)
+        os.makedirs(shard / "output")
+        stack = np.full((3, 2, 2), first, dtype=np.float32)
+        metaimage.write_image(shard / PROJECTION_FILE, stack, [1, 1, 1])
+        with uproot.recreate(shard / HITS_FILE) as f:
+            f[hits.TREE] = {"E": np.array([float(k)])}
+        shard_dirs.append(str(shard))
+
+    SimulationService._merge_shards(shard_dirs, str(tmp_path))
+    merged = metaimage.open_memmap(tmp_path / PROJECTION_FILE)
+    np.testing.assert_array_equal(merged[:, 0, 0], [0, 0, 0, 3, 3, 3])
+    with uproot.open(tmp_path / HITS_FILE) as f:
+        energies = f[hits.TREE]["E"].array(library="np")
+    np.testing.assert_array_equal(energies, [0.0, 1.0])
@@ -0,0 +1,97 @@
+import asyncio
+from types import SimpleNamespace
+
+from app.core import Base, engine
+from app.core.database import AsyncSessionLocal
+from app.jobs.manager import JobManager
+from app.jobs.schema import JobStatus
+from app.simulations.repository import SimulationRepository
+from app.simulations.schema import ActorBase, SimulationCreate
+from app.sweeps.repository import SweepRepository
+from app.sweeps.schema import SweepCreate, SweepGrid
+from app.sweeps.service import SweepService
+
+
+class FakeSimulationService:
+    def __init__(self, output_dir):
+        self.plan = SimpleNamespace(
+            simulation=SimpleNamespace(output_dir=output_dir),
+            sources=[],
+            volume_map={},
+        )
+
+    async def read_run_plan(self, sim_id):
+        return self.plan
+
+    def prepare_run(self, plan, output_dir, seed):
+        return SimpleNamespace(number_of_threads=1)
+
+
+async def _simulation(name):
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    async with AsyncSessionLocal() as session:
+        sim = await SimulationRepository(session).create(
+            SimulationCreate(name=name, actor=ActorBase())
+        )
+        return sim.id
+
+
+async def _status(sweep_id):
+    async with AsyncSessionLocal() as session:
+        sweep = await SweepRepository(session).get(sweep_id)
+        return sweep.status
+
+
+def test_cancelled_while_queued(tmp_path):
+    async def main():
+        sim_id = await _simulation("queued sweep")
+        jobs = JobManager(max_workers=1)
+        # keeps the only slot busy, the sweep's job cannot start
+        blocker = jobs.submit(
+            sim_id, "block", lambda job: asyncio.Event().wait()
+        )
+        async with AsyncSessionLocal() as session:
+            service = SweepService(
+                FakeSimulationService(str(tmp_path)), SweepRepository(session)
+            )
+            sweep = await service.create_sweep(
+                sim_id, SweepCreate(grid=SweepGrid(energies=[10.0])), jobs
+            )
+        queued = await _status(sweep.id)
+        job = jobs.cancel(sweep.job_id)
+        await asyncio.gather(job.task, return_exceptions=True)
+        jobs.cancel(blocker.id)
+        await jobs.shutdown()
+        return sweep, queued, job, await _status(sweep.id)
+
+    sweep, queued, job, final = asyncio.run(main())
+    assert sweep.status == JobStatus.QUEUED
+    assert queued == JobStatus.QUEUED.value
+    assert job.status == JobStatus.CANCELLED
+    assert final == JobStatus.CANCELLED.value
+
+
+def test_fail_unfinished():
+    async def main():
+        sim_id = await _simulation("stale sweeps")
+        create = SweepCreate(grid=SweepGrid(energies=[10.0]))
+        ids = {}
+        async with AsyncSessionLocal() as session:
+            repo = SweepRepository(session)
+            for status in JobStatus:
+                sweep = await repo.create(sim_id, create)
+                sweep.status = status.value
+                await repo.update(sweep)
+                ids[status] = sweep.id
+            await repo.fail_unfinished()
+        return {status: await _status(id) for status, id in ids.items()}
+
+    statuses = asyncio.run(main())
+    assert statuses == {
+        JobStatus.QUEUED: JobStatus.FAILED.value,
+        JobStatus.RUNNING: JobStatus.FAILED.value,
+        JobStatus.SUCCEEDED: JobStatus.SUCCEEDED.value,
+        JobStatus.FAILED: JobStatus.FAILED.value,
+        JobStatus.CANCELLED: JobStatus.CANCELLED.value,
+    }
@@ -0,0 +1,162 @@
+import numpy as np
+import pytest
+from fastapi import HTTPException
+
+from app.shared import trajectory
+from app.volumes.schema import BoxShape, DynamicParams, VolumeCreate
+
+
+def _volume(**dynamic) -> VolumeCreate:
+    return VolumeCreate(
+        name="phantom",
+        translation=[0.0, 0.0, 0.0],
+        rotation={"axis": "z", "angle": 0.0},
+        shape=BoxShape(size=[10.0, 10.0, 10.0]),
+        dynamic_params=DynamicParams(enabled=True, **dynamic),
+    )
+
+
+class FakeGateVolume:
+    def __init__(self):
+        self.user_info = {"dynamic_params": {"old": "trajectory"}}
+        self.parametrisations = []
+
+    def add_dynamic_parametrisation(self, name, **params):
+        self.parametrisations.append((name, params))
+
+
+def test_rotations_stop_short_of_the_end():
+    matrices = trajectory.rotations("z", 0.0, 360.0, 4)
+    assert matrices.shape == (4, 3, 3)
+    np.testing.assert_allclose(matrices[0], np.eye(3), atol=1e-12)
+    # a quarter turn about z maps x onto y
+    np.testing.assert_allclose(matrices[1] @ [1, 0, 0], [0, 1, 0], atol=1e-12)
+    assert not matrices.flags.writeable
+
+
+def test_translations_are_linear_and_memoized():
+    pos = trajectory.translations((0.0, 0.0, 0.0), (40.0, 0.0, -8.0), 4)
+    np.testing.assert_allclose(pos[:, 0], [0, 10, 20, 30])
+    np.testing.assert_allclose(pos[:, 2], [0, -2, -4, -6])
+    assert not pos.flags.writeable
+    again = trajectory.translations((0.0, 0.0, 0.0), (40.0, 0.0, -8.0), 4)
+    assert again is pos
+
+
+def test_parametrisation_only_holds_what_moves():
+    vol = _volume(angle_end=90.0)
+    params = trajectory.dynamic_parametrisation(vol, 3)
+    assert set(params) == {"rotation"}
+    assert len(params["rotation"]) == 3
+
+
+def test_parametrisation_of_a_run_slice():
+    vol = _volume(angle_end=90.0, translation_end=[30.0, 0.0, 0.0])
+    params = trajectory.dynamic_parametrisation(vol, 3, slice(1, 3))
+    assert len(params["rotation"]) == 2
+    np.testing.assert_allclose(params["translation"][0], [10, 0, 0])
+
+
+def test_apply_replaces_previous_trajectory():
+    gate_vol = FakeGateVolume()
+    trajectory.apply_trajectory(gate_vol, _volume(angle_end=90.0), 3)
+    assert gate_vol.user_info["dynamic_params"] is None
+    [(name, params)] = gate_vol.parametrisations
+    assert name == trajectory.PARAMETRISATION_NAME
+    assert len(params["rotation"]) == 3
+
+
+def test_apply_static_volume_clears_trajectory():
+    gate_vol = FakeGateVolume()
+    vol = _volume()
+    vol.dynamic_params.enabled = False
+    trajectory.apply_trajectory(gate_vol, vol, 3)
+    assert gate_vol.user_info["dynamic_params"] is None
+    assert gate_vol.parametrisations == []
+
+
+def test_local_poses_of_static_volume():
+    vol = _volume()
+    vol.dynamic_params.enabled = False
+    vol.translation = [1.0, 2.0, 3.0]
+    vol.translation_unit = "cm"
+    matrices, pos = trajectory.local_poses(vol, 2)
+    assert matrices.shape == (2, 3, 3)
+    np.testing.assert_allclose(pos, [[10, 20, 30]] * 2)
+
+
+@pytest.mark.parametrize("runs", [1, 5])
+def test_world_poses_compose_mothers(runs):
+    mother = _volume(translation_end=[0.0, 0.0, 0.0])
+    mother.name = "mother"
+    mother.translation = [100.0, 0.0, 0.0]
+    mother.rotation.angle = 90.0
+    mother.dynamic_params.translation_end = None
+    child = _volume()
+    child.mother = "mother"
+    child.translation = [10.0, 0.0, 0.0]
+    child.dynamic_params.enabled = False
+
+    poses = trajectory.world_poses({"mother": mother, "phantom": child}, runs)
+    matrices, pos = poses["phantom"]
+    # the mother turns the child's offset from x to y
+    np.testing.assert_allclose(pos, [[100, 10, 0]] * runs, atol=1e-9)
+    assert matrices.shape == (runs, 3, 3)
+
+
+def test_per_run_positions_in_gate_units():
+    vol = _volume(translations=[[0, 0, 0], [1, 0, 0], [3, 0, 0]])
+    vol.translation_unit = "cm"
+    np.testing.assert_allclose(trajectory.positions(vol, 3)[:, 0], [0, 10, 30])
+    params = trajectory.dynamic_parametrisation(vol, 3, slice(2, 3))
+    np.testing.assert_allclose(params["translation"], [[30, 0, 0]])
+
+
+def test_static_position_is_none():
+    assert trajectory.positions(_volume(angle_end=90.0), 3) is None
+
+
+def test_end_and_per_run_positions_are_exclusive():
+    with pytest.raises(ValueError):
+        DynamicParams(
+            enabled=True,
+            translation_end=[1.0, 0.0, 0.0],
+            translations=[[0.0, 0.0, 0.0]],
+        )
+
+
+def test_per_run_positions_must_match_runs():
+    vol = _volume(translations=[[0, 0, 0], [1, 0, 0]])
+    with pytest.raises(HTTPException) as excinfo:
+        trajectory.validate_trajectory(vol, 3)
+    assert excinfo.value.status_code == 422
+    assert "2 translations" in excinfo.value.detail
+
+
+def _detector() -> VolumeCreate:
+    return VolumeCreate(
+        name="detector",
+        translation=[0.0, 0.0, 100.0],
+        shape=BoxShape(size=[50.0, 50.0, 2.0]),
+    )
+
+
+def test_trajectory_into_the_detector_is_rejected():
+    vol = _volume(translation_end=[0.0, 0.0, 200.0])
+    with pytest.raises(HTTPException) as excinfo:
+        trajectory.validate_trajectory(vol, 10, _detector())
+    assert excinfo.value.status_code == 422
+    # the box's bounding sphere reaches the detector face at z = 99
+    assert "at run 5" in excinfo.value.detail
+
+
+def test_trajectory_clear_of_the_detector_passes():
+    vol = _volume(translations=[[0, 0, z] for z in (0.0, 40.0, 80.0)])
+    trajectory.validate_trajectory(vol, 3, _detector())
+
+
+def test_detector_in_another_mother_is_ignored():
+    detector = _detector()
+    detector.mother = "elsewhere"
+    vol = _volume(translation_end=[0.0, 0.0, 200.0])
+    trajectory.validate_trajectory(vol, 10, detector)
@@ -0,0 +1,98 @@
+import asyncio
+from types import SimpleNamespace
+
+from fastapi import HTTPException
+
+from app.core import Base, engine
+from app.core.database import AsyncSessionLocal
+from app.simulations.repository import SimulationRepository
+from app.simulations.schema import ActorBase, SimulationCreate
+from app.volumes import service as volume_service
+from app.volumes.repository import VolumeRepository
+from app.volumes.schema import BoxShape, VolumeCreate
+from app.volumes.service import VolumeService
+
+
+class FakeVolumeManager:
+    def __init__(self):
+        self.volume_names = ["world"]
+
+
+class FakeGateSim:
+    def __init__(self):
+        self.volume_manager = FakeVolumeManager()
+
+    def add_volume(self, volume_type, name):
+        self.volume_manager.volume_names.append(name)
+        return SimpleNamespace(user_info={})
+
+
+class FakeSimulationService:
+    def __init__(self, sim_read):
+        self.sim_read = sim_read
+        self.gate_sim = FakeGateSim()
+
+    async def get_gate_sim_without_sources(self, sim_id):
+        return self.gate_sim
+
+    async def read_simulation(self, sim_id):
+        return self.sim_read
+
+
+class FakeArchive:
+    def __init__(self, error=None):
+        self.error = error
+        self.saved = 0
+
+    def save(self, gate_sim):
+        if self.error:
+            raise self.error
+        self.saved += 1
+
+
+def _create(monkeypatch, archive, name):
+    monkeypatch.setattr(volume_service, "get_archive_cache", lambda: archive)
+
+    async def main():
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        async with AsyncSessionLocal() as session:
+            sim = await SimulationRepository(session).create(
+                SimulationCreate(name=name, actor=ActorBase())
+            )
+            sim_id = sim.id
+            service = VolumeService(
+                FakeSimulationService(SimpleNamespace(id=sim_id)),
+                VolumeRepository(session),
+            )
+            volumes = [
+                VolumeCreate(name=f"box{i}", shape=BoxShape())
+                for i in range(3)
+            ]
+            error = None
+            try:
+                await service.create_volumes(sim_id, volumes)
+            except HTTPException as e:
+                error = e
+        async with AsyncSessionLocal() as session:
+            rows = await VolumeRepository(session).read_all(sim_id)
+        return sorted(v.name for v in rows), error
+
+    return asyncio.run(main())
+
+
+def test_create_volumes_commits_once_archived(monkeypatch):
+    archive = FakeArchive()
+    names, error = _create(monkeypatch, archive, "batch")
+    assert error is None
+    assert names == ["box0", "box1", "box2", "world"]
+    assert archive.saved == 1
+
+
+def test_create_volumes_rolls_back_when_archive_fails(monkeypatch):
+    archive = FakeArchive(OSError("disk full"))
+    names, error = _create(monkeypatch, archive, "rollback")
+    assert error.status_code == 500
+    assert "disk full" in error.detail
+    # only the world volume every simulation starts with
+    assert names == ["world"]
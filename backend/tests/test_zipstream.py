@@ -0,0 +1,49 @@
+import io
+import os
+import zipfile
+
+from app.shared import zipstream
+
+
+def test_streamed_archive_is_valid(tmp_path, monkeypatch):
+    # several chunks per member, so data is yielded mid-file
+    monkeypatch.setattr(zipstream, "CHUNK_SIZE", 1000)
+    text = tmp_path / "run.json"
+    text.write_text('{"a": 1}\n' * 500)
+    raw = tmp_path / "projection.raw"
+    raw.write_bytes(os.urandom(4096))
+    empty = tmp_path / "empty.txt"
+    empty.write_bytes(b"")
+
+    chunks = list(
+        zipstream.iter_zip(
+            [
+                (text, "output/run.json", True),
+                (raw, "output/projection.raw", False),
+                (empty, "empty.txt", True),
+            ]
+        )
+    )
+    assert len([c for c in chunks if c]) > 3
+
+    with zipfile.ZipFile(io.BytesIO(b"".join(chunks))) as zf:
+        assert zf.testzip() is None
+        assert zf.namelist() == [
+            "output/run.json",
+            "output/projection.raw",
+            "empty.txt",
+        ]
+        run = zf.getinfo("output/run.json")
+        assert run.compress_type == zipfile.ZIP_DEFLATED
+        assert run.compress_size < run.file_size
+        projection = zf.getinfo("output/projection.raw")
+        assert projection.compress_type == zipfile.ZIP_STORED
+        assert zf.read("output/run.json") == text.read_bytes()
+        assert zf.read("output/projection.raw") == raw.read_bytes()
+        assert zf.read("empty.txt") == b""
+
+
+def test_empty_archive():
+    data = b"".join(zipstream.iter_zip([]))
+    with zipfile.ZipFile(io.BytesIO(data)) as zf:
+        assert zf.namelist() == []
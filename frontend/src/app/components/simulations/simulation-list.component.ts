@@ -4,6 +4,7 @@ import { CommonModule } from '@angular/common';
 import { SimulationService } from '../../services/simulation.service';
 import { SimulationRead } from '../../interfaces/simulation';
 import { MessageResponse } from '../../interfaces/message';
+import { JobRead } from '../../interfaces/job';
 
 @Component({
   selector: 'app-simulation-list',
@@ -36,6 +37,7 @@ export class SimulationListComponent implements OnInit {
   private simulationService = inject(SimulationService);
   private router = inject(Router);
   simulations: SimulationRead[] = [];
+  jobs: Record<number, JobRead> = {};
   
   ngOnInit(): void {
     this.loadAll();
@@ -59,9 +61,7 @@ export class SimulationListComponent implements OnInit {
   
   runSimulation(id: number): void {
     this.simulationService.runSimulation(id)
-      .subscribe((res: MessageResponse) => {
-        this.showToast(res.message, 'success');
-      });
+      .subscribe((res: JobRead) => this.followJob(res));
   }
   
   edit(id: number): void {
@@ -98,9 +98,24 @@ export class SimulationListComponent implements OnInit {
       return;
     }
     this.simulationService.reconstructSimulation(id, { sod, sdd })
-      .subscribe((res: MessageResponse) => {
-        this.showToast(res.message, 'info');
-      });
+      .subscribe((res: JobRead) => this.followJob(res));
+  }
+
+  /**
+   * Track a queued job through its progress events and report the outcome
+   */
+  private followJob(job: JobRead): void {
+    this.jobs[job.simulation_id] = job;
+    this.simulationService.jobEvents(job.id).subscribe({
+      next: (update: JobRead) => (this.jobs[update.simulation_id] = update),
+      complete: () => {
+        const last = this.jobs[job.simulation_id];
+        this.showToast(
+          last.error ? `${last.message}: ${last.error}` : last.message,
+          last.status === 'succeeded' ? 'success' : 'danger'
+        );
+      },
+    });
   }
 
   /**
@@ -28,7 +28,8 @@ export class VolumeFormComponent implements OnInit {
   volumeName: string | null = null;
 
   readonly VolumeType = VolumeType;
-  readonly shapeTypes = Object.values(VolumeType);
+  // image volumes need an uploaded label map, the API creates them
+  readonly shapeTypes = [VolumeType.BOX, VolumeType.SPHERE];
   readonly axisOptions = Object.values(Axis);
   readonly unitOptions = Object.values(Unit);
 
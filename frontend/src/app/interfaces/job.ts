@@ -0,0 +1,24 @@
+export type JobStatus =
+  | 'queued'
+  | 'running'
+  | 'succeeded'
+  | 'failed'
+  | 'cancelled';
+
+export interface JobRead {
+  id: string;
+  simulation_id: number;
+  kind: string;
+  status: JobStatus;
+  stage: string;
+  progress: number;
+  message: string;
+  details: Record<string, unknown>;
+  result: Record<string, unknown> | null;
+  error: string | null;
+  created_at: string; // ISO format timestamp
+  started_at: string | null;
+  finished_at: string | null;
+  elapsed_seconds: number | null;
+  eta_seconds: number | null;
+}
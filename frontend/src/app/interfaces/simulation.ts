@@ -14,10 +14,14 @@ export interface ActorUpdate {
   origin_as_image_center?: boolean;
 }
 
+export type ParallelMode = 'threads' | 'processes';
+
 export interface SimulationBase {
   name: string;
   num_runs: number;
   run_len: number;
+  number_of_threads?: number;
+  parallel_mode?: ParallelMode;
   actor: ActorBase;
 }
 
@@ -27,6 +31,8 @@ export interface SimulationUpdate {
   name?: string;
   num_runs?: number;
   run_len?: number;
+  number_of_threads?: number;
+  parallel_mode?: ParallelMode;
   actor?: ActorUpdate;
 }
 
@@ -37,7 +43,26 @@ export interface SimulationRead extends SimulationBase {
   json_archive_filename: string;
 }
 
+export type ReconAlgorithm = 'fbp' | 'sart' | 'sirt';
+
+export type RampFilter = 'shepp_logan' | 'ram_lak' | 'cosine';
+
 export interface ReconstructionParams {
   sod: number;
   sdd: number;
+  memory_budget_mb?: number;
+  algorithm?: ReconAlgorithm;
+  filter?: RampFilter;
+  num_iterations?: number;
+  num_subsets?: number;
+  angular_range?: number;
+  volume_dims?: [number, number, number];
+  voxel_size?: number;
+  num_threads?: number;
+  binning?: number;
+  angle_step?: number;
+  roi?: [number, number, number, number];
+  flat_field?: string;
+  dark_field?: string;
+  log_transform?: boolean;
 }
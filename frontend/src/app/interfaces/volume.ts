@@ -2,7 +2,8 @@ import { Unit, Vector3, Rotation } from './primitives';
 
 export enum VolumeType {
   BOX = 'Box',
-  SPHERE = 'Sphere'
+  SPHERE = 'Sphere',
+  IMAGE = 'Image'
 }
 
 export interface BaseShape {
@@ -20,11 +21,20 @@ export interface SphereShape extends BaseShape {
   rmax: number;
 }
 
-export type VolumeShape = BoxShape | SphereShape;
+export interface ImageShape extends BaseShape {
+  type: VolumeType.IMAGE;
+  image: string;
+  labels: Record<number, string>;
+  spacing?: Vector3;
+  size?: Vector3;
+}
+
+export type VolumeShape = BoxShape | SphereShape | ImageShape;
 
 export interface DynamicParams {
   enabled: boolean;
   translation_end?: Vector3;
+  translations?: Vector3[];
   angle_end?: number;
 }
 
@@ -56,3 +66,12 @@ export interface VolumeRead extends VolumeBase {
   id: number;
   simulation_id: number;
 }
+
+export interface ImageRead {
+  digest: string;
+  format: string;
+  dims: number[];
+  spacing: number[];
+  dtype: string;
+  labels: number[] | null;
+}
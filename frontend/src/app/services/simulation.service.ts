@@ -11,6 +11,7 @@ import {
 } from '../interfaces/simulation';
 
 import { MessageResponse } from '../interfaces/message';
+import { JobRead } from '../interfaces/job';
 
 @Injectable({
   providedIn: 'root',
@@ -70,18 +71,54 @@ export class SimulationService {
     );
   }
 
-  runSimulation(id: number): Observable<MessageResponse> {
-    return this.http.post<MessageResponse>(
+  runSimulation(id: number): Observable<JobRead> {
+    return this.http.post<JobRead>(
       `${this.baseUrl}${id}/run`,
       {}
     );
   }
 
+  readJob(jobId: string): Observable<JobRead> {
+    return this.http.get<JobRead>(`${environment.apiBaseUrl}jobs/${jobId}`);
+  }
+
+  /**
+   * Subscribe to the Server-Sent Events of a job, completes once the job
+   * reached a final state.
+   */
+  jobEvents(jobId: string): Observable<JobRead> {
+    return new Observable<JobRead>((subscriber) => {
+      const source = new EventSource(
+        `${environment.apiBaseUrl}jobs/${jobId}/events`
+      );
+      source.addEventListener('progress', (event) => {
+        const job: JobRead = JSON.parse((event as MessageEvent).data);
+        subscriber.next(job);
+        if (['succeeded', 'failed', 'cancelled'].includes(job.status)) {
+          source.close();
+          subscriber.complete();
+        }
+      });
+      source.onerror = (err) => {
+        source.close();
+        subscriber.error(err);
+      };
+      return () => source.close();
+    });
+  }
+
+  cancelJob(jobId: string): Observable<JobRead> {
+    return this.http.post<JobRead>(
+      `${environment.apiBaseUrl}jobs/${jobId}/cancel`,
+      {}
+    );
+  }
+
   reconstructSimulation(
     id: number,
     params: ReconstructionParams
-  ): Observable<MessageResponse> {
-    return this.http.post<MessageResponse>(
+  ): Observable<JobRead> {
+    return this.http.post<JobRead>(
       `${this.baseUrl}${id}/reconstruct`,
       params
     );